@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,8 +6,24 @@ from API.routes.users.users import auth_router
 from API.routes.fights.fights import fights_router
 from API.routes.fighters.fighters import fighter_router
 from API.routes.communities.communities import community_router
+from utils.model_registry import model_registry
+from config.config import DB_PATH
+from Database.migrations import migrate
+from Database.connection_pool import enable_wal
+from Models.Functional_Classes.logistic_regression.style_matrix import ensure_style_matrix
 
-app = FastAPI()
+# brings the database schema up to date, switches it to WAL so requests can read while a job writes,
+# loads every saved model once when the server starts instead of on each request
+# and scores the style matrix for the current style model, which is not kept in git
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    migrate(DB_PATH)
+    enable_wal(DB_PATH)
+    model_registry.load_all()
+    ensure_style_matrix()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
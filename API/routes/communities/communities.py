@@ -38,17 +38,17 @@ def bet(community_id: int, user_id: int, bet: int):
 
 @community_router.get('/details')
 def get_details(community_id: int):
-    with CommunityManager() as db:
+    with CommunityManager(read_only=True) as db:
         return db.get_community_details(community_id)
     
 @community_router.get('/byFightID')
 def get_communities(fight_id: int):
-    with CommunityManager() as db:
+    with CommunityManager(read_only=True) as db:
         return db.get_communities_by_fightID(fight_id)
 
 @community_router.get('/all')    
 def get_all_communities():
-    with CommunityManager() as db:
+    with CommunityManager(read_only=True) as db:
         return db.get_all_communities()
     
 
@@ -13,14 +13,14 @@ fighter_router = APIRouter(
 
 @fighter_router.get("/all")
 def get_all_fighters():
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         all_fighters = db.get_all_fighters()
         
     return all_fighters
 
 @fighter_router.get("/info")
 def get_fighter_info(fighter_id: int):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         fighter_stats = db.get_fighter_by_id(fighter_id)
         upcoming_fights = db.get_fighter_upcomings(fighter_id)
         
@@ -31,14 +31,14 @@ def get_fighter_info(fighter_id: int):
     
 @fighter_router.get('/rank')
 def get_fighter_rank(fighter_id: int):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         rank = db.get_fighter_rank(fighter_id)
         
     return rank
 
 @fighter_router.get('/top')
 def get_top_fighters(count: int, option: int):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         top_fighters = db.get_top_fighters(count, option)
         
     return top_fighters
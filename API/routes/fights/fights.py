@@ -1,15 +1,17 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List
-import joblib
 import json
 import pandas as pd
 
 from Fight_Predictor.Fight_Context import Fight_Context
-from config.config import DB_PATH, PREDICTOR_MODEL_PATH
+from Fight_Predictor.Prediction_Cache import predict_fight
+from config.config import DB_PATH
 from Database.database_manager import DatabaseManager
 from API.routes.fights.schema import UpcomingFight, PastFight
 from Models.DB_Classes.Fighters import Fighter
+from Models.Functional_Classes.logistic_regression.style_matrix import get_style_matrix
 from utils.dominance_prediction import dominance_prediction
+from utils.model_registry import model_registry
 
 
 fights_router = APIRouter(
@@ -20,7 +22,7 @@ fights_router = APIRouter(
 @fights_router.get("/upcoming", response_model=List[UpcomingFight])
 def get_upcoming_fights_route():
     try:
-        with DatabaseManager(DB_PATH) as db:
+        with DatabaseManager(DB_PATH, read_only=True) as db:
             upcoming_fights = db.get_upcoming_fights()
         
         if not upcoming_fights:
@@ -34,7 +36,7 @@ def get_upcoming_fights_route():
         
 @fights_router.get("/recent")
 def recent_fights(count):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         recent_fights = db.get_recent_fights(count)
         
     if not recent_fights:
@@ -43,29 +45,50 @@ def recent_fights(count):
 
 @fights_router.get("/pre_fight_data")
 def prediction_data(red_fighter_id, blue_fighter_id, event_date):
-    with DatabaseManager(DB_PATH) as db:
+    bushy_model = model_registry.get("predictor_model")
+    model_version = model_registry.get_version("predictor_model")
+
+    # upcoming fights are precomputed by the prediction cache job, anything else is worked out live
+    with DatabaseManager(DB_PATH, read_only=True) as db:
+        cached = db.get_cached_prediction(red_fighter_id, blue_fighter_id, event_date, model_version)
+        if cached is not None:
+            return json.loads(cached)
+
         red_fighter = db.get_fighter_by_id(red_fighter_id)
         blue_fighter = db.get_fighter_by_id(blue_fighter_id)
 
-    context = Fight_Context(red_fighter, blue_fighter, event_date, winner_id = None)
-    
-    readable_features = context.create_readable_features()
-    features_dict = readable_features.to_dict(orient="records")[0]
-    
-    prediction_features = context.create_features()
-    
-    bushy_model = joblib.load(PREDICTOR_MODEL_PATH)
-    prediction = bushy_model.predict(prediction_features.values)
-    
-    return {"features": features_dict,
-            "prediction": float(prediction[0]),
-            "red_fighter": red_fighter,
-            "blue_fighter": blue_fighter
-        }
+    return predict_fight(red_fighter, blue_fighter, event_date, bushy_model)
+
+@fights_router.get("/style_matrix")
+def style_matchup(red_fighter_id: int, blue_fighter_id: int):
+    # how the style model rates the two fighters styles against each other, read from the prebuilt style matrix
+    style_matrix = get_style_matrix()
+    if style_matrix is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The style matrix has not been built for the current style model."
+        )
+
+    with DatabaseManager(DB_PATH, read_only=True) as db:
+        styles_map = db.get_fighter_styles([red_fighter_id, blue_fighter_id])
+
+    if red_fighter_id not in styles_map or blue_fighter_id not in styles_map:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fighter not found."
+        )
+
+    red_style_score = style_matrix.lookup(styles_map[red_fighter_id], styles_map[blue_fighter_id])
+    return {
+        "red_style": styles_map[red_fighter_id],
+        "blue_style": styles_map[blue_fighter_id],
+        "red_style_score": red_style_score,
+        "blue_style_score": 1 - red_style_score,
+    }
 
 @fights_router.get("/id")
 def get_fight_by_id(fight_id: int, completed: bool = True):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         if completed:
             fight = db.get_fight_by_id(fight_id)
         else:
@@ -76,7 +99,7 @@ def get_fight_by_id(fight_id: int, completed: bool = True):
 
 @fights_router.get("/fight_by_fighter")
 def get_fight_by_fighter(fighter_id: int):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         past_fights = db.get_fight_by_fighter_id(fighter_id)
         upcoming_fights = db.get_upcoming_by_fighter_id(fighter_id)
         
@@ -88,39 +111,38 @@ def get_fight_by_fighter(fighter_id: int):
 def vote(fight_id: int, user_id: int, vote: int):
     with DatabaseManager(DB_PATH) as db:
         db.vote(fight_id, user_id, vote)
-        db.update_upcoming_vote_totals()
         
 @fights_router.get("/vote_check")
 def vote_count(fight_id: int, user_id: int):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         vote_data = db.check_vote(user_id, fight_id)
         
     return vote_data
 
 @fights_router.get("/history")
 def get_fight_history(fighter_id):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         history = db.get_past_fights(fighter_id)
         
     return history        
 
 @fights_router.get("/rivalry")
 def get_fight_rivalry():
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         rivalry = db.get_active_rivalries()
         
     return rivalry
 
 @fights_router.get("/RFights")
 def get_RFights(red_fighter_id, blue_fighter_id):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         RFights = db.get_rivalry_fights(red_fighter_id, blue_fighter_id)
         
     return RFights
 
 @fights_router.get("/RDominance")
 def get_rivalry_dominance_score(red_fighter_id, blue_fighter_id, ):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         red_fighter = db.get_fighter_by_id(red_fighter_id)
         blue_fighter = db.get_fighter_by_id(blue_fighter_id)
 
@@ -129,7 +151,7 @@ def get_rivalry_dominance_score(red_fighter_id, blue_fighter_id, ):
 
 @fights_router.get("/all")
 def get_all_fights():
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         fights = db.get_fights()
         
     return fights
@@ -137,7 +159,7 @@ def get_all_fights():
 
 @fights_router.get("/dominance")
 def get_fight_dominance(fight_id):
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         fight = db.get_raw_fight_by_id(fight_id)
         
     single_fight_df = pd.DataFrame([fight])
@@ -0,0 +1,122 @@
+# Shared download layer for every scraper, built on one pooled async HTTP client
+import asyncio
+import concurrent.futures
+import time
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+from Data_Scraper.page_archive import PageArchive
+
+# Set a browser-like header so the website doesn't block the script
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Spaces out the requests sent to each host so the site is not hammered
+class HostRateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host: str):
+        # Reserve the next free slot for the host, then sleep until it comes round
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# Downloads pages over one pooled connection, with a cap on requests in flight,
+# per host rate limiting and retries with an exponential backoff.
+# Given a PageArchive, every page is saved to it and pages already in it are
+# requested conditionally, an unchanged page comes back from the archive
+class Fetcher:
+    def __init__(self, max_concurrency: int = 8, requests_per_second: float = 5.0, retries: int = 3, backoff: float = 1.0, timeout: float = 15, archive: PageArchive | None = None):
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.archive = archive
+        self.client = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self.client = httpx.AsyncClient(headers=HEADERS, timeout=self.timeout, limits=limits, follow_redirects=True)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.rate_limiter = HostRateLimiter(self.requests_per_second)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.client.aclose()
+        self.client = None
+
+    async def fetch_text(self, url: str, action: str | None = None) -> str | None:
+        action = action or url
+        host = urlparse(url).netloc
+        headers = self.archive.get_validators(url) if self.archive else {}
+
+        # Attempt to load the page a few times before giving up
+        for attempt in range(self.retries):
+            async with self.semaphore:
+                await self.rate_limiter.wait(host)
+                try:
+                    response = await self.client.get(url, headers=headers)
+                    if response.status_code == 304 and headers:
+                        self.archive.touch(url)
+                        return self.archive.get(url)["html"]
+
+                    response.raise_for_status()
+                    if self.archive:
+                        self.archive.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    return response.text
+                except httpx.HTTPError as e:
+                    print(f"  -> Attempt {attempt + 1} failed for {action}: {e}")
+
+            # Wait outside the semaphore so a failing page does not hold up the others
+            if attempt + 1 < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+
+        print(f"GIVING UP on {action} after {self.retries} attempts.")
+        return None
+
+    async def fetch_soup(self, url: str, action: str | None = None) -> BeautifulSoup | None:
+        text = await self.fetch_text(url, action)
+        return BeautifulSoup(text, 'html.parser') if text is not None else None
+
+    async def fetch_all(self, urls: list[str]) -> list[BeautifulSoup | None]:
+        # The pages come back in the same order as the urls
+        return await asyncio.gather(*(self.fetch_soup(url) for url in urls))
+
+
+def run_async(coroutine):
+    # asyncio.run cannot be used inside a running loop, like a notebook, so use a separate thread there
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+def fetch_url(url: str, action: str | None = None, **fetcher_options) -> BeautifulSoup | None:
+    # Download a single page and turn it into a BeautifulSoup object for searching
+    async def fetch():
+        async with Fetcher(**fetcher_options) as fetcher:
+            return await fetcher.fetch_soup(url, action)
+
+    return run_async(fetch())
+
+def fetch_urls(urls: list[str], **fetcher_options) -> list[BeautifulSoup | None]:
+    # Download many pages concurrently over one pooled client, in the same order as the urls
+    async def fetch():
+        async with Fetcher(**fetcher_options) as fetcher:
+            return await fetcher.fetch_all(urls)
+
+    return run_async(fetch())
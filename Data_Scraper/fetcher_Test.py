@@ -0,0 +1,242 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from Data_Scraper.fetcher import fetch_url, fetch_urls
+from Data_Scraper import fight_scraper, fighter_scraper, upcoming_scraper
+from Data_Scraper.incremental_scrape import incremental_scrape
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Database.migrations import migrate
+from Data_Scraper.page_archive import PageArchive
+from Data_Scraper.reparse_archive import reparse_archive
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_pages')
+
+# Serves the saved ufcstats pages over keep-alive HTTP and records every request it sees
+class SavedPagesHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.client_address[1], time.monotonic()))
+            server.flaky_hits += self.path.startswith('/flaky')
+
+            fail = self.path.startswith('/flaky') and server.flaky_hits <= server.flaky_failures
+
+        if fail:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.startswith('/flaky'):
+            self.path = '/event_a.html'
+
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+class TestFetcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(SavedPagesHandler, directory=PAGES_DIR))
+        cls.server.lock = threading.Lock()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.flaky_hits = 0
+        self.server.flaky_failures = 0
+
+    def test_scrape_all_fights_from_saved_pages(self):
+        fights = fight_scraper.scrape_all_fights(f"{self.base_url}/events_completed.html", requests_per_second=0)
+
+        self.assertEqual(len(fights), 4)
+        first = next(f for f in fights if f.final_time_seconds == 195)
+        self.assertEqual((first.red_knockdowns, first.red_sig_strikes, first.blue_sig_strikes), (1, 45, 20))
+        self.assertEqual((first.win_method, first.final_round), ("KO/TKO", 2))
+        self.assertEqual(first.event_date, "2024-03-02")
+        self.assertTrue(first.event_url.endswith("/event_a.html"))
+
+    def test_upcoming_and_fighter_scrapers(self):
+        upcoming = upcoming_scraper.scrape_all_fights(f"{self.base_url}/events_completed.html", requests_per_second=0)
+        self.assertEqual(len(upcoming), 4)
+        self.assertIn({"red_fighter_name": "Chris Charlie", "blue_fighter_name": "Dave Delta", "event_date": "2024-04-13"}, upcoming)
+
+        fighters = fighter_scraper.scrape_all_fighters(f"{self.base_url}/fighters_list.html?char={{letter}}", requests_per_second=0)
+        self.assertEqual(sorted(f.name for f in fighters), ["Alan Alpha", "Ben Bravo"])
+        alan = next(f for f in fighters if f.name == "Alan Alpha")
+        self.assertEqual((alan.reach, alan.stance, alan.dob), ('72"', "Orthodox", "Jan 05, 1994"))
+
+    def test_connections_are_reused(self):
+        urls = [f"{self.base_url}/event_a.html?copy={i}" for i in range(20)]
+        soups = fetch_urls(urls, max_concurrency=2, requests_per_second=0)
+
+        self.assertTrue(all(soups))
+        client_ports = {port for _, port, _ in self.server.requests}
+        self.assertLessEqual(len(client_ports), 2)
+
+    def test_retries_with_backoff(self):
+        self.server.flaky_failures = 2
+        soup = fetch_url(f"{self.base_url}/flaky", retries=3, backoff=0.01, requests_per_second=0)
+
+        self.assertIsNotNone(soup)
+        self.assertEqual(self.server.flaky_hits, 3)
+
+    def test_gives_up_after_retries(self):
+        self.server.flaky_failures = 10
+        soup = fetch_url(f"{self.base_url}/flaky", retries=2, backoff=0.01, requests_per_second=0)
+
+        self.assertIsNone(soup)
+        self.assertEqual(self.server.flaky_hits, 2)
+
+    def test_per_host_rate_limit(self):
+        urls = [f"{self.base_url}/event_b.html?copy={i}" for i in range(6)]
+        fetch_urls(urls, max_concurrency=6, requests_per_second=20)
+
+        times = sorted(t for _, _, t in self.server.requests)
+        self.assertGreaterEqual(times[-1] - times[0], 5 / 20 * 0.9)
+
+    def make_database(self, temp_dir):
+        # an empty copy of the real schema with one card and one fighter already scraped
+        db_path = os.path.join(temp_dir, "fighters.db")
+        with sqlite3.connect(DB_PATH) as source, sqlite3.connect(db_path) as conn:
+            for (sql,) in source.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND sql IS NOT NULL AND name != 'sqlite_sequence'"):
+                conn.execute(sql)
+
+            conn.execute(
+                "INSERT INTO fighters (Name, Record, profile_url) VALUES (?, ?, ?)",
+                ("Alan Alpha", "Record: 13-2-0", f"{self.base_url}/fighter_alan_alpha.html")
+            )
+            conn.execute(
+                "INSERT INTO fights (red_fighter_id, event_date, event_url, is_completed) VALUES (1, '2024-03-02', ?, 1)",
+                (f"{self.base_url}/event_a.html",)
+            )
+        migrate(db_path)
+        return db_path
+
+    def test_incremental_scrape_skips_known_events(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = self.make_database(temp_dir)
+
+            summary = incremental_scrape(db_path, f"{self.base_url}/events_completed.html", requests_per_second=0)
+            self.assertEqual(summary, {"events": 1, "fights": 2, "fighters": 4})
+
+            requested = {path.split('?')[0] for path, _, _ in self.server.requests}
+            self.assertNotIn("/event_a.html", requested)
+            self.assertNotIn("/fighter_alan_alpha.html", requested)
+            self.assertIn("/fighter_chris_charlie.html", requested)
+
+            with sqlite3.connect(db_path) as conn:
+                fights = conn.execute(
+                    "SELECT r.Name, b.Name, w.Name, f.red_sig_strikes, f.final_round FROM fights f "
+                    "JOIN fighters r ON r.id = f.red_fighter_id JOIN fighters b ON b.id = f.blue_fighter_id "
+                    "LEFT JOIN fighters w ON w.id = f.winner_id WHERE f.event_url LIKE '%event_b.html' ORDER BY r.Name"
+                ).fetchall()
+            self.assertEqual(fights, [
+                ("Chris Charlie", "Dave Delta", "Chris Charlie", 12, 1),
+                ("Eddie Echo", "Frank Fox", None, 70, 3),
+            ])
+
+            # a second run has nothing new to download
+            self.server.requests = []
+            self.assertEqual(incremental_scrape(db_path, f"{self.base_url}/events_completed.html", requests_per_second=0), {"events": 0, "fights": 0, "fighters": 0})
+            self.assertEqual([path for path, _, _ in self.server.requests], ["/events_completed.html"])
+
+    def test_upsert_refreshes_known_fighter(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = self.make_database(temp_dir)
+            fighters = fighter_scraper.scrape_fighters([f"{self.base_url}/fighter_alan_alpha.html"], requests_per_second=0)
+
+            with DatabaseManager(db_path) as db:
+                db.upsert_fighters(fighters)
+
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute("SELECT id, Record, Nickname, wins, losses, draws FROM fighters").fetchall()
+            self.assertEqual(rows, [(1, "Record: 14-2-0", "The Axe", 14, 2, 0)])
+
+    def test_archive_serves_unchanged_pages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive = PageArchive(os.path.join(temp_dir, "pages.db"))
+            url = f"{self.base_url}/event_a.html"
+
+            first = fetch_url(url, requests_per_second=0, archive=archive)
+            stored = archive.get(url)
+            self.assertIsNotNone(stored["last_modified"])
+            with open(os.path.join(PAGES_DIR, 'event_a.html'), encoding='utf-8') as f:
+                self.assertEqual(stored["html"], f.read())
+
+            # the saved page has not changed so the server answers 304 and the archived copy is used
+            second = fetch_url(url, requests_per_second=0, archive=archive)
+            self.assertEqual(str(second), str(first))
+            self.assertEqual(archive.get_validators(url), {"If-Modified-Since": stored["last_modified"]})
+            self.assertEqual(len(self.server.requests), 2)
+
+    def test_reparse_archive_without_network(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, "pages.db")
+            fights = fight_scraper.scrape_all_fights(f"{self.base_url}/events_completed.html", requests_per_second=0, archive=PageArchive(archive_path))
+            fighter_scraper.scrape_fighters([f"{self.base_url}/fighter_alan_alpha.html"], requests_per_second=0, archive=PageArchive(archive_path))
+
+            self.server.requests = []
+            reparsed = reparse_archive("fights", "%/event_%", archive_path, max_workers=2)
+            fighters = reparse_archive("fighters", "%/fighter_%", archive_path, max_workers=2)
+
+            self.assertEqual(self.server.requests, [])
+            key = lambda f: (f.event_url, f.red_fighter_name)
+            self.assertEqual(
+                [f.to_tuple_for_insert() + (f.red_fighter_name,) for f in sorted(reparsed, key=key)],
+                [f.to_tuple_for_insert() + (f.red_fighter_name,) for f in sorted(fights, key=key)]
+            )
+            self.assertEqual([f.record for f in fighters], ["Record: 14-2-0"])
+
+        with self.assertRaises(ValueError):
+            reparse_archive("events")
+
+    def test_reparse_archive_writes_to_database(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, "pages.db")
+            fights = fight_scraper.scrape_all_fights(f"{self.base_url}/events_completed.html", requests_per_second=0, archive=PageArchive(archive_path))
+            profile_urls = {url for fight in fights for url in (fight.red_profile_url, fight.blue_profile_url) if url}
+            fighter_scraper.scrape_fighters(profile_urls, requests_per_second=0, archive=PageArchive(archive_path))
+            db_path = self.make_database(temp_dir)
+
+            # the known fighter keeps their id and gets the re-parsed record, the rest are added
+            reparse_archive("fighters", "%/fighter_%", archive_path, max_workers=2, write=True, db_path=db_path)
+            with sqlite3.connect(db_path) as conn:
+                alan = conn.execute("SELECT id, Record, wins FROM fighters WHERE Name = 'Alan Alpha'").fetchone()
+                fighter_count = conn.execute("SELECT COUNT(*) FROM fighters").fetchone()[0]
+            self.assertEqual(alan, (1, "Record: 14-2-0", 14))
+            self.assertEqual(fighter_count, len(profile_urls))
+
+            # the placeholder row for event_a is replaced by the re-parsed card, running it again changes nothing
+            for _ in range(2):
+                reparse_archive("fights", "%/event_%", archive_path, max_workers=2, write=True, db_path=db_path)
+                with sqlite3.connect(db_path) as conn:
+                    stored = conn.execute(
+                        "SELECT f.event_url, r.Name, b.Name, f.red_sig_strikes, f.final_round FROM fights f "
+                        "JOIN fighters r ON r.id = f.red_fighter_id JOIN fighters b ON b.id = f.blue_fighter_id ORDER BY f.event_url, r.Name"
+                    ).fetchall()
+                    fight_count = conn.execute("SELECT COUNT(*) FROM fights").fetchone()[0]
+
+                self.assertEqual(fight_count, len(fights))
+                self.assertEqual(stored, sorted(
+                    (f.event_url, f.red_fighter_name, f.blue_fighter_name, f.red_sig_strikes, f.final_round) for f in fights
+                ))
+
+if __name__ == '__main__':
+    unittest.main()
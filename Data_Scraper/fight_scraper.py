@@ -8,25 +8,17 @@ sys.path.append(project_root)
 # Import the custom Fight model and standard libraries for dates, web scraping, and requests
 from Models.DB_Classes.Fight import Fight
 import datetime
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
-import requests
+
+# Downloads go through the shared pooled fetcher used by every scraper
+from Data_Scraper.fetcher import fetch_url, fetch_urls
+
+EVENTS_URL = 'http://ufcstats.com/statistics/events/completed?page=all'
 
 # Get the current date to compare against fight dates later on
 today = datetime.date.today()
 
-# Define a function to download a webpage and turn it into a BeautifulSoup object for searching
-def fetch_url(url: str) -> BeautifulSoup | None:
-    try:
-        # Set a browser-like header so the website doesn't block the script
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
-    except requests.RequestException as e:
-        # If the website fails to load, print the error and return nothing
-        print(f"Error fetching {url}: {e}")
-        return None
-
 # A placeholder function that currently returns a default ELO rating of 1500 for any fighter
 def get_fighter_elo(name: str) -> int:
     return 1500
@@ -60,6 +52,12 @@ def parse_fight_row(row, event_url, event_date, is_completed) -> Fight | None:
         red_fighter_name = name_p[0].text.strip()
         blue_fighter_name = name_p[1].text.strip()
 
+        # The names link to each fighters profile page, which is how new fighters are found
+        red_link = name_p[0].find('a')
+        blue_link = name_p[1].find('a')
+        red_profile_url = urljoin(event_url, red_link['href']) if red_link and red_link.get('href') else None
+        blue_profile_url = urljoin(event_url, blue_link['href']) if blue_link and blue_link.get('href') else None
+
         # Helper to grab numbers like knockdowns or strikes for both the red and blue fighter
         def get_stat(cell_index):
             stats_p = cells[cell_index].find_all('p')
@@ -82,6 +80,8 @@ def parse_fight_row(row, event_url, event_date, is_completed) -> Fight | None:
             "red_fighter_name": red_fighter_name,
             "blue_fighter_name": blue_fighter_name,
             "winner_name": winner_name,
+            "red_profile_url": red_profile_url,
+            "blue_profile_url": blue_profile_url,
             "red_knockdowns": red_kd, "blue_knockdowns": blue_kd,
             "red_sig_strikes": red_ss, "blue_sig_strikes": blue_ss,
             "red_takedowns": red_td, "blue_takedowns": blue_td,
@@ -104,7 +104,11 @@ def scrape_event_page(url: str) -> list[Fight]:
     print(f"Scraping event: {url}")
     soup = fetch_url(url)
     if not soup: return []
-    
+
+    return parse_event_page(soup, url)
+
+# Pulls every fight out of an event page that has already been downloaded
+def parse_event_page(soup: BeautifulSoup, url: str) -> list[Fight]:
     # Locate the date of the event on the page and format it for the SQL database
     fight_date_obj, fight_date_sql = None, None
     try:
@@ -129,28 +133,61 @@ def scrape_event_page(url: str) -> list[Fight]:
             all_fights.append(fight_object)
     return all_fights
 
-# The master function that finds all UFC events and starts the full scraping process
-def scrape_all_fights() -> list[Fight]:
-    events_url = 'http://ufcstats.com/statistics/events/completed?page=all'
+# Reads the events list page into every event link and the date shown next to it
+def get_event_listing(events_url: str = EVENTS_URL, **fetcher_options) -> dict:
     print(f"Fetching all event URLs from {events_url}")
-    soup = fetch_url(events_url)
-    if not soup: return []
-    
+    soup = fetch_url(events_url, **fetcher_options)
+    if not soup: return {}
+
+    events = {}
+    for row in soup.select('tr.b-statistics__table-row'):
+        date_tag = row.select_one('span.b-statistics__date')
+        try:
+            event_date = datetime.datetime.strptime(date_tag.text.strip(), '%B %d, %Y').date() if date_tag else None
+        except ValueError:
+            event_date = None
+
+        for tag in row.select('a'):
+            if tag.get('href'):
+                events[urljoin(events_url, tag['href'])] = event_date
+
+    return events
+
+# The master function that finds all UFC events and starts the full scraping process
+def scrape_all_fights(events_url: str = EVENTS_URL, **fetcher_options) -> list[Fight]:
     # Collect every unique event link found on the main stats page
-    event_urls = {tag['href'] for tag in soup.select('tr.b-statistics__table-row a')}
+    event_urls = sorted(get_event_listing(events_url, **fetcher_options))
     print(f"Found {len(event_urls)} total event URLs.")
-    
+
+    return scrape_events(event_urls, **fetcher_options)
+
+# Only the events that are not in the database yet, known event links and anything dated
+# before the latest stored event are skipped without being downloaded
+def scrape_new_fights(known_event_urls: set, latest_event_date: str | None = None, events_url: str = EVENTS_URL, **fetcher_options) -> list[Fight]:
+    latest = datetime.datetime.strptime(latest_event_date, '%Y-%m-%d').date() if latest_event_date else None
+
+    event_urls = sorted(
+        url for url, event_date in get_event_listing(events_url, **fetcher_options).items()
+        if url not in known_event_urls and (latest is None or event_date is None or event_date >= latest)
+    )
+    print(f"Found {len(event_urls)} new event URLs.")
+
+    return scrape_events(event_urls, **fetcher_options)
+
+def scrape_events(event_urls: list[str], **fetcher_options) -> list[Fight]:
     all_historical_fights = []
 
-    # Visit every event link found and scrape all the individual fights from them
-    for url in event_urls:
-        fights_from_event = scrape_event_page(url)
-        all_historical_fights.extend(fights_from_event)
+    # Download every event page concurrently, then scrape all the individual fights from them
+    for url, event_soup in zip(event_urls, fetch_urls(event_urls, **fetcher_options)):
+        if not event_soup: continue
+        print(f"Scraping event: {url}")
+        all_historical_fights.extend(parse_event_page(event_soup, url))
         
     # Return the  list containing every single fight scraped from the site
     return all_historical_fights
 
 
 if __name__ == "__main__":
-    all_data = scrape_all_fights()
+    from Data_Scraper.page_archive import PageArchive
+    all_data = scrape_all_fights(archive=PageArchive())
     print(f"Scraped {len(all_data)} fights.")
\ No newline at end of file
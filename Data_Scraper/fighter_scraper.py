@@ -1,50 +1,29 @@
-# Import libraries for web requests, parsing HTML, multi-threading, and timing
-import requests
+# Import libraries for parsing HTML and building the alphabet of list pages
 from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 from Models.DB_Classes.Fighters import Fighter
 import string
-import concurrent.futures
-import time
 
-# Define a function to download a page with a retry system in case of connection errors
-def fetch_url(url: str, action: str) -> BeautifulSoup | None:
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    # Attempt to load the page up to 3 times before giving up
-    for attempt in range(3): 
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status() # Check if the request was successful
-            return BeautifulSoup(response.text, 'html.parser')
-        
-        except requests.RequestException as e:
-            # If it fails, print the error and wait a few seconds before trying again
-            print(f"  -> Attempt {attempt + 1} failed for {action}: {e}")
-            time.sleep(1 * (attempt + 1)) 
-            
-    print(f"GIVING UP on {action} after 3 attempts.")
-    return None
+# Downloads go through the shared pooled fetcher used by every scraper
+from Data_Scraper.fetcher import fetch_url, fetch_urls
+
+FIGHTERS_URL = 'http://ufcstats.com/statistics/fighters?char={letter}&page=all'
 
 # Function to go through the alphabetical list and collect all individual fighter profile links
-def get_all_fighter_urls() -> set[str]:
+def get_all_fighter_urls(fighters_url: str = FIGHTERS_URL, **fetcher_options) -> set[str]:
     letters = string.ascii_lowercase
     all_links = set()
 
     print("Starting to scrape all fighter pages from A to Z...")
-    # Loop through every letter of the alphabet to find all fighters
-    for letter in letters:
-        url = f'http://ufcstats.com/statistics/fighters?char={letter}&page=all'
-        
-        soup = fetch_url(url, f"Parsing fighter list for letter '{letter}'")
-
+    # Download the list page for every letter of the alphabet at once
+    letter_urls = [fighters_url.format(letter=letter) for letter in letters]
+    for letter, url, soup in zip(letters, letter_urls, fetch_urls(letter_urls, **fetcher_options)):
         if not soup:
             continue
 
         # Find all the links in the table and add them to our set
         tags = soup.select('tr.b-statistics__table-row a')
-        links_for_letter = {tag['href'] for tag in tags if tag.get('href')}
+        links_for_letter = {urljoin(url, tag['href']) for tag in tags if tag.get('href')}
 
         all_links.update(links_for_letter)
         
@@ -58,6 +37,10 @@ def scrape_fighter_page(url: str) -> dict | None:
     soup = fetch_url(url, f"Scraping page {url}")
     if not soup: return None
 
+    return parse_fighter_page(soup, url)
+
+# Pulls the bio data out of a profile page that has already been downloaded
+def parse_fighter_page(soup: BeautifulSoup, url: str) -> dict:
     # Helper function to grab text from a specific HTML element
     def get_text(selector):
         element = soup.select_one(selector)
@@ -87,25 +70,25 @@ def scrape_fighter_page(url: str) -> dict | None:
             fighter_data['DOB'] = text.replace('DOB:', '').strip()
     return fighter_data
 
-# The  function that uses multi-threading to scrape thousands of fighters simultaneously
-def scrape_all_fighters() -> list[Fighter]:
+# The function that downloads thousands of fighter pages concurrently over the shared pooled client
+def scrape_all_fighters(fighters_url: str = FIGHTERS_URL, **fetcher_options) -> list[Fighter]:
     # First, get the list of every fighter URL
-    fighter_urls = get_all_fighter_urls()
+    fighter_urls = get_all_fighter_urls(fighters_url, **fetcher_options)
+
+    return scrape_fighters(fighter_urls, **fetcher_options)
+
+# Downloads and parses just the given profile pages, used to refresh the fighters on new cards
+def scrape_fighters(fighter_urls, **fetcher_options) -> list[Fighter]:
+    fighter_urls = sorted(fighter_urls)
     all_fighters = []
 
-    # Use a ThreadPool to run 4 scraping tasks at the same time to speed things up
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        print(f"\nStarting concurrent scraping of {len(fighter_urls)} fighter pages...")
-        
-        # Submit all the URLs to the executor to be scraped
-        future_to_fighter_data = {executor.submit(scrape_fighter_page, url): url for url in fighter_urls}
-
-        # As each page finishes, turn the raw data into a Fighter object and add it to the list
-        for future in concurrent.futures.as_completed(future_to_fighter_data):
-            scraped_data = future.result()
-            if scraped_data:
-                fighter_object = Fighter(scraped_data)
-                all_fighters.append(fighter_object)
-                print(f"  -> Scraped: {fighter_object.name}")
+    print(f"\nStarting concurrent scraping of {len(fighter_urls)} fighter pages...")
+
+    # As each page is parsed, turn the raw data into a Fighter object and add it to the list
+    for url, soup in zip(fighter_urls, fetch_urls(fighter_urls, **fetcher_options)):
+        if not soup: continue
+        fighter_object = Fighter(parse_fighter_page(soup, url))
+        all_fighters.append(fighter_object)
+        print(f"  -> Scraped: {fighter_object.name}")
 
     return all_fighters
\ No newline at end of file
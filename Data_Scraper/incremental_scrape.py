@@ -0,0 +1,46 @@
+# Weekly refresh that only downloads what the database does not already have
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Data_Scraper.fight_scraper import EVENTS_URL, scrape_new_fights
+from Data_Scraper.fighter_scraper import scrape_fighters
+from Data_Scraper.page_archive import PageArchive
+
+def incremental_scrape(db_path: str = DB_PATH, events_url: str = EVENTS_URL, **fetcher_options) -> dict:
+    # Work out what has already been scraped from the event links and dates stored with the fights
+    with DatabaseManager(db_path) as db:
+        known_event_urls = db.get_scraped_event_urls()
+        latest_event_date = db.get_latest_event_date()
+
+    # Only events missing from the database are downloaded, cards that have not happened yet are left for the upcoming scraper
+    new_fights = [fight for fight in scrape_new_fights(known_event_urls, latest_event_date, events_url, **fetcher_options) if fight.is_completed]
+
+    # Only the fighters who fought on the new cards need their profile and record refreshed
+    profile_urls = {
+        url
+        for fight in new_fights
+        for url in (fight.red_profile_url, fight.blue_profile_url)
+        if url
+    }
+    fighters = scrape_fighters(profile_urls, **fetcher_options)
+
+    # Fighters go in first so the new fights can be matched to their ids
+    with DatabaseManager(db_path) as db:
+        db.upsert_fighters(fighters)
+        db.bulk_insert_fights(new_fights)
+
+    return {
+        "events": len({fight.event_url for fight in new_fights}),
+        "fights": len(new_fights),
+        "fighters": len(fighters),
+    }
+
+if __name__ == "__main__":
+    from Database.migrations import migrate
+    from Fight_Predictor.Prediction_Cache import refresh_prediction_cache
+
+    # The fighters are saved with their typed columns, so the schema is brought up to date first
+    migrate()
+    # Every page is archived so the parsers can be rerun later without downloading again
+    print(incremental_scrape(archive=PageArchive()))
+    # The new fights change the fighters histories, so the cached predictions are rebuilt
+    refresh_prediction_cache()
@@ -0,0 +1,100 @@
+import sqlite3
+import os
+import zlib
+import datetime
+from contextlib import contextmanager
+
+from config.config import PAGE_ARCHIVE_PATH
+
+
+# keeps the raw html of every downloaded page zlib compressed in its own sqlite file, keyed by url,
+# along with when it was fetched and the ETag / Last-Modified the server sent. the fetcher uses the
+# validators for conditional requests and the parsers can be rerun over the archive without the network
+class PageArchive:
+    TABLE = "pages"
+
+    def __init__(self, archive_path: str = PAGE_ARCHIVE_PATH):
+        self.archive_path = archive_path
+
+    # a connection that commits when the block ends and is closed afterwards
+    @contextmanager
+    def connect(self):
+        os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+        conn = sqlite3.connect(self.archive_path)
+        try:
+            with conn:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                        url TEXT PRIMARY KEY,
+                        html BLOB NOT NULL,
+                        fetched_at TEXT NOT NULL,
+                        etag TEXT,
+                        last_modified TEXT
+                    )
+                """)
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, url: str, html: str, etag: str | None = None, last_modified: str | None = None):
+        with self.connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} (url, html, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (url, zlib.compress(html.encode('utf-8')), self.now(), etag, last_modified)
+            )
+
+    def get(self, url: str) -> dict | None:
+        with self.connect() as conn:
+            row = conn.execute(
+                f"SELECT html, fetched_at, etag, last_modified FROM {self.TABLE} WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        return {"html": decompress(row[0]), "fetched_at": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def touch(self, url: str):
+        # the server said the page has not changed, so only the fetch time moves on
+        with self.connect() as conn:
+            conn.execute(f"UPDATE {self.TABLE} SET fetched_at = ? WHERE url = ?", (self.now(), url))
+
+    def get_validators(self, url: str) -> dict:
+        # the headers for a conditional request, empty when the page has never been archived
+        with self.connect() as conn:
+            row = conn.execute(f"SELECT etag, last_modified FROM {self.TABLE} WHERE url = ?", (url,)).fetchone()
+
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def get_urls(self, url_like: str | None = None) -> list[str]:
+        query = f"SELECT url FROM {self.TABLE}"
+        params = []
+        if url_like is not None:
+            query += " WHERE url LIKE ?"
+            params.append(url_like)
+
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute(query + " ORDER BY url", params)]
+
+    def iter_compressed(self, url_like: str | None = None):
+        # the pages still compressed, so they are cheap to hand to worker processes
+        query = f"SELECT url, html FROM {self.TABLE}"
+        params = []
+        if url_like is not None:
+            query += " WHERE url LIKE ?"
+            params.append(url_like)
+
+        with self.connect() as conn:
+            yield from conn.execute(query + " ORDER BY url", params)
+
+    @staticmethod
+    def now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+def decompress(html: bytes) -> str:
+    return zlib.decompress(html).decode('utf-8')
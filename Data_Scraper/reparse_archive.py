@@ -0,0 +1,76 @@
+# Reruns the page parsers over the archived html, so a parser fix does not mean downloading the whole site again
+import argparse
+import concurrent.futures
+
+from bs4 import BeautifulSoup
+
+from config.config import DB_PATH, PAGE_ARCHIVE_PATH
+from Database.database_manager import DatabaseManager
+from Data_Scraper.page_archive import PageArchive, decompress
+from Data_Scraper.fight_scraper import parse_event_page
+from Data_Scraper.fighter_scraper import parse_fighter_page
+from Models.DB_Classes.Fighters import Fighter
+
+# Which archived pages each kind of parse reads, matched with sqlite LIKE on the url
+URL_PATTERNS = {
+    "fights": "%/event-details/%",
+    "fighters": "%/fighter-details/%",
+}
+
+# Runs in a worker process, the page arrives compressed so less is copied between processes
+def parse_archived_page(kind: str, url: str, html: bytes) -> list:
+    soup = BeautifulSoup(decompress(html), 'html.parser')
+    if kind == "fights":
+        return parse_event_page(soup, url)
+    return [Fighter(parse_fighter_page(soup, url))]
+
+# Saves re-parsed pages over what the database holds, fighters are matched on their profile_url
+# and each re-parsed event has its fights swapped for the new ones
+def write_reparsed(kind: str, results: list, db_path: str = DB_PATH):
+    with DatabaseManager(db_path) as db:
+        if kind == "fighters":
+            db.upsert_fighters(results)
+        else:
+            # cards that have not happened yet are left for the upcoming scraper, like the incremental scrape
+            db.replace_event_fights([fight for fight in results if fight.is_completed])
+
+def reparse_archive(kind: str, url_like: str | None = None, archive_path: str = PAGE_ARCHIVE_PATH, max_workers: int | None = None,
+                    write: bool = False, db_path: str = DB_PATH) -> list:
+    if kind not in URL_PATTERNS:
+        raise ValueError(f"Unknown page kind '{kind}', use one of {list(URL_PATTERNS)}.")
+
+    pages = list(PageArchive(archive_path).iter_compressed(url_like or URL_PATTERNS[kind]))
+    print(f"Re-parsing {len(pages)} archived {kind} pages...")
+    if not pages:
+        return []
+
+    # Parsing is pure CPU work, so the pages are spread over a pool of processes
+    urls = [url for url, _ in pages]
+    htmls = [html for _, html in pages]
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for parsed in executor.map(parse_archived_page, [kind] * len(pages), urls, htmls, chunksize=16):
+            results.extend(parsed)
+
+    print(f"Re-parsed {len(results)} {kind}.")
+    if write:
+        write_reparsed(kind, results, db_path)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse the archived scraper pages without the network.")
+    parser.add_argument("kind", choices=list(URL_PATTERNS))
+    parser.add_argument("--url-like", default=None, help="sqlite LIKE pattern for the urls to re-parse")
+    parser.add_argument("--archive", default=PAGE_ARCHIVE_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--write", action="store_true", help="save the re-parsed rows over the ones in the database")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.write:
+        from Database.migrations import migrate
+
+        # The fighters are saved with their typed columns, so the schema is brought up to date first
+        migrate(args.db)
+    reparse_archive(args.kind, args.url_like, args.archive, args.workers, write=args.write, db_path=args.db)
@@ -1,22 +1,13 @@
-# Import libraries for making web requests, parsing HTML, and handling dates
-import requests 
+# Import libraries for parsing HTML and handling dates
 from bs4 import BeautifulSoup
-import requests
+from urllib.parse import urljoin
 import datetime
 
-# Download the webpage and convert it into a searchable BeautifulSoup object
-def fetch_url(url: str) -> BeautifulSoup | None:
-    try:
-        # Define headers to mimic a real browser and avoid being blocked
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status() # Check for successful HTTP status
-        return BeautifulSoup(response.text, 'html.parser')
-    except requests.RequestException as e:
-        # Print error and return nothing if the request fails
-        print(f"Error fetching {url}: {e}")
-        return None
-    
+# Downloads go through the shared pooled fetcher used by every scraper
+from Data_Scraper.fetcher import fetch_url, fetch_urls
+
+EVENTS_URL = 'http://ufcstats.com/statistics/events/upcoming?page=all'
+
 # Extract fighter names and event info from a single table row
 def parse_fight_row(row, event_date):
     try:
@@ -45,7 +36,11 @@ def scrape_event_page(url):
     print(f"Scraping event: {url}")
     soup = fetch_url(url)
     if not soup: return []
-    
+
+    return parse_event_page(soup)
+
+# Pulls the date and every scheduled bout out of an event page that has already been downloaded
+def parse_event_page(soup: BeautifulSoup):
     # Locate the date text in the info box and convert it to SQL format (YYYY-MM-DD)
     fight_date_obj, fight_date_sql = None, None
     try:
@@ -67,22 +62,22 @@ def scrape_event_page(url):
     return all_fights
     
 # Find all upcoming event links and trigger the scraping process for each
-def scrape_all_fights():
+def scrape_all_fights(events_url: str = EVENTS_URL, **fetcher_options):
     # URL specifically for scheduled future events
-    events_url = 'http://ufcstats.com/statistics/events/upcoming?page=all'
     print(f"Fetching all event URLs from {events_url}")
-    soup = fetch_url(events_url)
+    soup = fetch_url(events_url, **fetcher_options)
     if not soup: return []
     
     # Collect every event link found on the summary page
-    event_urls = {tag['href'] for tag in soup.select('tr.b-statistics__table-row a')}
+    event_urls = sorted({urljoin(events_url, tag['href']) for tag in soup.select('tr.b-statistics__table-row a')})
     print(f"Found {len(event_urls)} total event URLs.")
     all_historical_fights = []
     
-    # Visit each event URL one by one and gather fight data
-    for url in event_urls:
-        fights_from_event = scrape_event_page(url)
-        all_historical_fights.extend(fights_from_event)
+    # Download every event page concurrently and gather fight data
+    for url, event_soup in zip(event_urls, fetch_urls(event_urls, **fetcher_options)):
+        if not event_soup: continue
+        print(f"Scraping event: {url}")
+        all_historical_fights.extend(parse_event_page(event_soup))
 
     return all_historical_fights
     
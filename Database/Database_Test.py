@@ -0,0 +1,345 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import shutil
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Database.fight_history_index import FightHistoryIndex, get_history_index
+from Database.connection_pool import enable_wal, get_pool, close_pool
+from Database.user_manager import UserManager
+from Database.migrations import MIGRATIONS, migrate
+from Database.reconcile_votes import reconcile_votes
+
+class TestFightHistoryIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            cls.fights_df = db.get_fights_df()
+        cls.index = FightHistoryIndex(cls.fights_df)
+
+    def test_matches_sql_history(self):
+        sample = self.fights_df.sample(15, random_state=3)
+
+        for _, fight in sample.iterrows():
+            fighter_ids = [int(fight['red_fighter_id']), int(fight['blue_fighter_id'])]
+            with DatabaseManager(DB_PATH, read_only=True) as db:
+                expected = db.get_fighter_history(fighter_ids, fight['event_date'])
+
+            actual = self.index.get_fighter_history(fighter_ids, fight['event_date'])
+            self.assertEqual(sorted(actual['fight_id']), sorted(expected['fight_id']))
+
+    def test_strictly_before_date(self):
+        fight = self.fights_df.iloc[len(self.fights_df) // 2]
+        history = self.index.get_fighter_history([int(fight['red_fighter_id'])], fight['event_date'])
+
+        self.assertTrue((history['event_date'] < fight['event_date']).all())
+        self.assertNotIn(fight['fight_id'], history['fight_id'].values)
+
+    def test_history_is_in_date_order(self):
+        fighter_id = int(self.fights_df['red_fighter_id'].mode()[0])
+        history = self.index.get_fighter_history([fighter_id])
+
+        self.assertTrue(history['event_date'].is_monotonic_increasing)
+
+    def test_fighter_arrays_split_own_and_opponent(self):
+        fight = self.fights_df.iloc[len(self.fights_df) // 2]
+        fighter_id = int(fight['blue_fighter_id'])
+
+        history = self.index.get_fighter_history([fighter_id], fight['event_date'])
+        arrays = self.index.get_fighter_arrays(fighter_id, fight['event_date'])
+
+        is_red = (history['red_fighter_id'] == fighter_id).values
+        np.testing.assert_array_equal(arrays["is_red"], is_red)
+        np.testing.assert_array_equal(arrays["strikes_absorbed"], np.where(is_red, history['blue_sig_strikes'], history['red_sig_strikes']))
+        np.testing.assert_array_equal(arrays["elo_before"], np.where(is_red, history['red_fighter_elo_before'], history['blue_fighter_elo_before']))
+        np.testing.assert_array_equal(arrays["won"], (history['winner_id'] == fighter_id).values)
+        np.testing.assert_array_equal(arrays["dates"], pd.to_datetime(history['event_date']).values)
+
+        empty = self.index.get_fighter_arrays(-1, "2030-01-01")
+        self.assertEqual(len(empty["dates"]), 0)
+
+    def test_unknown_fighter_is_empty(self):
+        history = self.index.get_fighter_history([-1], "2030-01-01")
+
+        self.assertTrue(history.empty)
+        self.assertEqual(list(history.columns), list(self.fights_df.columns))
+
+class TestHistoryIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "fighters.db")
+        shutil.copy(DB_PATH, self.db_path)
+        migrate(self.db_path)
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def test_rebuilt_after_fights_change(self):
+        index = get_history_index(self.db_path)
+        self.assertIs(get_history_index(self.db_path), index)
+
+        # a scrape adding a fight moves the data version, so the next lookup sees it
+        with DatabaseManager(self.db_path) as db:
+            db.cursor.execute("SELECT MAX(fight_id) FROM fights")
+            fight_id = db.cursor.fetchone()[0] + 1
+            db.cursor.execute("INSERT INTO fights (fight_id, red_fighter_id, blue_fighter_id, event_date) VALUES (?, 1, 2, '2030-01-01')", (fight_id,))
+            db.bump_data_version()
+
+        rebuilt = get_history_index(self.db_path)
+        self.assertIsNot(rebuilt, index)
+        self.assertIn(fight_id, rebuilt.get_fighter_history([1], "2031-01-01")['fight_id'].values)
+
+# runs in a forked worker, reporting how many connections its pool held before it read anything
+def count_in_worker(db_path):
+    inherited_conns = len(get_pool(db_path).conns)
+    with DatabaseManager(db_path, read_only=True) as db:
+        votes = db.cursor.execute("SELECT COUNT(*) FROM upcoming_votes").fetchone()[0]
+    return inherited_conns, votes
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "pool.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE upcoming_votes (fight_id INTEGER, user_id INTEGER, vote INTEGER, PRIMARY KEY (fight_id, user_id))")
+            conn.execute("CREATE TABLE upcoming (id INTEGER PRIMARY KEY, red_vote INTEGER DEFAULT 0, blue_vote INTEGER DEFAULT 0, draw_vote INTEGER DEFAULT 0)")
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def count_votes(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            return db.cursor.execute("SELECT COUNT(*) FROM upcoming_votes").fetchone()[0]
+
+    def test_pragmas(self):
+        # opening a connection leaves the files journal mode alone, only enable_wal changes it
+        with DatabaseManager(self.db_path) as db:
+            self.assertEqual(db.cursor.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        close_pool(self.db_path)
+        enable_wal(self.db_path)
+
+        with DatabaseManager(self.db_path) as db:
+            self.assertEqual(db.cursor.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(db.cursor.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(db.cursor.execute("PRAGMA cache_size").fetchone()[0], -64 * 1024)
+
+    def test_read_connection_is_reused_per_thread(self):
+        with DatabaseManager(self.db_path, read_only=True) as first:
+            conn = first.conn
+        with UserManager(self.db_path, read_only=True) as second:
+            self.assertIs(second.conn, conn)
+
+        other = []
+        def read():
+            with DatabaseManager(self.db_path, read_only=True) as db:
+                other.append(db.conn)
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_read_only_refuses_writes(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with DatabaseManager(self.db_path, read_only=True) as db:
+                db.vote(1, 1, 0)
+
+    def test_writer_commits_or_rolls_back(self):
+        with DatabaseManager(self.db_path) as db:
+            db.vote(1, 1, 0)
+        self.assertEqual(self.count_votes(), 1)
+
+        with self.assertRaises(RuntimeError):
+            with DatabaseManager(self.db_path) as db:
+                db.vote(2, 1, 0)
+                raise RuntimeError("request failed")
+        self.assertEqual(self.count_votes(), 1)
+
+    def test_concurrent_votes_and_reads(self):
+        errors = []
+        def vote(user_id):
+            try:
+                with DatabaseManager(self.db_path) as db:
+                    db.vote(1, user_id, user_id % 2)
+                self.count_votes()
+            except sqlite3.Error as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=vote, args=(user_id,)) for user_id in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.count_votes(), 40)
+
+    def test_open_writer_does_not_block_other_writers(self):
+        started, release = threading.Event(), threading.Event()
+        def long_job():
+            # a job that has only read so far holds no write lock
+            with DatabaseManager(self.db_path) as db:
+                db.cursor.execute("SELECT COUNT(*) FROM upcoming").fetchone()
+                started.set()
+                release.wait(5)
+        thread = threading.Thread(target=long_job)
+        thread.start()
+        started.wait(5)
+
+        start = time.perf_counter()
+        with DatabaseManager(self.db_path) as db:
+            db.vote(1, 1, 0)
+        self.assertLess(time.perf_counter() - start, 1)
+        release.set()
+        thread.join()
+        self.assertEqual(self.count_votes(), 1)
+
+    def test_worker_process_starts_with_fresh_pool(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("SELECT 1")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as executor:
+            inherited_conns, votes = executor.submit(count_in_worker, self.db_path).result()
+
+        self.assertEqual(inherited_conns, 0)
+        self.assertEqual(votes, 0)
+
+    def test_close_reconnects(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            conn = db.conn
+        get_pool(self.db_path).close()
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            self.assertIsNot(db.conn, conn)
+            self.assertEqual(db.cursor.execute("SELECT COUNT(*) FROM upcoming_votes").fetchone()[0], 0)
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "fighters.db")
+        shutil.copy(DB_PATH, self.db_path)
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def get_indexes(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")
+            return {row[0] for row in db.cursor.fetchall()}
+
+    def test_applies_each_migration_once(self):
+        self.assertEqual(migrate(self.db_path), [version for version, _, _ in MIGRATIONS])
+        self.assertEqual(migrate(self.db_path), [])
+
+        self.assertTrue({"idx_fights_red_fighter_date", "idx_fights_blue_fighter_date", "idx_fights_event_date",
+                         "idx_fights_fighter_pair", "idx_upcoming_red_fighter", "idx_upcoming_blue_fighter"} <= self.get_indexes())
+
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM fights WHERE red_fighter_id = 1 OR blue_fighter_id = 1")
+            plan = " ".join(row[-1] for row in db.cursor.fetchall())
+        self.assertIn("idx_fights_red_fighter_date", plan)
+
+    def test_backfilled_fighter_numbers_match_the_strings(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            parsed = db.get_fighters()
+        migrate(self.db_path)
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            stored = db.get_fighters()
+
+        # fighters read before the migration parse their strings, after it they read the stored columns
+        columns = ["height_cm", "reach_cm", "dob_ordinal", "wins", "losses", "draws"]
+        self.assertEqual([[getattr(f, c) for c in columns] for f in parsed],
+                         [[getattr(f, c) for c in columns] for f in stored])
+        self.assertTrue(all(f.wins + f.losses + f.draws > 0 for f in stored if f.record != "Record: 0-0-0"))
+
+    def test_write_bumps_the_data_version_once(self):
+        migrate(self.db_path)
+        with DatabaseManager(self.db_path) as db:
+            version = db.get_ratings_version()
+            fighters = db.get_fighters()
+            db.update_quality_scores({f.id: 1.0 for f in fighters})
+            self.assertEqual(db.get_ratings_version(), version + 1)
+
+    def test_failed_migration_is_rolled_back(self):
+        broken = MIGRATIONS[:1] + [(2, "broken", [
+            "CREATE INDEX idx_broken ON fights (red_fighter_id)",
+            "CREATE INDEX idx_broken_again ON missing_table (id)",
+        ])]
+
+        with self.assertRaises(sqlite3.OperationalError):
+            migrate(self.db_path, broken)
+
+        self.assertNotIn("idx_broken", self.get_indexes())
+        self.assertEqual(migrate(self.db_path), [version for version, _, _ in MIGRATIONS[1:]])
+
+class TestVoteCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "fighters.db")
+        shutil.copy(DB_PATH, self.db_path)
+        with DatabaseManager(self.db_path) as db:
+            db.cursor.execute("SELECT id FROM upcoming ORDER BY id LIMIT 2")
+            self.fight_id, self.other_fight_id = [row[0] for row in db.cursor.fetchall()]
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def get_totals(self, fight_id):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("SELECT red_vote, blue_vote, draw_vote FROM upcoming WHERE id = ?", (fight_id,))
+            return tuple(db.cursor.fetchone())
+
+    def test_vote_updates_only_its_fight(self):
+        red, blue, draw = self.get_totals(self.fight_id)
+        other = self.get_totals(self.other_fight_id)
+
+        with DatabaseManager(self.db_path) as db:
+            db.vote(self.fight_id, -100, 0)
+            db.vote(self.fight_id, -101, 2)
+        self.assertEqual(self.get_totals(self.fight_id), (red + 1, blue, draw + 1))
+        self.assertEqual(self.get_totals(self.other_fight_id), other)
+
+        # changing a vote moves it between counters, voting the same way again changes nothing
+        with DatabaseManager(self.db_path) as db:
+            db.vote(self.fight_id, -100, 1)
+            db.vote(self.fight_id, -101, 2)
+        self.assertEqual(self.get_totals(self.fight_id), (red, blue + 1, draw + 1))
+
+        self.assertEqual(reconcile_votes(self.db_path), 0)
+
+    def test_vote_is_parameterised(self):
+        user_id = "1); DELETE FROM upcoming_votes; --"
+        with DatabaseManager(self.db_path) as db:
+            db.vote(self.fight_id, user_id, 0)
+
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("SELECT COUNT(*) FROM upcoming_votes")
+            self.assertGreater(db.cursor.fetchone()[0], 1)
+            db.cursor.execute("SELECT vote FROM upcoming_votes WHERE user_id = ?", (user_id,))
+            self.assertEqual(db.cursor.fetchone()[0], 0)
+
+    def test_reconcile_fixes_drift(self):
+        expected = self.get_totals(self.fight_id)
+        with DatabaseManager(self.db_path) as db:
+            db.cursor.execute("UPDATE upcoming SET red_vote = red_vote + 5, draw_vote = NULL WHERE id = ?", (self.fight_id,))
+
+        self.assertEqual(reconcile_votes(self.db_path), 1)
+        self.assertEqual(self.get_totals(self.fight_id), expected)
+
+if __name__ == '__main__':
+    unittest.main()
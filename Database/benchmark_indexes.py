@@ -0,0 +1,94 @@
+# Times the hot fight queries on a copy of the shipped database before and after the migrations,
+# printing each query plan alongside, run with: python -m Database.benchmark_indexes
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.connection_pool import close_pool
+from Database.database_manager import DatabaseManager
+from Database.migrations import migrate
+
+def get_benchmarks(db: DatabaseManager) -> dict:
+    # the busiest fighter and pair in the table, so every lookup has real rows to return
+    fights = db.get_fights_df()
+    fighter_id = int(pd.concat([fights['red_fighter_id'], fights['blue_fighter_id']]).mode()[0])
+    pair = fights[['red_fighter_id', 'blue_fighter_id']].dropna().astype(int)
+    pair = pair.apply(lambda row: (min(row), max(row)), axis=1).mode()[0]
+    date = fights['event_date'].max()
+    upcoming_id = db.cursor.execute("SELECT red_fighter_id FROM upcoming LIMIT 1").fetchone()
+    upcoming_id = upcoming_id[0] if upcoming_id else fighter_id
+
+    return {
+        "get_fighter_history": lambda: db.get_fighter_history([fighter_id, pair[1]], date),
+        "get_past_fights": lambda: db.get_past_fights(fighter_id),
+        "get_fight_by_fighter_id": lambda: db.get_fight_by_fighter_id(fighter_id),
+        "get_rivalry_fights": lambda: db.get_rivalry_fights(*pair),
+        "get_recent_fights": lambda: db.get_recent_fights(20),
+        "get_active_rivalries": lambda: db.get_active_rivalries(),
+        "get_upcoming_by_fighter_id": lambda: db.get_upcoming_by_fighter_id(upcoming_id),
+    }
+
+def get_plans(db: DatabaseManager, benchmarks: dict) -> dict:
+    # the manager methods run their sql straight away, so the statements are traced and explained afterwards
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+
+    plans = {}
+    try:
+        for name, run in benchmarks.items():
+            statements.clear()
+            run()
+            query = next(statement for statement in statements if statement.lstrip().upper().startswith(("SELECT", "WITH")))
+            plans[name] = [row[-1] for row in db.conn.execute("EXPLAIN QUERY PLAN " + query)]
+    finally:
+        db.conn.set_trace_callback(None)
+    return plans
+
+def time_queries(benchmarks: dict, repeats: int) -> dict:
+    timings = {}
+    for name, run in benchmarks.items():
+        run()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            run()
+        timings[name] = (time.perf_counter() - start) / repeats * 1000
+    return timings
+
+def measure(db_path: str, repeats: int) -> tuple[dict, dict]:
+    with DatabaseManager(db_path, read_only=True) as db:
+        benchmarks = get_benchmarks(db)
+        timings = time_queries(benchmarks, repeats)
+        plans = get_plans(db, benchmarks)
+
+    # the pooled connection caches its statements and their plans, so each measurement starts on a fresh one
+    close_pool(db_path)
+    return timings, plans
+
+def run_benchmark(db_path: str = DB_PATH, repeats: int = 50) -> pd.DataFrame:
+    # the shipped database is left untouched, the migrations run on a copy
+    with tempfile.TemporaryDirectory() as temp_dir:
+        copy_path = os.path.join(temp_dir, "benchmark.db")
+        shutil.copy(db_path, copy_path)
+
+        before, before_plans = measure(copy_path, repeats)
+        migrate(copy_path)
+        after, after_plans = measure(copy_path, repeats)
+
+    for name in before:
+        print(f"\n{name}")
+        print(f"  before: {' | '.join(before_plans[name])}")
+        print(f"  after:  {' | '.join(after_plans[name])}")
+
+    results = pd.DataFrame({"before_ms": before, "after_ms": after})
+    results["speedup"] = results["before_ms"] / results["after_ms"]
+    print()
+    print(results.round(3).to_string())
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
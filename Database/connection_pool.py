@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Shared sqlite connections for every manager class, so a request checks a connection out
+# instead of paying for a new connect each time. Each thread keeps its own read connection
+# and its own write connection. Sqlite only takes its write lock when a transaction first
+# writes and drops it on commit, so a long job that is reading never holds up other writers,
+# and a writer waiting on another one retries for busy_timeout. Once the server has switched
+# the database to WAL with enable_wal, readers never block the writer or each other either.
+class ConnectionPool:
+    PRAGMAS = {
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        # negative is in KiB, so 64MB of page cache per connection
+        "cache_size": -64 * 1024,
+    }
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.conns = []
+        # bumped by close so threads notice their connections have gone
+        self.generation = 0
+
+    def connect(self) -> sqlite3.Connection:
+        # connections are only ever used by one thread at a time, but close may run on another
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma, value in self.PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def get_conn(self, role: str) -> sqlite3.Connection:
+        # each thread opens its own connection for each role the first time it needs one
+        if getattr(self.local, f"{role}_generation", None) != self.generation:
+            conn = self.connect()
+            if role == "reader":
+                # a write through a read connection is a bug, make sqlite refuse it
+                conn.execute("PRAGMA query_only = ON")
+            else:
+                self.local.writer_depth = 0
+            with self.lock:
+                self.conns.append(conn)
+            setattr(self.local, role, conn)
+            setattr(self.local, f"{role}_generation", self.generation)
+        return getattr(self.local, role)
+
+    @contextmanager
+    def reader(self):
+        conn = self.get_conn("reader")
+        try:
+            yield conn
+        finally:
+            # a refused write can leave a transaction open, which would pin the next reads to an old snapshot
+            if conn.in_transaction:
+                conn.rollback()
+
+# the writer commits when the outermost block ends and rolls back if it raised,
+# a nested checkout on the same thread shares the outer transaction
+    @contextmanager
+    def writer(self, foreign_keys: bool = False):
+        conn = self.get_conn("writer")
+        if self.local.writer_depth == 0:
+            conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+
+        self.local.writer_depth += 1
+        try:
+            yield conn
+        except BaseException:
+            if self.local.writer_depth == 1:
+                conn.rollback()
+            raise
+        else:
+            if self.local.writer_depth == 1:
+                conn.commit()
+        finally:
+            self.local.writer_depth -= 1
+
+    def close(self):
+        with self.lock:
+            for conn in self.conns:
+                conn.close()
+            self.conns = []
+            self.generation += 1
+
+
+# switches a database to WAL, which is stored in the file so it only needs doing once per
+# deployment, the server does it at start up rather than every connection changing the file
+def enable_wal(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+pools = {}
+pools_lock = threading.Lock()
+
+def get_pool(db_path: str) -> ConnectionPool:
+    # one pool per database file, however the path was written
+    key = os.path.abspath(db_path)
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(key)
+        return pools[key]
+
+def close_pool(db_path: str):
+    with pools_lock:
+        pool = pools.pop(os.path.abspath(db_path), None)
+    if pool is not None:
+        pool.close()
+
+# connections opened before a fork belong to the parent, so a worker process starts with no pools.
+# The inherited ones are kept but never used, closing them in the child could checkpoint the parents WAL
+forked_pools = []
+
+def reset_after_fork():
+    global pools_lock
+    forked_pools.extend(pools.values())
+    pools.clear()
+    pools_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=reset_after_fork)
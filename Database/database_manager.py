@@ -1,31 +1,37 @@
 from multiprocessing import allow_connection_pickling
 import sqlite3
 import pandas as pd
+from datetime import datetime
 from typing import Optional, List
 
 from Models.DB_Classes.Fighters import Fighter
 from Models.DB_Classes.Fight import Fight
+from Database.connection_pool import get_pool
  
-# Initialize the class with the path to your SQLite database file
+# Initialize the class with the path to your SQLite database file,
+# read_only blocks use the threads pooled read connection instead of waiting for the writer
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.conn = None
         self.cursor = None
 
-    # Open the database connection automatically when using the 'with' statement
+    # Check a connection out of the shared pool automatically when using the 'with' statement
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path)
-        # Set row_factory to Row so we can access columns by name like a dictionary
-        self.conn.row_factory = sqlite3.Row
+        pool = get_pool(self.db_path)
+        self.checkout = pool.reader() if self.read_only else pool.writer()
+        # The pooled connections use Row so we can access columns by name like a dictionary
+        self.conn = self.checkout.__enter__()
         self.cursor = self.conn.cursor()
         return self
 
-    # Save changes and close the connection when the 'with' block ends
+    # Save changes and hand the connection back when the 'with' block ends
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.conn:
-            self.conn.commit()
-            self.conn.close()
+            self.cursor.close()
+            self.conn = None
+            return self.checkout.__exit__(exc_type, exc_val, exc_tb)
             
     # Run a SQL query and turn the raw rows into a list of clean dictionaries
     def format_web_query(self, query):
@@ -53,6 +59,7 @@ class DatabaseManager:
         for table in tables:
             self.cursor.execute(f"DELETE FROM {table}")
             print(f"Table {table} cleared successfully.")
+        self.bump_data_version()
 
 
     def bulk_insert_fighters(self, fighters: list[Fighter]):
@@ -68,11 +75,57 @@ class DatabaseManager:
             INSERT OR IGNORE INTO fighters (
                 Name, Nickname, Height, Weight, Reach, Stance, 
                 Record, DOB, profile_url, elo_rating, 
-                rating_deviation, rating_volatility
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                rating_deviation, rating_volatility,
+                height_cm, reach_cm, dob_ordinal, wins, losses, draws
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, data_to_insert)
 
         print(f"Finished inserting fighters. Processed {self.cursor.rowcount} new rows.")
+        self.bump_data_version()
+
+    def upsert_fighters(self, fighters: list[Fighter]):
+        # Adds new fighters and refreshes the profile details of known ones, matched on profile_url.
+        # Ratings, quality scores and styles belong to the rating runs so they are left alone
+        if not fighters:
+            print("No fighters to refresh.")
+            return
+
+        data_to_insert = [fighter.to_tuple_for_insert() for fighter in fighters]
+
+        self.cursor.executemany("""
+            INSERT INTO fighters (
+                Name, Nickname, Height, Weight, Reach, Stance, 
+                Record, DOB, profile_url, elo_rating, 
+                rating_deviation, rating_volatility,
+                height_cm, reach_cm, dob_ordinal, wins, losses, draws
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(profile_url) DO UPDATE SET
+                Name = excluded.Name,
+                Nickname = excluded.Nickname,
+                Height = excluded.Height,
+                Weight = excluded.Weight,
+                Reach = excluded.Reach,
+                Stance = excluded.Stance,
+                Record = excluded.Record,
+                DOB = excluded.DOB,
+                height_cm = excluded.height_cm,
+                reach_cm = excluded.reach_cm,
+                dob_ordinal = excluded.dob_ordinal,
+                wins = excluded.wins,
+                losses = excluded.losses,
+                draws = excluded.draws
+        """, data_to_insert)
+
+        print(f"Refreshed {len(data_to_insert)} fighter profiles.")
+        self.bump_data_version()
+
+    def get_scraped_event_urls(self) -> set[str]:
+        self.cursor.execute("SELECT DISTINCT event_url FROM fights WHERE event_url IS NOT NULL")
+        return {row['event_url'] for row in self.cursor.fetchall()}
+
+    def get_latest_event_date(self) -> str | None:
+        self.cursor.execute("SELECT MAX(event_date) AS latest FROM fights")
+        return self.cursor.fetchone()['latest']
 
     def bulk_insert_fights(self, fights: List[Fight]):
         if not fights:
@@ -108,15 +161,31 @@ class DatabaseManager:
                         final_time_seconds,
                         event_date,
                         event_url,
-                        is_completed,
-                        red_elo,
-                        blue_elo
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        is_completed
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, data_to_insert)
         
         print(f"Finished inserting fights. Processed {self.cursor.rowcount} new rows.")
+        self.bump_data_version()
         
         
+    def replace_event_fights(self, fights: List[Fight]):
+        # Swaps the stored fights of every event in fights for these ones, all in one transaction
+        # so a failed insert leaves the old rows in place
+        event_urls = sorted({fight.event_url for fight in fights if fight.event_url})
+        if not event_urls:
+            print("No event fights to replace.")
+            return
+
+        if not self.conn.in_transaction:
+            self.cursor.execute("BEGIN IMMEDIATE")
+
+        placeholders = ",".join("?" * len(event_urls))
+        self.cursor.execute(f"DELETE FROM fights WHERE event_url IN ({placeholders})", event_urls)
+        print(f"Removed {self.cursor.rowcount} stored fights from {len(event_urls)} events.")
+
+        self.bulk_insert_fights(fights)
+
     def bulk_insert_upcoming_fights(self, upcoming_fights: List[dict]):
         if not upcoming_fights:
             print("No upcoming fights to insert.")
@@ -234,8 +303,33 @@ class DatabaseManager:
                 quality_score = ?
             WHERE id = ?
         """, update_data)
+        self.bump_data_version()
         
 
+    def update_fighter_ratings(self, glicko_players: dict):
+        # Only the rating columns, so quality scores from the last ranking run are kept
+        update_data = [
+            (player.rating, player.rating_deviation, player.volatility, fighter_id)
+            for fighter_id, player in glicko_players.items()
+        ]
+
+        self.cursor.executemany("""
+            UPDATE fighters 
+            SET elo_rating = ?, 
+                rating_deviation = ?, 
+                rating_volatility = ?
+            WHERE id = ?
+        """, update_data)
+        self.bump_data_version()
+
+    def update_quality_scores(self, quality_scores: dict):
+        # Only the quality column, the rating engine has already written the ratings
+        self.cursor.executemany(
+            "UPDATE fighters SET quality_score = ? WHERE id = ?",
+            [(quality_score, fighter_id) for fighter_id, quality_score in quality_scores.items()]
+        )
+        self.bump_data_version()
+
     def reset_fighter_ratings(self):
         default_rating = 1500.0
         default_rd = 350.0
@@ -247,6 +341,7 @@ class DatabaseManager:
                 rating_deviation  = ?,
                 rating_volatility = ?
             """, (default_rating, default_rd, default_volatility))
+        self.bump_data_version()
 
     def save_fight_elos(self, fight_snapshots: list):
         self.cursor.executemany("""
@@ -258,13 +353,14 @@ class DatabaseManager:
                 blue_fighter_elo_after = ?
             WHERE fight_id = ?
         """, fight_snapshots)
+        self.bump_data_version()
 
     def get_fighter_history(self, fighter_ids: list[int], date: str):
         placeholders = ",".join("?" * len(fighter_ids))
 
         query = f"""
             SELECT * FROM fights
-                WHERE red_fighter_id IN ({placeholders}) OR blue_fighter_id IN ({placeholders})
+                WHERE (red_fighter_id IN ({placeholders}) OR blue_fighter_id IN ({placeholders}))
                 AND event_date < ? 
             ORDER BY event_date ASC
         """
@@ -275,6 +371,13 @@ class DatabaseManager:
 
         return df
 
+    def get_fights_df(self) -> pd.DataFrame:
+        query = """
+            SELECT * FROM fights ORDER BY event_date ASC
+        """
+
+        return pd.read_sql(query, self.conn)
+
     def get_fighter_by_id(self, fighter_id: int):
         query = f"""
             SELECT * FROM fighters WHERE id = ?
@@ -322,6 +425,18 @@ class DatabaseManager:
                                 """, update_data)
 
         print(f"-> Successfully updated styles for {self.cursor.rowcount} records.")
+        self.bump_data_version()
+
+    def get_job_watermark(self, name: str) -> int | None:
+        self.cursor.execute("SELECT last_fight_id FROM job_watermarks WHERE name = ?", (name,))
+        row = self.cursor.fetchone()
+        return row['last_fight_id'] if row else None
+
+    def set_job_watermark(self, name: str, last_fight_id: int):
+        self.cursor.execute("""
+            INSERT INTO job_watermarks (name, last_fight_id, ran_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET last_fight_id = excluded.last_fight_id, ran_at = excluded.ran_at
+        """, (name, last_fight_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
 
     def get_fighter_styles(self, fighter_ids: list[int]) -> dict:
         if not fighter_ids:
@@ -432,6 +547,47 @@ class DatabaseManager:
         return self.format_web_query(query)
     
     
+    def bump_data_version(self, name: str = 'ratings'):
+        # called once by every method that writes fighters or fights, so a job moves the version once rather than per row
+        try:
+            self.cursor.execute("UPDATE data_versions SET version = version + 1 WHERE name = ?", (name,))
+        except sqlite3.OperationalError as e:
+            # a database from before the prediction cache migration has nothing to bump
+            if "no such table" not in str(e):
+                raise
+
+    def get_ratings_version(self) -> int:
+        # bumped by bump_data_version after each write to fighters or fights
+        self.cursor.execute("SELECT version FROM data_versions WHERE name = 'ratings'")
+        return self.cursor.fetchone()['version']
+
+    def get_cached_prediction(self, red_fighter_id, blue_fighter_id, event_date, model_version: str) -> str | None:
+        # one indexed lookup, only a row made with this model on the current ratings counts as a hit
+        self.cursor.execute("""
+            SELECT c.response
+            FROM upcoming u
+            JOIN data_versions v ON v.name = 'ratings'
+            JOIN prediction_cache c
+                ON c.upcoming_id = u.id
+                AND c.model_version = ?
+                AND c.ratings_version = v.version
+            WHERE u.red_fighter_id = ? AND u.blue_fighter_id = ? AND u.event_date = ?
+        """, (model_version, red_fighter_id, blue_fighter_id, event_date))
+        row = self.cursor.fetchone()
+        return row['response'] if row else None
+
+    def save_predictions(self, predictions: list[tuple[int, str]], model_version: str, ratings_version: int):
+        # predictions are (upcoming id, response json), rows for any older model or ratings are dropped
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.cursor.execute(
+            "DELETE FROM prediction_cache WHERE model_version != ? OR ratings_version != ?",
+            (model_version, ratings_version)
+        )
+        self.cursor.executemany("""
+            INSERT OR REPLACE INTO prediction_cache (upcoming_id, model_version, ratings_version, response, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(upcoming_id, model_version, ratings_version, response, created_at) for upcoming_id, response in predictions])
+
     def get_upcoming_fights(self) -> dict | None:
         query = f"""
             SELECT
@@ -464,37 +620,37 @@ class DatabaseManager:
         self.cursor.execute(query, (fight_id,))
         return self.cursor.fetchone()[0]
     
-    def update_upcoming_vote_totals(self):
+    def reconcile_vote_totals(self) -> int:
         """
-        Syncs the vote totals from 'upcoming_votes' back to the
-        'upcoming' table.
+        Recounts the vote totals on every 'upcoming' row from 'upcoming_votes'
+        and fixes any that have drifted, returns how many rows were wrong.
         """
         query = """
             UPDATE upcoming
             SET
-                red_vote = (
-                    SELECT COUNT(*)
-                    FROM upcoming_votes
-                    WHERE fight_id = upcoming.id AND vote = 0
-                ),
-                blue_vote = (
-                    SELECT COUNT(*)
-                    FROM upcoming_votes
-                    WHERE fight_id = upcoming.id AND vote = 1
-                ),
-                draw_vote = (
-                    SELECT COUNT(*)
-                    FROM upcoming_votes
-                    WHERE fight_id = upcoming.id AND vote = 2
-                )
+                red_vote = totals.red_vote,
+                blue_vote = totals.blue_vote,
+                draw_vote = totals.draw_vote
+            FROM (
+                SELECT
+                    u.id,
+                    COUNT(CASE WHEN v.vote = 0 THEN 1 END) AS red_vote,
+                    COUNT(CASE WHEN v.vote = 1 THEN 1 END) AS blue_vote,
+                    COUNT(CASE WHEN v.vote = 2 THEN 1 END) AS draw_vote
+                FROM upcoming u
+                LEFT JOIN upcoming_votes v ON v.fight_id = u.id
+                GROUP BY u.id
+            ) AS totals
             WHERE
-                EXISTS (
-                    SELECT 1
-                    FROM upcoming_votes
-                    WHERE fight_id = upcoming.id
+                upcoming.id = totals.id
+                AND (
+                    upcoming.red_vote IS NOT totals.red_vote
+                    OR upcoming.blue_vote IS NOT totals.blue_vote
+                    OR upcoming.draw_vote IS NOT totals.draw_vote
                 );
         """
         self.cursor.execute(query)
+        return self.cursor.rowcount
         
     def check_vote(self, user_id, fight_id):
         query = f"""
@@ -503,10 +659,31 @@ class DatabaseManager:
         return self.format_web_query(query)
     
     def vote(self, fight_id, user_id, vote):
-        query = f"""
-            INSERT INTO upcoming_votes (user_id, fight_id, vote) VALUES ({user_id}, {fight_id}, {vote})
-        """
-        self.cursor.execute(query)
+        # A user voting again changes their vote, so the old one comes off the fights counter and the new one goes on.
+        # Only this fights row is touched, in the same transaction as the vote itself, which takes the write
+        # lock before reading the old vote so a second vote from the same user waits for this one to finish
+        if not self.conn.in_transaction:
+            self.cursor.execute("BEGIN IMMEDIATE")
+        self.cursor.execute("SELECT vote FROM upcoming_votes WHERE fight_id = ? AND user_id = ?", (fight_id, user_id))
+        previous = self.cursor.fetchone()
+        old_vote = previous['vote'] if previous else None
+        if old_vote == vote:
+            return
+
+        self.cursor.execute("""
+            INSERT INTO upcoming_votes (user_id, fight_id, vote) VALUES (?, ?, ?)
+            ON CONFLICT(fight_id, user_id) DO UPDATE SET vote = excluded.vote
+        """, (user_id, fight_id, vote))
+
+        # 0 is red, 1 is blue and 2 is a draw, a comparison is 1 when it matches so each counter moves by at most one
+        self.cursor.execute("""
+            UPDATE upcoming
+            SET
+                red_vote = COALESCE(red_vote, 0) + (:new = 0) - (:old IS 0),
+                blue_vote = COALESCE(blue_vote, 0) + (:new = 1) - (:old IS 1),
+                draw_vote = COALESCE(draw_vote, 0) + (:new = 2) - (:old IS 2)
+            WHERE id = :fight_id
+        """, {"new": vote, "old": old_vote, "fight_id": fight_id})
         
     def get_past_fights(self, fighter_id):            
                 query = f"""
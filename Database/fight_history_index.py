@@ -0,0 +1,120 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+
+# An in memory index of every fighters fights, built once from the fights table.
+# Each fighter gets a sorted array of row positions and fight dates, so a
+# "fights before this date" lookup is a binary search instead of a table scan.
+class FightHistoryIndex:
+    STAT_COLUMNS = [
+        'red_fighter_id', 'blue_fighter_id', 'winner_id',
+        'red_fighter_elo_before', 'blue_fighter_elo_before',
+        'red_sig_strikes', 'blue_sig_strikes',
+        'red_takedowns', 'blue_takedowns',
+        'final_round', 'final_time_seconds',
+    ]
+
+    def __init__(self, fights_df: pd.DataFrame):
+        # Sort the same way get_fighter_history does so rows on the same date keep the database order
+        self.fights = fights_df.sort_values(['event_date', 'fight_id'], kind='stable').reset_index(drop=True)
+        self.dates = pd.to_datetime(self.fights['event_date']).values
+
+        # The numbers the Fight_Context calculators read, pulled out of the frame once as float arrays
+        self.columns = {
+            column: self.fights[column].to_numpy(dtype=float)
+            for column in self.STAT_COLUMNS
+        }
+        self.is_finish = self.fights['win_method'].str.contains('KO|SUB', na=False).to_numpy()
+
+        self.positions = {}
+        self.fighter_dates = {}
+
+        # Put both corners of every fight into one long list of (fighter, row) pairs
+        rows = np.arange(len(self.fights))
+        fighter_ids = np.concatenate([self.fights['red_fighter_id'].values, self.fights['blue_fighter_id'].values])
+        row_positions = np.concatenate([rows, rows])
+
+        known = ~pd.isna(fighter_ids)
+        fighter_ids = fighter_ids[known].astype(np.int64)
+        row_positions = row_positions[known]
+
+        # Group the rows by fighter, keeping each fighters rows in date order
+        order = np.lexsort((row_positions, fighter_ids))
+        fighter_ids = fighter_ids[order]
+        row_positions = row_positions[order]
+
+        unique_ids, starts = np.unique(fighter_ids, return_index=True)
+        for fighter_id, fighter_rows in zip(unique_ids, np.split(row_positions, starts[1:])):
+            self.positions[int(fighter_id)] = fighter_rows
+            self.fighter_dates[int(fighter_id)] = self.dates[fighter_rows]
+
+    def get_fight_positions(self, fighter_id: int, date = None) -> np.ndarray:
+        positions = self.positions.get(int(fighter_id))
+        if positions is None:
+            return np.array([], dtype=np.int64)
+
+        if date is None:
+            return positions
+
+        # Binary search for the first fight on or after the cut off date
+        cutoff = np.searchsorted(self.fighter_dates[int(fighter_id)], pd.Timestamp(date).to_datetime64(), side='left')
+        return positions[:cutoff]
+
+    def get_fighter_arrays(self, fighter_id: int, date = None) -> dict:
+        # One fighters fights strictly before the date, oldest first, with each stat split into
+        # the fighters own number and their opponents depending on which corner they were in
+        positions = self.get_fight_positions(fighter_id, date)
+        columns = self.columns
+        is_red = columns['red_fighter_id'][positions] == fighter_id
+
+        def own(red_column, blue_column):
+            return np.where(is_red, columns[red_column][positions], columns[blue_column][positions])
+
+        return {
+            "is_red": is_red,
+            "dates": self.dates[positions],
+            "elo_before": own('red_fighter_elo_before', 'blue_fighter_elo_before'),
+            "strikes_absorbed": own('blue_sig_strikes', 'red_sig_strikes'),
+            "takedowns_absorbed": own('blue_takedowns', 'red_takedowns'),
+            "won": columns['winner_id'][positions] == fighter_id,
+            "is_finish": self.is_finish[positions],
+            "final_round": columns['final_round'][positions],
+            "fight_minutes": columns['final_time_seconds'][positions] / 60,
+        }
+
+    def get_fighter_history(self, fighter_ids: list[int], date = None) -> pd.DataFrame:
+        # All fights of any of the fighters strictly before the date, oldest first
+        fighter_positions = [self.get_fight_positions(fighter_id, date) for fighter_id in fighter_ids]
+        rows = np.unique(np.concatenate(fighter_positions)) if fighter_positions else []
+
+        return self.fights.iloc[rows].reset_index(drop=True)
+
+
+_history_indexes = {}
+
+def get_data_version(db_path: str):
+    # The ratings version moves with every write to the fights, a database from before
+    # the prediction cache migration has no version and its index is built once
+    with DatabaseManager(db_path, read_only=True) as db:
+        try:
+            return db.get_ratings_version()
+        except sqlite3.OperationalError:
+            return None
+
+def get_history_index(db_path: str = DB_PATH, refresh: bool = False) -> FightHistoryIndex:
+    # Builds the index for a database the first time it is asked for, then reuses it until
+    # a scrape or ratings run changes the fights, so a long running server never reads stale history
+    version = get_data_version(db_path)
+    cached = _history_indexes.get(db_path)
+
+    if refresh or cached is None or cached[0] != version:
+        with DatabaseManager(db_path, read_only=True) as db:
+            fights_df = db.get_fights_df()
+
+        _history_indexes[db_path] = (version, FightHistoryIndex(fights_df))
+
+    return _history_indexes[db_path][1]
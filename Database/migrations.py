@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from utils.Fighter_Parser import parse_fighter_numbers
+
+# fills the typed fighter columns from the raw strings already stored
+def backfill_fighter_numbers(db: DatabaseManager):
+    db.cursor.execute("SELECT id, Height, Reach, DOB, Record FROM fighters")
+    rows = db.cursor.fetchall()
+    db.cursor.executemany(
+        "UPDATE fighters SET height_cm = ?, reach_cm = ?, dob_ordinal = ?, wins = ?, losses = ?, draws = ? WHERE id = ?",
+        [(*parse_fighter_numbers(height, reach, dob, record), fighter_id) for fighter_id, height, reach, dob, record in rows]
+    )
+
+# Every schema change in the order it is applied. Each migration runs once in its own
+# transaction and its version is recorded in schema_migrations, so running the list
+# again only applies what the database has not seen yet. New changes go on the end.
+# A step is either sql or a function given the manager, for changes sql cannot parse.
+MIGRATIONS = [
+    (1, "fighter and date indexes on fights", [
+        # the fighter history, past fights and rivalry lookups search each corner then read in date order
+        "CREATE INDEX IF NOT EXISTS idx_fights_red_fighter_date ON fights (red_fighter_id, event_date)",
+        "CREATE INDEX IF NOT EXISTS idx_fights_blue_fighter_date ON fights (blue_fighter_id, event_date)",
+        # the most recent fights are read off the end of this instead of sorting the table
+        "CREATE INDEX IF NOT EXISTS idx_fights_event_date ON fights (event_date)",
+    ]),
+    (2, "fighter pair index on fights", [
+        # covers the rivalry grouping, which counts fights per pair whichever corner each fighter was in
+        "CREATE INDEX IF NOT EXISTS idx_fights_fighter_pair ON fights (MIN(red_fighter_id, blue_fighter_id), MAX(red_fighter_id, blue_fighter_id))",
+    ]),
+    (3, "fighter indexes on upcoming", [
+        "CREATE INDEX IF NOT EXISTS idx_upcoming_red_fighter ON upcoming (red_fighter_id)",
+        "CREATE INDEX IF NOT EXISTS idx_upcoming_blue_fighter ON upcoming (blue_fighter_id)",
+    ]),
+    (4, "planner statistics", [
+        # lets sqlite pick between the corner indexes and a scan from real row counts
+        "ANALYZE",
+    ]),
+    (5, "prediction cache", [
+        # a counter the DatabaseManager write methods bump once per write to the fighters or fights, see bump_data_version,
+        # cached predictions are only valid for the value they were made at
+        "CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('ratings', 1)",
+        """
+        CREATE TABLE IF NOT EXISTS prediction_cache (
+            upcoming_id INTEGER NOT NULL,
+            model_version TEXT NOT NULL,
+            ratings_version INTEGER NOT NULL,
+            response TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (upcoming_id, model_version, ratings_version)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (6, "job watermarks", [
+        # the newest fight a batch job has seen, so the next run can pick up only what came after it
+        """
+        CREATE TABLE IF NOT EXISTS job_watermarks (
+            name TEXT PRIMARY KEY,
+            last_fight_id INTEGER NOT NULL,
+            ran_at TEXT NOT NULL
+        )
+        """,
+    ]),
+    (7, "typed fighter columns", [
+        # the height, reach, date of birth and record parsed once instead of on every matchup
+        "ALTER TABLE fighters ADD COLUMN height_cm REAL",
+        "ALTER TABLE fighters ADD COLUMN reach_cm REAL",
+        "ALTER TABLE fighters ADD COLUMN dob_ordinal INTEGER",
+        "ALTER TABLE fighters ADD COLUMN wins INTEGER",
+        "ALTER TABLE fighters ADD COLUMN losses INTEGER",
+        "ALTER TABLE fighters ADD COLUMN draws INTEGER",
+        backfill_fighter_numbers,
+    ]),
+]
+
+def get_schema_version(db: DatabaseManager) -> int:
+    db.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    db.cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    return db.cursor.fetchone()[0] or 0
+
+# Applies every migration newer than the databases version and returns the versions applied
+def migrate(db_path: str = DB_PATH, migrations: list = MIGRATIONS) -> list[int]:
+    with DatabaseManager(db_path) as db:
+        current_version = get_schema_version(db)
+
+    applied = []
+    for version, name, statements in migrations:
+        if version <= current_version:
+            continue
+
+        # One transaction per migration, a failing statement leaves the database on the last good version
+        with DatabaseManager(db_path) as db:
+            db.cursor.execute("BEGIN")
+            for statement in statements:
+                if callable(statement):
+                    statement(db)
+                else:
+                    db.cursor.execute(statement)
+            db.cursor.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+
+        print(f"Applied migration {version}: {name}")
+        applied.append(version)
+
+    return applied
+
+
+if __name__ == "__main__":
+    migrate()
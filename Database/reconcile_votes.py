@@ -0,0 +1,16 @@
+# Periodic job that recounts the upcoming vote totals from the individual votes, run from a scheduler
+# with: python -m Database.reconcile_votes. Votes keep the counters up to date themselves, this only
+# fixes drift, such as votes removed or edited by hand
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+
+def reconcile_votes(db_path: str = DB_PATH) -> int:
+    with DatabaseManager(db_path) as db:
+        fixed = db.reconcile_vote_totals()
+
+    print(f"Reconciled vote totals, {fixed} upcoming fights had drifted.")
+    return fixed
+
+
+if __name__ == "__main__":
+    reconcile_votes()
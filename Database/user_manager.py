@@ -3,27 +3,31 @@ import pandas as pd
 from typing import Optional, List
 
 from config.config import DB_PATH
+from Database.connection_pool import get_pool
 
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 from Models.DB_Classes.User import User
 class UserManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.conn = None
         self.cursor = None
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        pool = get_pool(self.db_path)
+        self.checkout = pool.reader() if self.read_only else pool.writer()
+        self.conn = self.checkout.__enter__()
         self.cursor = self.conn.cursor()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.conn:
-            self.conn.commit()
-            self.conn.close()
+            self.cursor.close()
+            self.conn = None
+            return self.checkout.__exit__(exc_type, exc_val, exc_tb)
             
     def create_user(self, first_name: str, last_name: str, email: str, plain_text_password: str) -> Optional[int]:
 
@@ -67,22 +71,24 @@ class UserManager:
     
     
 class CommunityManager:    
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=DB_PATH, read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.conn = None
         self.cursor = None
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.execute("PRAGMA foreign_keys = ON;")
-        self.conn.row_factory = sqlite3.Row
+        pool = get_pool(self.db_path)
+        self.checkout = pool.reader() if self.read_only else pool.writer(foreign_keys=True)
+        self.conn = self.checkout.__enter__()
         self.cursor = self.conn.cursor()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.conn:
-            self.conn.commit()
-            self.conn.close()
+            self.cursor.close()
+            self.conn = None
+            return self.checkout.__exit__(exc_type, exc_val, exc_tb)
 
 
     def create_community(self, name: str, fight_id: int, creator_user_id: int) -> Optional[int]:
@@ -1,9 +1,8 @@
 import pandas as pd
 import numpy as np
-import joblib
 
-# Import the file path for the saved LabelEncoder or OneHotEncoder
-from config.config import DOMINANCE_ENCODER_PATH
+# Import the registry that holds the saved OneHotEncoder
+from utils.model_registry import model_registry
 
 # Define a function to calculate performance gaps between the winner and the loser
 def create_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -59,9 +58,9 @@ def prep_features(df: pd.DataFrame) -> pd.DataFrame:
     # Clean up the win_method text by taking only the name and not the web formatted version the multipul /n s 
     df['win_method_clean'] = df['win_method'].str.split('\n').str[0]
 
-    # Load the encoder to turn text categories into numbers the AI understands
-    encoder = joblib.load(DOMINANCE_ENCODER_PATH)
-    encoded_df = encoder.transform(df['win_method_clean'])
+    # Get the loaded encoder to turn text categories into numbers the AI understands, one byte per flag over the whole fight table
+    encoder = model_registry.get("dominance_encoder")
+    encoded_df = encoder.transform(df['win_method_clean'], dtype=np.int8)
     
     # Combine the  stats and the encoded win method into one  dataset
     final_features = pd.concat([features, encoded_df], axis=1)
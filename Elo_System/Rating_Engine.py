@@ -0,0 +1,172 @@
+import os
+import joblib
+import pandas as pd
+
+from config.config import DB_PATH, RATING_CHECKPOINT_PATH
+from Database.database_manager import DatabaseManager
+from Models.Functional_Classes.Glicko2.GlickoCalculator import GlickoCalculator
+from Models.Functional_Classes.Glicko2.GlickoFighter import GlickoFighter
+from utils.dominance_prediction import dominance_prediction
+
+
+# Keeps every fighters Glicko-2 state as of the last fight it rated and saves it as a checkpoint,
+# so after a scrape only the fights it has not seen yet are rated and written back.
+# Fights are rated in date order, a new fight dated before the checkpoint means the
+# history changed underneath it, so everything is replayed from the start instead.
+class RatingEngine:
+    DEFAULT_RATING = 1500.0
+    DEFAULT_RD = 350.0
+    DEFAULT_VOLATILITY = 0.06
+
+    def __init__(self, checkpoint_path: str = RATING_CHECKPOINT_PATH):
+        self.checkpoint_path = checkpoint_path
+        self.calculator = GlickoCalculator()
+        self.reset()
+
+    def reset(self):
+        self.fighters = {}
+        self.rated_fight_ids = set()
+        self.last_fight = None
+
+    def load_checkpoint(self) -> bool:
+        if not os.path.exists(self.checkpoint_path):
+            self.reset()
+            return False
+
+        checkpoint = joblib.load(self.checkpoint_path)
+        self.fighters = {
+            fighter_id: GlickoFighter(rating, rating_deviation, volatility)
+            for fighter_id, (rating, rating_deviation, volatility) in checkpoint["fighters"].items()
+        }
+        self.rated_fight_ids = checkpoint["rated_fight_ids"]
+        self.last_fight = checkpoint["last_fight"]
+        return True
+
+    def save_checkpoint(self):
+        # plain tuples so the checkpoint does not depend on the GlickoFighter class layout
+        checkpoint = {
+            "fighters": {
+                fighter_id: (player.rating, player.rating_deviation, player.volatility)
+                for fighter_id, player in self.fighters.items()
+            },
+            "rated_fight_ids": self.rated_fight_ids,
+            "last_fight": self.last_fight,
+        }
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        joblib.dump(checkpoint, self.checkpoint_path)
+
+    def get_fighter(self, fighter_id) -> GlickoFighter:
+        if fighter_id not in self.fighters:
+            self.fighters[fighter_id] = GlickoFighter(self.DEFAULT_RATING, self.DEFAULT_RD, self.DEFAULT_VOLATILITY)
+        return self.fighters[fighter_id]
+
+    def calc_outcomes(self, red_id, blue_id, winner_id, dominance_score) -> tuple[float, float]:
+        # how dominant each fighter was, a draw or no contest is an even split
+        if winner_id == red_id:
+            outcome_red = min(1.0, dominance_score / 2.0)
+            return outcome_red, 1 - outcome_red
+        if winner_id == blue_id:
+            outcome_blue = min(1.0, dominance_score / 2.0)
+            return 1 - outcome_blue, outcome_blue
+        return 0.5, 0.5
+
+# rates the fights in date order and returns the before and after snapshot for each one
+    def apply_fights(self, fights: pd.DataFrame, fighter_ids: set) -> tuple[list, set]:
+        fights = fights.sort_values(['event_date', 'fight_id'], kind='stable')
+
+        # fights with an unknown fighter are never rated but still count as seen, so they do not look new next time
+        if not fights.empty:
+            self.rated_fight_ids.update(fights['fight_id'])
+            self.last_fight = max(self.last_fight or ('', -1), (fights['event_date'].iloc[-1], fights['fight_id'].iloc[-1]))
+        fights = fights[fights['red_fighter_id'].isin(fighter_ids) & fights['blue_fighter_id'].isin(fighter_ids)]
+
+        snapshots = []
+        changed_fighters = set()
+        if fights.empty:
+            return snapshots, changed_fighters
+
+        dominance_scores = dominance_prediction(fights.copy()).iloc[:, 0].values
+        fights = fights[['fight_id', 'event_date', 'red_fighter_id', 'blue_fighter_id', 'winner_id']]
+
+        for fight, dominance_score in zip(fights.itertuples(), dominance_scores):
+            red_fighter = self.get_fighter(fight.red_fighter_id)
+            blue_fighter = self.get_fighter(fight.blue_fighter_id)
+
+            # both fighters are rated against the other's state from before the fight
+            red_snapshot = GlickoFighter(red_fighter.rating, red_fighter.rating_deviation, red_fighter.volatility)
+            blue_snapshot = GlickoFighter(blue_fighter.rating, blue_fighter.rating_deviation, blue_fighter.volatility)
+
+            outcome_red, outcome_blue = self.calc_outcomes(fight.red_fighter_id, fight.blue_fighter_id, fight.winner_id, dominance_score)
+            self.calculator.rate_1vs1(red_fighter, blue_snapshot, outcome_red)
+            self.calculator.rate_1vs1(blue_fighter, red_snapshot, outcome_blue)
+
+            snapshots.append((
+                red_snapshot.rating,
+                red_fighter.rating,
+                blue_snapshot.rating,
+                blue_fighter.rating,
+                fight.fight_id,
+            ))
+            changed_fighters.update([fight.red_fighter_id, fight.blue_fighter_id])
+
+        return snapshots, changed_fighters
+
+    def ratings_as_of(self, fights: pd.DataFrame, fighter_ids: set, date: str) -> dict:
+        # a throwaway replay of the fights before the date for historical rankings, the checkpoint is left alone
+        engine = RatingEngine(self.checkpoint_path)
+        engine.apply_fights(fights[fights['event_date'] < date], fighter_ids)
+        return engine.fighters
+
+# works out which fights are new since the checkpoint and rates only those
+    def get_new_fights(self, fights: pd.DataFrame) -> tuple[pd.DataFrame, bool]:
+        new_fights = fights[~fights['fight_id'].isin(self.rated_fight_ids)]
+        if new_fights.empty or self.last_fight is None:
+            return new_fights, self.last_fight is None
+
+        # a new fight that sorts before the last rated one would have changed later ratings
+        last_date, last_fight_id = self.last_fight
+        needs_replay = (
+            (new_fights['event_date'] < last_date) |
+            ((new_fights['event_date'] == last_date) & (new_fights['fight_id'] < last_fight_id))
+        ).any()
+        return new_fights, needs_replay
+
+# the summary lists the fighter_ids it rewrote, so the steps after it only need to touch those
+    def update(self, db_path: str = DB_PATH) -> dict:
+        with DatabaseManager(db_path) as db:
+            fights = db.get_fights_df()
+            fighter_ids = set(db.get_fighter_ids()['id'])
+
+        self.load_checkpoint()
+        new_fights, needs_replay = self.get_new_fights(fights)
+
+        if needs_replay:
+            return self.rebuild(db_path, fights, fighter_ids)
+
+        snapshots, changed_fighters = self.apply_fights(new_fights, fighter_ids)
+        if snapshots:
+            with DatabaseManager(db_path) as db:
+                db.save_fight_elos(snapshots)
+                db.update_fighter_ratings({fighter_id: self.fighters[fighter_id] for fighter_id in changed_fighters})
+        if not new_fights.empty:
+            self.save_checkpoint()
+
+        return {"replayed": False, "fights_rated": len(snapshots), "fighters_updated": len(changed_fighters), "fighter_ids": sorted(changed_fighters)}
+
+    def rebuild(self, db_path: str = DB_PATH, fights: pd.DataFrame = None, fighter_ids: set = None) -> dict:
+        # rates every fight from default ratings and rewrites every fighter
+        if fights is None or fighter_ids is None:
+            with DatabaseManager(db_path) as db:
+                fights = db.get_fights_df()
+                fighter_ids = set(db.get_fighter_ids()['id'])
+
+        self.reset()
+        snapshots, changed_fighters = self.apply_fights(fights, fighter_ids)
+
+        with DatabaseManager(db_path) as db:
+            db.reset_fighter_ratings()
+            db.save_fight_elos(snapshots)
+            db.update_fighter_ratings({fighter_id: self.fighters[fighter_id] for fighter_id in changed_fighters})
+        self.save_checkpoint()
+
+        return {"replayed": True, "fights_rated": len(snapshots), "fighters_updated": len(changed_fighters), "fighter_ids": sorted(changed_fighters)}
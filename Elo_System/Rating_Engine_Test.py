@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+from config.config import DB_PATH
+from Elo_System.Rating_Engine import RatingEngine
+
+class TestRatingEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.incremental_db = os.path.join(self.temp_dir.name, "incremental.db")
+        self.full_db = os.path.join(self.temp_dir.name, "full.db")
+        shutil.copy(DB_PATH, self.incremental_db)
+        shutil.copy(DB_PATH, self.full_db)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_ratings(self, db_path):
+        with sqlite3.connect(db_path) as conn:
+            fighters = pd.read_sql("SELECT id, elo_rating, rating_deviation, rating_volatility FROM fighters ORDER BY id", conn)
+            fights = pd.read_sql("SELECT fight_id, red_fighter_elo_before, red_fighter_elo_after, blue_fighter_elo_before, blue_fighter_elo_after FROM fights ORDER BY fight_id", conn)
+        return fighters, fights
+
+    def test_incremental_matches_full_replay(self):
+        # hold back the latest event, rate everything before it, then add the event back
+        with sqlite3.connect(self.incremental_db) as conn:
+            last_date = conn.execute("SELECT MAX(event_date) FROM fights").fetchone()[0]
+            held_back = pd.read_sql("SELECT * FROM fights WHERE event_date = ?", conn, params=(last_date,))
+            conn.execute("DELETE FROM fights WHERE event_date = ?", (last_date,))
+
+        engine = RatingEngine(os.path.join(self.temp_dir.name, "incremental.pkl"))
+        self.assertTrue(engine.update(self.incremental_db)["replayed"])
+
+        with sqlite3.connect(self.incremental_db) as conn:
+            held_back.to_sql("fights", conn, if_exists="append", index=False)
+
+        result = RatingEngine(engine.checkpoint_path).update(self.incremental_db)
+        self.assertFalse(result["replayed"])
+        self.assertLessEqual(result["fights_rated"], len(held_back))
+        self.assertGreater(result["fights_rated"], 0)
+        self.assertEqual(len(result["fighter_ids"]), result["fighters_updated"])
+        self.assertLessEqual(set(result["fighter_ids"]), set(held_back['red_fighter_id']) | set(held_back['blue_fighter_id']))
+
+        RatingEngine(os.path.join(self.temp_dir.name, "full.pkl")).rebuild(self.full_db)
+
+        for incremental, full in zip(self.read_ratings(self.incremental_db), self.read_ratings(self.full_db)):
+            np.testing.assert_allclose(incremental.values.astype(float), full.values.astype(float), rtol=1e-9, equal_nan=True)
+
+    def test_no_new_fights_is_a_no_op(self):
+        engine = RatingEngine(os.path.join(self.temp_dir.name, "checkpoint.pkl"))
+        engine.rebuild(self.incremental_db)
+
+        result = RatingEngine(engine.checkpoint_path).update(self.incremental_db)
+        self.assertEqual(result, {"replayed": False, "fights_rated": 0, "fighters_updated": 0, "fighter_ids": []})
+
+    def test_back_dated_fight_forces_replay(self):
+        engine = RatingEngine(os.path.join(self.temp_dir.name, "checkpoint.pkl"))
+        engine.rebuild(self.incremental_db)
+
+        with sqlite3.connect(self.incremental_db) as conn:
+            old_fight = pd.read_sql("SELECT * FROM fights ORDER BY event_date LIMIT 1", conn)
+            old_fight['fight_id'] = conn.execute("SELECT MAX(fight_id) FROM fights").fetchone()[0] + 1
+            old_fight.to_sql("fights", conn, if_exists="append", index=False)
+
+        self.assertTrue(RatingEngine(engine.checkpoint_path).update(self.incremental_db)["replayed"])
+
+    def test_opponent_rated_from_pre_fight_state(self):
+        engine = RatingEngine(os.path.join(self.temp_dir.name, "checkpoint.pkl"))
+        fights = pd.DataFrame([{
+            "fight_id": 1, "red_fighter_id": 1, "blue_fighter_id": 2, "winner_id": 1, "event_date": "2020-01-01",
+            "win_method": "Decision - Unanimous", "final_round": 3, "final_time_seconds": 900,
+            "red_knockdowns": 0, "red_sig_strikes": 60, "red_takedowns": 2, "red_sub_attempts": 0,
+            "blue_knockdowns": 0, "blue_sig_strikes": 40, "blue_takedowns": 0, "blue_sub_attempts": 0,
+        }])
+        snapshots, changed = engine.apply_fights(fights, {1, 2})
+
+        self.assertEqual(changed, {1, 2})
+        self.assertEqual(snapshots[0][0], RatingEngine.DEFAULT_RATING)
+        self.assertEqual(snapshots[0][2], RatingEngine.DEFAULT_RATING)
+        # both sides start equal, so a correct snapshot moves them by the same amount in opposite directions
+        self.assertAlmostEqual(engine.fighters[1].rating - 1500, 1500 - engine.fighters[2].rating)
+        self.assertAlmostEqual(engine.fighters[1].rating_deviation, engine.fighters[2].rating_deviation)
+        self.assertLess(engine.fighters[1].rating_deviation, RatingEngine.DEFAULT_RD)
+
+    def test_outcomes(self):
+        engine = RatingEngine(os.path.join(self.temp_dir.name, "checkpoint.pkl"))
+
+        self.assertEqual(engine.calc_outcomes(1, 2, 1, 1.5), (0.75, 0.25))
+        self.assertEqual(engine.calc_outcomes(1, 2, 2, 3.0), (0.0, 1.0))
+        self.assertEqual(engine.calc_outcomes(1, 2, None, 1.5), (0.5, 0.5))
+
+if __name__ == '__main__':
+    unittest.main()
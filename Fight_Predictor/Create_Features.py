@@ -7,60 +7,20 @@ from tqdm import tqdm
 from config.config import DB_PATH
 
 from Database.database_manager import DatabaseManager
-from Fight_Predictor.Fight_Context import Fight_Context
+from Fight_Predictor.Feature_Store import Feature_Store
 
-def create_main_features():
+def create_main_features(refresh = False):
     #loading the fighters and past fights 
-    with DatabaseManager(DB_PATH) as db:
+    with DatabaseManager(DB_PATH, read_only=True) as db:
         fights = pd.DataFrame(db.get_fights())
         fighters = db.get_fighters()
-        
-    # creates a map of fighters with their id as a ket for faster lookups 
-    fighters_map = {f.id: f for f in fighters}
+        styles_map = db.get_fighter_styles([f.id for f in fighters])
+        data_version = db.get_ratings_version()
 
-    feature_df = []
-    
-    #counter for debugging purpsoes 
-    counter = 1
-
-    #loops through every fights and creates a fight context for it 
-    for _ , fight_row in fights.iterrows():
-        red_id = fight_row["red_fighter_id"]
-        blue_id = fight_row["blue_fighter_id"]
-        winner_id = fight_row["winner_id"]
-                
-        # if there is no winner or a draw then it will be skipped as the training data would be useless 
-        if pd.isna(red_id) or pd.isna(blue_id):
-            continue
-        if pd.isna(winner_id):
-            continue
-        
-        #gets the fighter info 
-        red_fighter = fighters_map.get(red_id)
-        blue_fighter = fighters_map.get(blue_id)
-        
-        if not red_fighter or not blue_fighter:
-            print(f"Missing fighter data for fight {fight_row['fight_id']}")
-            continue
-        
-        #instantiates the fight context class with the given data for the red and blue fighters to create final features
-        context = Fight_Context(red_fighter, blue_fighter, fight_row["event_date"], winner_id)
-        final_features = context.create_features()
-        
-        #appends this fights features in a row on the dataframe
-        feature_df.append(final_features)
-        
-        #due to the extremely long execution time I use this to show that the function is wokring 
-        print(f"fight row number {counter} loaded")
-        counter += 1
-
-
-        
-    feature_df = pd.DataFrame([ {k: np.squeeze(v) for k, v in f.items()} 
-                            for f in feature_df ])
-    
-    # stores the data for the final uses 
-    CACHE_PATH = './data/final_feature_set.feather'
-    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
-    feature_df.to_feather(CACHE_PATH)
+    # only the rows for new fights and the older fights of those fighters are rebuilt,
+    # plus the fighter columns of every row when ratings or styles have been rewritten since
+    store = Feature_Store()
+    updated_rows = store.update(fights, fighters, styles_map, refresh=refresh, data_version=data_version)
+    print(f"Feature store: {updated_rows} rows written.")
 
+    return store.get_features()
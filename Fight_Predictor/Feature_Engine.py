@@ -0,0 +1,290 @@
+import pandas as pd
+import numpy as np
+
+from Models.DB_Classes.Fighters import Fighter
+from Models.Functional_Classes.logistic_regression.style_features import encode_style_features
+from utils.dominance_prediction import dominance_prediction
+from utils.model_registry import model_registry
+
+
+# a batch version of Fight_Context that builds the features for every fight in one walk through time
+# rather than querying each fights history, it keeps a rolling state for every fighter and
+# reads a fighters numbers from that state just before each of their fights
+class Feature_Engine:
+    # bump whenever the feature code changes so stored feature rows get rebuilt
+    SCHEMA_VERSION = 1
+
+    FORM_WINDOW = 10
+    ACTIVITY_WINDOW = 6
+    TIME_CONSTANT = 365.0
+
+    def __init__(self, fights: pd.DataFrame, fighters: list[Fighter], styles_map: dict, fitted_encoders = None):
+        # sorts the fights the same way get_fighter_history does so ties on a date keep the database order
+        self.fights = fights.sort_values(['event_date', 'fight_id'], kind='stable').reset_index(drop=True)
+        self.fighters_map = {f.id: f for f in fighters}
+        self.styles_map = styles_map
+        self.fitted_encoders = fitted_encoders if fitted_encoders is not None else model_registry.get("style_encoders")
+
+        # rolling state for each fighter and each pair of fighters
+        self.fighter_state = {}
+        self.rivalry_state = {}
+
+    def new_fighter_state(self):
+        return {
+            "red_elos": [],
+            "dates": [],
+            "fight_count": 0,
+            "finish_score": 0.0,
+            "strikes_absorbed": 0,
+            "takedowns_absorbed": 0,
+            "fight_minutes": 0.0,
+        }
+
+# the same slope as Fight_Context.calc_form, which only looks at a fighters fights in the red corner
+    def calc_form(self, state) -> float:
+        elo_history = state["red_elos"][-self.FORM_WINDOW:]
+        if len(elo_history) < 2:
+            return 0.0
+
+        x_axis = np.arange(len(elo_history))
+        try:
+            slope, _ = np.polyfit(x_axis, elo_history, 1)
+        except(np.linalg.LinAlgError, TypeError):
+            slope = 0.0
+
+        return slope
+
+    def calc_fighter_activity(self, state) -> float:
+        fight_dates = state["dates"][-self.ACTIVITY_WINDOW:]
+        if len(fight_dates) < 2:
+            return 0.5
+
+        layoffs_in_days = np.diff(np.array(fight_dates, dtype='datetime64[D]')).astype(float)
+        return np.mean(np.exp(-layoffs_in_days / self.TIME_CONSTANT))
+
+    def calc_finishing_power(self, state) -> float:
+        if state["fight_count"] == 0:
+            return 0.0
+
+        return state["finish_score"] / state["fight_count"]
+
+    def calc_defensive_rating(self, state) -> dict:
+        if state["fight_count"] == 0:
+            return {"strikes_absorbed_per_min": 4.0, "takedowns_absorbed_per_min": 4.0}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            strikes_per_min = np.divide(state["strikes_absorbed"], state["fight_minutes"])
+            takedowns_per_min = np.divide(state["takedowns_absorbed"], state["fight_minutes"])
+
+        return {"strikes_absorbed_per_min": strikes_per_min, "takedowns_absorbed_per_min": takedowns_per_min}
+
+# weighted average of the past dominance between the two fighters, from the red fighters point of view
+    def calc_weighted_rivalry_dominance(self, red_id, blue_id) -> float:
+        past_meetings = self.rivalry_state.get((min(red_id, blue_id), max(red_id, blue_id)))
+        if not past_meetings:
+            return 0.0
+
+        adjusted_scores = []
+        for winner_id, base_dominance in past_meetings:
+            if winner_id == red_id:
+                adjusted_scores.append(base_dominance)
+            elif winner_id == blue_id:
+                adjusted_scores.append(-base_dominance)
+            else:
+                adjusted_scores.append(0.0)
+
+        num_fights = len(adjusted_scores)
+        weights = np.linspace(1.0, 1.5, num=num_fights) if num_fights > 1 else [1.0]
+
+        return np.average(adjusted_scores, weights=weights)
+
+# adds a finished fight to the rolling state of both fighters and their rivalry
+    def update_state(self, fight, dominance_score):
+        red_id = fight.red_fighter_id
+        blue_id = fight.blue_fighter_id
+        fight_minutes = fight.final_time_seconds / 60
+
+        corners = [
+            (red_id, fight.blue_sig_strikes, fight.blue_takedowns),
+            (blue_id, fight.red_sig_strikes, fight.red_takedowns),
+        ]
+        for fighter_id, strikes_absorbed, takedowns_absorbed in corners:
+            state = self.fighter_state.setdefault(fighter_id, self.new_fighter_state())
+
+            state["dates"].append(fight.event_date)
+            state["fight_count"] += 1
+            state["strikes_absorbed"] += strikes_absorbed
+            state["takedowns_absorbed"] += takedowns_absorbed
+            state["fight_minutes"] += fight_minutes
+
+            if fight.winner_id == fighter_id and fight.is_finish:
+                state["finish_score"] += 1 / fight.final_round
+
+        self.fighter_state[red_id]["red_elos"].append(fight.red_fighter_elo_before)
+
+        pair = (min(red_id, blue_id), max(red_id, blue_id))
+        self.rivalry_state.setdefault(pair, []).append((fight.winner_id, dominance_score))
+
+# walks every fight once in date order, reading the context features before the fights on a date are added
+# when fight_ids is given the state still walks every fight but rows are only built for those fights
+    def create_context_features(self, fights: pd.DataFrame, fight_ids = None) -> pd.DataFrame:
+        dominance_scores = dominance_prediction(fights.copy()).iloc[:, 0].values
+
+        walk = fights.assign(
+            is_finish = fights['win_method'].str.contains('KO|SUB', na=False),
+            dominance_score = dominance_scores
+        )
+
+        empty_state = self.new_fighter_state()
+        rows = []
+
+        for event_date, event_fights in walk.groupby('event_date', sort=True):
+            for fight in event_fights.itertuples():
+                if fight_ids is not None and fight.fight_id not in fight_ids:
+                    continue
+
+                red_state = self.fighter_state.get(fight.red_fighter_id, empty_state)
+                blue_state = self.fighter_state.get(fight.blue_fighter_id, empty_state)
+
+                red_defense = self.calc_defensive_rating(red_state)
+                blue_defense = self.calc_defensive_rating(blue_state)
+
+                rows.append({
+                    "fight_id": fight.fight_id,
+                    "form_diff": self.calc_form(red_state) - self.calc_form(blue_state),
+                    "average_rivalry_dominance": self.calc_weighted_rivalry_dominance(fight.red_fighter_id, fight.blue_fighter_id),
+                    "activity_diff": self.calc_fighter_activity(red_state) - self.calc_fighter_activity(blue_state),
+                    "finish_power_diff": self.calc_finishing_power(red_state) - self.calc_finishing_power(blue_state),
+                    "strikes_absorbed_diff": red_defense["strikes_absorbed_per_min"] - blue_defense["strikes_absorbed_per_min"],
+                    "takedowns_absorbed_diff": red_defense["takedowns_absorbed_per_min"] - blue_defense["takedowns_absorbed_per_min"],
+                })
+
+            # fights on the same date are never part of each others history
+            for fight in event_fights.itertuples():
+                self.update_state(fight, fight.dominance_score)
+
+        return pd.DataFrame(rows, columns=[
+            "fight_id", "form_diff", "average_rivalry_dominance", "activity_diff",
+            "finish_power_diff", "strikes_absorbed_diff", "takedowns_absorbed_diff",
+        ])
+
+# the Fighter_Parser features for every fight at once, using each fighters parsed details
+    def create_fighter_features(self, fights: pd.DataFrame) -> pd.DataFrame:
+        fighters_df = pd.DataFrame([
+            {
+                "id": f.id,
+                "height_cm": f.height_cm or 0.0,
+                "reach_cm": f.reach_cm or 0.0,
+                "dob_ordinal": f.dob_ordinal,
+                "wins": f.wins,
+                "losses": f.losses,
+                "draws": f.draws,
+            }
+            for f in self.fighters_map.values()
+        ]).set_index('id')
+        fighters_df['dob_ordinal'] = fighters_df['dob_ordinal'].astype(float)
+
+        red = fighters_df.loc[fights['red_fighter_id'].values]
+        blue = fighters_df.loc[fights['blue_fighter_id'].values]
+        # datetime64 days count from 1970-01-01, which is day 719163 as an ordinal
+        fight_ordinals = pd.to_datetime(fights['event_date']).values.astype('datetime64[D]').astype(np.int64) + 719163
+
+        # physical differences are only used when both fighters have the measurement
+        height_diff = np.where((red['height_cm'].values != 0) & (blue['height_cm'].values != 0),
+                               red['height_cm'].values - blue['height_cm'].values, 0)
+        reach_diff = np.where((red['reach_cm'].values != 0) & (blue['reach_cm'].values != 0),
+                              red['reach_cm'].values - blue['reach_cm'].values, 0)
+
+        # a missing date of birth is nan, which carries through to a missing age
+        age_red = (fight_ordinals - red['dob_ordinal'].values) / 365.25
+        age_blue = (fight_ordinals - blue['dob_ordinal'].values) / 365.25
+        has_both_ages = ~np.isnan(age_red) & ~np.isnan(age_blue) & (age_red != 0) & (age_blue != 0)
+        age_diff = np.where(has_both_ages, age_red - age_blue, 0)
+
+        # same bell curve as calc_gausian_age_prime, with 0.5 for a missing age
+        prime_red = np.where(np.isnan(age_red), 0.5, np.exp(-((age_red - 30.0) ** 2) / (2 * 4 ** 2)))
+        prime_blue = np.where(np.isnan(age_blue), 0.5, np.exp(-((age_blue - 30.0) ** 2) / (2 * 4 ** 2)))
+
+        red_total = (red['wins'] + red['losses'] + red['draws']).values
+        blue_total = (blue['wins'] + blue['losses'] + blue['draws']).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            red_win_percent = np.where(red_total > 0, red['wins'].values / red_total, 0)
+            blue_win_percent = np.where(blue_total > 0, blue['wins'].values / blue_total, 0)
+            red_loss_percent = np.where(red_total > 0, red['losses'].values / red_total, 0)
+            blue_loss_percent = np.where(blue_total > 0, blue['losses'].values / blue_total, 0)
+
+        return pd.DataFrame({
+            "experiance_diff": red_total - blue_total,
+            "win_proportion_diff": red_win_percent - blue_win_percent,
+            "loss_proportion_diff": red_loss_percent - blue_loss_percent,
+            "height_diff_cm": height_diff,
+            "reach_diff_cm": reach_diff,
+            "age_diff": age_diff,
+            "prime_score_diff": prime_red - prime_blue,
+        })
+
+# one hot encodes the style profiles of both fighters for every fight in one go
+    def create_style_features(self, fights: pd.DataFrame) -> pd.DataFrame:
+        model_data = {}
+        for side, column in [('1', 'red_fighter_id'), ('2', 'blue_fighter_id')]:
+            styles = [self.styles_map.get(fighter_id, {}) for fighter_id in fights[column]]
+            model_data[f'primary_{side}'] = [s.get('primary_style') for s in styles]
+            model_data[f'secondary_{side}'] = [s.get('secondary_style') for s in styles]
+            model_data[f'tertiary_{side}'] = [s.get('tertiary_attributes') for s in styles]
+
+        return encode_style_features(pd.DataFrame(model_data), self.fitted_encoders)
+
+# elo and quality score are read from each fighters current row, like Fight_Context does
+    def create_rating_features(self, fights: pd.DataFrame) -> pd.DataFrame:
+        red_elo = fights['red_fighter_id'].map(lambda i: self.fighters_map[i].elo_rating)
+        blue_elo = fights['blue_fighter_id'].map(lambda i: self.fighters_map[i].elo_rating)
+        red_quality = fights['red_fighter_id'].map(lambda i: self.fighters_map[i].quality_score)
+        blue_quality = fights['blue_fighter_id'].map(lambda i: self.fighters_map[i].quality_score)
+
+        return pd.DataFrame({
+            'elo_diff': (red_elo - blue_elo).values,
+            'quality_score_diff': (red_quality - blue_quality).values,
+        })
+
+# every feature taken from the fighters table rather than the fight history, these change whenever
+# ratings, records or styles are rewritten even though the fight itself has not
+    def create_fighter_state_features(self, fights: pd.DataFrame) -> pd.DataFrame:
+        return pd.concat([
+            self.create_fighter_features(fights),
+            self.create_rating_features(fights),
+            self.create_style_features(fights)
+        ], axis=1)
+
+# creates the same features as Fight_Context.create_features for every fight with a winner
+# or only for the fights in fight_ids, which is how the feature store refreshes a few rows
+    def create_features(self, fight_ids = None) -> pd.DataFrame:
+        self.fighter_state = {}
+        self.rivalry_state = {}
+
+        if fight_ids is not None:
+            fight_ids = set(fight_ids)
+
+        context_features = self.create_context_features(self.fights, fight_ids)
+
+        # only fights with both fighters known and a winner are used for training
+        training_fights = self.fights[
+            self.fights['red_fighter_id'].isin(self.fighters_map.keys()) &
+            self.fights['blue_fighter_id'].isin(self.fighters_map.keys()) &
+            self.fights['winner_id'].notna()
+        ]
+        if fight_ids is not None:
+            training_fights = training_fights[training_fights['fight_id'].isin(fight_ids)]
+        training_fights = training_fights.reset_index(drop=True)
+        context_features = context_features.set_index('fight_id').loc[training_fights['fight_id'].values].reset_index(drop=True)
+
+        X = pd.concat([
+            self.create_fighter_features(training_fights),
+            self.create_rating_features(training_fights),
+            context_features,
+            self.create_style_features(training_fights)
+        ], axis=1)
+
+        X['target'] = (training_fights['winner_id'] == training_fights['red_fighter_id']).astype(int).values
+        X.index = training_fights['fight_id'].values
+
+        return X
@@ -0,0 +1,295 @@
+import unittest
+import copy
+import os
+import json
+import shutil
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Fight_Predictor.Fight_Context import Fight_Context
+from Fight_Predictor.Feature_Engine import Feature_Engine
+from Fight_Predictor.Feature_Store import Feature_Store
+from Fight_Predictor.Prediction_Cache import predict_fight, refresh_prediction_cache
+from Database.connection_pool import close_pool
+from Database.migrations import migrate
+from Models.Functional_Classes.XGBoost.My_XGBoost import My_XGBoost_Regressor
+from Models.Functional_Classes.logistic_regression.style_features import encode_style_features, prep_style_features
+from Models.Functional_Classes.logistic_regression.style_matrix import build_style_matrix, ensure_style_matrix, get_style_matrix
+from utils.model_registry import model_registry
+
+class TestFeatureEngineParity(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            fights = pd.DataFrame(db.get_fights())
+            fighters = db.get_fighters()
+            styles_map = db.get_fighter_styles([f.id for f in fighters])
+
+        cls.fighters_map = {f.id: f for f in fighters}
+        cls.fights = fights[fights['winner_id'].notna()].set_index('fight_id')
+        cls.features = Feature_Engine(fights, fighters, styles_map).create_features()
+
+    def assert_matches_context(self, fight_ids):
+        for fight_id in fight_ids:
+            fight = self.fights.loc[fight_id]
+            context = Fight_Context(
+                self.fighters_map[fight['red_fighter_id']],
+                self.fighters_map[fight['blue_fighter_id']],
+                fight['event_date'],
+                fight['winner_id']
+            )
+            expected = context.create_features().iloc[0]
+            actual = self.features.loc[fight_id]
+
+            for col in self.features.columns:
+                self.assertTrue(
+                    np.isclose(float(np.squeeze(expected[col])), float(actual[col]), rtol=1e-9, atol=1e-9, equal_nan=True),
+                    f"{col} differs for fight {fight_id}: {expected[col]} vs {actual[col]}"
+                )
+
+    def test_same_columns_as_context(self):
+        fight_id = self.fights.index[0]
+        fight = self.fights.loc[fight_id]
+        context = Fight_Context(
+            self.fighters_map[fight['red_fighter_id']],
+            self.fighters_map[fight['blue_fighter_id']],
+            fight['event_date'],
+            fight['winner_id']
+        )
+        self.assertEqual(list(context.create_features().columns), list(self.features.columns))
+
+    def test_one_row_per_decided_fight(self):
+        self.assertEqual(len(self.features), len(self.fights))
+
+    def test_random_fights_match_context(self):
+        self.assert_matches_context(self.fights.sample(20, random_state=1).index)
+
+    def test_rematches_match_context(self):
+        pairs = self.fights.apply(lambda f: (min(f['red_fighter_id'], f['blue_fighter_id']), max(f['red_fighter_id'], f['blue_fighter_id'])), axis=1)
+        rematch_ids = self.fights[pairs.duplicated()].sample(10, random_state=0).index
+
+        self.assertTrue((self.features.loc[rematch_ids, 'average_rivalry_dominance'] != 0).any())
+        self.assert_matches_context(rematch_ids)
+
+class TestFeatureStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            cls.fights = pd.DataFrame(db.get_fights())
+            cls.fighters = db.get_fighters()
+            cls.styles_map = db.get_fighter_styles([f.id for f in cls.fighters])
+
+        cls.expected = Feature_Engine(cls.fights, cls.fighters, cls.styles_map).create_features()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = Feature_Store(os.path.join(self.temp_dir.name, "feature_store.db"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_matches_engine(self, stored):
+        expected = self.expected.loc[stored.index]
+        self.assertEqual(list(stored.columns), list(expected.columns))
+        np.testing.assert_allclose(stored.values.astype(float), expected.values.astype(float), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def test_incremental_update_matches_full_build(self):
+        last_date = self.fights['event_date'].max()
+        earlier_fights = self.fights[self.fights['event_date'] < last_date]
+
+        self.store.update(earlier_fights, self.fighters, self.styles_map, data_version=1)
+        new_fights = self.fights[self.fights['event_date'] == last_date]
+
+        written = self.store.update(self.fights, self.fighters, self.styles_map, data_version=1)
+        stored = self.store.get_features()
+
+        self.assertEqual(len(stored), len(self.expected))
+        self.assertLess(written, len(self.expected))
+        self.assertGreaterEqual(written, new_fights['winner_id'].notna().sum())
+        self.assert_matches_engine(stored)
+
+    def test_no_new_fights_writes_nothing(self):
+        self.store.update(self.fights, self.fighters, self.styles_map, data_version=1)
+
+        self.assertEqual(self.store.update(self.fights, self.fighters, self.styles_map, data_version=1), 0)
+
+    def test_new_data_version_rebuilds_fighter_columns(self):
+        self.store.update(self.fights, self.fighters, self.styles_map, data_version=1)
+
+        # a ratings run and a restyle rewrite fighters that have no new fights
+        fighters = [copy.copy(f) for f in self.fighters]
+        for fighter in fighters[:50]:
+            fighter.elo_rating += 100
+            fighter.quality_score += 1
+        styles_map = dict(self.styles_map)
+        for fighter in fighters[:50]:
+            styles_map[fighter.id] = {**styles_map.get(fighter.id, {}), 'primary_style': 'Striker'}
+        expected = Feature_Engine(self.fights, fighters, styles_map).create_features()
+
+        self.assertEqual(self.store.update(self.fights, fighters, styles_map, data_version=1), 0)
+        written = self.store.update(self.fights, fighters, styles_map, data_version=2)
+        stored = self.store.get_features()
+
+        self.assertEqual(written, len(expected))
+        np.testing.assert_allclose(stored.values.astype(float), expected.loc[stored.index].values.astype(float), rtol=1e-9, atol=1e-9, equal_nan=True)
+        self.assertEqual(self.store.update(self.fights, fighters, styles_map, data_version=2), 0)
+
+    def test_schema_version_change_rebuilds(self):
+        self.store.update(self.fights, self.fighters, self.styles_map)
+
+        original_version = Feature_Engine.SCHEMA_VERSION
+        Feature_Engine.SCHEMA_VERSION = original_version + 1
+        try:
+            with self.assertRaises(ValueError):
+                self.store.get_features()
+            written = self.store.update(self.fights, self.fighters, self.styles_map)
+        finally:
+            Feature_Engine.SCHEMA_VERSION = original_version
+
+        self.assertEqual(written, len(self.expected))
+
+class TestPredictionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "fighters.db")
+        shutil.copy(DB_PATH, self.db_path)
+        migrate(self.db_path)
+
+        # a few upcoming fights keep the batch quick
+        with DatabaseManager(self.db_path) as db:
+            db.cursor.execute("DELETE FROM upcoming WHERE id NOT IN (SELECT id FROM upcoming ORDER BY id LIMIT 3)")
+            self.upcoming = db.get_upcoming_fights()
+            self.fighters = {
+                fighter_id: db.get_fighter_by_id(fighter_id)
+                for fight in self.upcoming for fighter_id in (fight['red_fighter_id'], fight['blue_fighter_id'])
+            }
+
+        # a tiny booster trained on the upcoming fights own features stands in for the saved predictor
+        features = pd.concat([self.context(fight).create_features() for fight in self.upcoming])
+        self.model = My_XGBoost_Regressor(n_estimators=2, objective='logistic')
+        self.model.fit(features.values, np.array([1, 0, 1][:len(features)]))
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def context(self, fight):
+        return Fight_Context(self.fighters[fight['red_fighter_id']], self.fighters[fight['blue_fighter_id']], fight['event_date'])
+
+    def lookup(self, fight, model_version="v1"):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            cached = db.get_cached_prediction(fight['red_fighter_id'], fight['blue_fighter_id'], fight['event_date'], model_version)
+        return json.loads(cached) if cached is not None else None
+
+    def test_cache_matches_live_prediction(self):
+        self.assertEqual(refresh_prediction_cache(self.db_path, self.model, "v1"), len(self.upcoming))
+
+        for fight in self.upcoming:
+            cached = self.lookup(fight)
+            live = predict_fight(self.fighters[fight['red_fighter_id']], self.fighters[fight['blue_fighter_id']], fight['event_date'], self.model)
+
+            self.assertAlmostEqual(cached["prediction"], live["prediction"])
+            self.assertEqual(cached["red_fighter"]["name"], live["red_fighter"].name)
+            self.assertEqual(set(cached["features"]), set(live["features"]))
+
+    def test_new_model_or_ratings_miss(self):
+        refresh_prediction_cache(self.db_path, self.model, "v1")
+        fight = self.upcoming[0]
+
+        self.assertIsNone(self.lookup(fight, "v2"))
+
+        with DatabaseManager(self.db_path) as db:
+            db.cursor.execute("UPDATE fighters SET elo_rating = elo_rating + 10 WHERE id = ?", (fight['red_fighter_id'],))
+            db.bump_data_version()
+        self.assertIsNone(self.lookup(fight))
+
+        # the next batch replaces the stale rows
+        refresh_prediction_cache(self.db_path, self.model, "v1")
+        self.assertIsNotNone(self.lookup(fight))
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            db.cursor.execute("SELECT COUNT(*) FROM prediction_cache")
+            self.assertEqual(db.cursor.fetchone()[0], len(self.upcoming))
+
+class TestStyleMatrix(unittest.TestCase):
+
+    def setUp(self):
+        # the matrix is built into a temporary file so the saved one is left alone
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.original_path = model_registry.paths["style_matrix"]
+        model_registry.paths["style_matrix"] = os.path.join(self.temp_dir.name, "style_matrix.pkl")
+        self.style_matrix = build_style_matrix(model_registry.paths["style_matrix"])
+
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            fighters = db.get_fighters()
+        self.pairs = list(zip(fighters[:40:2], fighters[1:40:2]))
+
+    def tearDown(self):
+        model_registry.paths["style_matrix"] = self.original_path
+        model_registry.mtimes.pop("style_matrix", None)
+        self.temp_dir.cleanup()
+
+    def style_performance(self, red_fighter, blue_fighter):
+        context = Fight_Context(red_fighter, blue_fighter, "2024-01-01")
+        context.calc_style_performance()
+        return context.style_diff
+
+    def test_lookup_matches_style_model(self):
+        self.assertIs(get_style_matrix(), model_registry.get("style_matrix"))
+        style_model = model_registry.get("style_model")
+
+        for red_fighter, blue_fighter in self.pairs:
+            expected = style_model.predict_proba(prep_style_features([red_fighter.id, blue_fighter.id]))[0]
+            self.assertAlmostEqual(self.style_performance(red_fighter, blue_fighter), expected, places=6)
+
+    def test_unseen_style_scores_like_the_encoders(self):
+        # the encoders give a style they never saw all zeros, the matrix keeps a code for it
+        known = {"primary_style": "Striker", "secondary_style": "Paced Finisher", "tertiary_attributes": "Conventional Frame (Orthodox)"}
+        unseen = dict(known, tertiary_attributes="Long-Limbed (Orthodox)")
+        blank = {"primary_style": None, "secondary_style": None, "tertiary_attributes": None}
+
+        self.assertNotEqual(self.style_matrix.lookup(known, known), self.style_matrix.lookup(unseen, known))
+        self.assertEqual(self.style_matrix.get_profile_code(blank), self.style_matrix.probabilities.shape[0] - 1)
+
+    def test_matrix_for_another_model_is_ignored(self):
+        red_fighter, blue_fighter = self.pairs[0]
+        expected = self.style_performance(red_fighter, blue_fighter)
+
+        self.style_matrix.model_version = "retrained"
+        joblib.dump(self.style_matrix, model_registry.paths["style_matrix"])
+        os.utime(model_registry.paths["style_matrix"], (0, 0))
+
+        # a stale matrix falls back to scoring with the model
+        self.assertIsNone(get_style_matrix())
+        self.assertAlmostEqual(self.style_performance(red_fighter, blue_fighter), expected, places=6)
+
+    def test_fighter_without_style_row_uses_model(self):
+        red_fighter, blue_fighter = self.pairs[0]
+        newcomer = copy.copy(red_fighter)
+        newcomer.id = max(f.id for pair in self.pairs for f in pair) + 100000
+
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            blue_style = db.get_fighter_styles([blue_fighter.id])[blue_fighter.id]
+        features = encode_style_features(pd.DataFrame([{
+            'primary_1': None, 'secondary_1': None, 'tertiary_1': None,
+            'primary_2': blue_style['primary_style'], 'secondary_2': blue_style['secondary_style'], 'tertiary_2': blue_style['tertiary_attributes'],
+        }]))
+        expected = model_registry.get("style_model").predict_proba(features)[0]
+
+        self.assertAlmostEqual(self.style_performance(newcomer, blue_fighter), expected, places=6)
+
+    def test_missing_matrix_is_built(self):
+        os.remove(model_registry.paths["style_matrix"])
+        self.assertIsNone(get_style_matrix())
+
+        ensure_style_matrix()
+        np.testing.assert_array_equal(get_style_matrix().probabilities, self.style_matrix.probabilities)
+
+if __name__ == '__main__':
+    unittest.main()
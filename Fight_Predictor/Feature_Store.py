@@ -0,0 +1,166 @@
+import sqlite3
+import os
+from contextlib import contextmanager
+import pandas as pd
+
+from config.config import FEATURE_STORE_PATH
+from Fight_Predictor.Feature_Engine import Feature_Engine
+from Models.DB_Classes.Fighters import Fighter
+
+
+# keeps one row of training features per fight_id in its own sqlite file, so a scrape only
+# has to build the rows for its new fights and the older fights of the fighters involved.
+# the feature schema version and column order are stored alongside, when either no longer
+# matches the Feature_Engine the whole store is rebuilt. the data version of the database the
+# rows were built from is kept too, when it moves the columns read from the fighters table
+# are rebuilt for every row while the history columns are kept
+class Feature_Store:
+    TABLE = "fight_features"
+    META_TABLE = "feature_store_meta"
+
+    def __init__(self, store_path: str = FEATURE_STORE_PATH):
+        self.store_path = store_path
+
+    # a connection that commits when the block ends and is closed afterwards
+    @contextmanager
+    def connect(self):
+        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+        conn = sqlite3.connect(self.store_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_meta(self, conn) -> dict | None:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.META_TABLE} (schema_version INTEGER, feature_columns TEXT, data_version TEXT)")
+        meta_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.META_TABLE})")]
+        if "data_version" not in meta_columns:
+            # a store from before the data version was kept, treated as empty so it is rebuilt
+            conn.execute(f"DROP TABLE {self.META_TABLE}")
+            return self.get_meta(conn)
+
+        row = conn.execute(f"SELECT schema_version, feature_columns, data_version FROM {self.META_TABLE}").fetchone()
+        if row is None:
+            return None
+
+        return {"schema_version": row[0], "feature_columns": row[1].split("|"), "data_version": row[2]}
+
+    def set_meta(self, conn, feature_columns: list[str], data_version):
+        conn.execute(f"DELETE FROM {self.META_TABLE}")
+        conn.execute(
+            f"INSERT INTO {self.META_TABLE} (schema_version, feature_columns, data_version) VALUES (?, ?, ?)",
+            (Feature_Engine.SCHEMA_VERSION, "|".join(feature_columns), None if data_version is None else str(data_version))
+        )
+
+    def get_stored_fight_ids(self, conn) -> set:
+        table_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.TABLE,)
+        ).fetchone()
+        if not table_exists:
+            return set()
+
+        return {row[0] for row in conn.execute(f"SELECT fight_id FROM {self.TABLE}")}
+
+# works out which rows are missing or out of date and rebuilds only those, returns how many rows were written.
+# data_version is the databases ratings version the fighters and styles were read at, without one the
+# fighter columns of every stored row are assumed stale
+    def update(self, fights: pd.DataFrame, fighters: list[Fighter], styles_map: dict, refresh: bool = False, data_version = None) -> int:
+        engine = Feature_Engine(fights, fighters, styles_map)
+
+        # the same fights create_features keeps, anything else never gets a row
+        known_ids = set(engine.fighters_map.keys())
+        usable = engine.fights[
+            engine.fights['red_fighter_id'].isin(known_ids) &
+            engine.fights['blue_fighter_id'].isin(known_ids) &
+            engine.fights['winner_id'].notna()
+        ]
+
+        with self.connect() as conn:
+            meta = self.get_meta(conn)
+            if meta is None or meta["schema_version"] != Feature_Engine.SCHEMA_VERSION:
+                refresh = True
+
+            # ratings, records and styles are rewritten in place, so any row can hold old fighter columns
+            restate = not refresh and (data_version is None or meta["data_version"] != str(data_version))
+
+            stored_ids = set() if refresh else self.get_stored_fight_ids(conn)
+            new_fights = usable[~usable['fight_id'].isin(stored_ids)]
+
+            if new_fights.empty and not restate:
+                return 0
+
+            feature_columns = None if refresh else meta["feature_columns"]
+            rows = None
+            if not new_fights.empty:
+                # a new fight changes the record, elo and rolling history of both fighters, so their older rows are redone too
+                changed_fighters = set(new_fights['red_fighter_id']) | set(new_fights['blue_fighter_id'])
+                recompute = usable[
+                    usable['red_fighter_id'].isin(changed_fighters) |
+                    usable['blue_fighter_id'].isin(changed_fighters)
+                ]
+
+                features = engine.create_features(recompute['fight_id'].tolist())
+                feature_columns = [column for column in features.columns if column != 'target'] + ['target']
+
+                if not refresh and meta["feature_columns"] != feature_columns:
+                    # the engine now produces different columns under the same version, so every row is rebuilt
+                    refresh = True
+                    recompute = usable
+                    features = engine.create_features(recompute['fight_id'].tolist())
+
+                rows = recompute.set_index('fight_id').loc[features.index, ['red_fighter_id', 'blue_fighter_id', 'event_date']]
+                rows.insert(0, 'fight_id', features.index)
+                rows['schema_version'] = Feature_Engine.SCHEMA_VERSION
+                rows = pd.concat([rows.reset_index(drop=True), features[feature_columns].reset_index(drop=True)], axis=1)
+
+            if restate and not refresh:
+                # the history columns of the rows left alone still hold, only their fighter columns are rebuilt
+                kept = pd.read_sql(f"SELECT * FROM {self.TABLE}", conn)
+                kept = kept[kept['fight_id'].isin(usable['fight_id'])]
+                if rows is not None:
+                    kept = kept[~kept['fight_id'].isin(rows['fight_id'])]
+
+                kept_fights = usable.set_index('fight_id').loc[kept['fight_id'].values].reset_index()
+                fighter_columns = engine.create_fighter_state_features(kept_fights)
+                kept[fighter_columns.columns] = fighter_columns.values
+
+                rows = pd.concat([kept, rows], ignore_index=True) if rows is not None else kept
+                refresh = True
+
+            if refresh:
+                conn.execute(f"DROP TABLE IF EXISTS {self.TABLE}")
+            else:
+                placeholders = ",".join("?" * len(rows))
+                conn.execute(f"DELETE FROM {self.TABLE} WHERE fight_id IN ({placeholders})", rows['fight_id'].tolist())
+
+            rows.to_sql(self.TABLE, conn, if_exists='append', index=False)
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.TABLE}_fight_id ON {self.TABLE} (fight_id)")
+            self.set_meta(conn, feature_columns, data_version)
+
+        return len(rows)
+
+# the stored features in date order, laid out like Feature_Engine.create_features with the fight_id as the index
+    def get_features(self, fight_ids: list[int] | None = None) -> pd.DataFrame:
+        with self.connect() as conn:
+            meta = self.get_meta(conn)
+            if meta is None:
+                raise ValueError(f"Feature store at {self.store_path} is empty, run update first.")
+            if meta["schema_version"] != Feature_Engine.SCHEMA_VERSION:
+                raise ValueError(
+                    f"Feature store holds schema version {meta['schema_version']} "
+                    f"but the engine is on {Feature_Engine.SCHEMA_VERSION}, run update first."
+                )
+
+            query = f"SELECT * FROM {self.TABLE}"
+            params = []
+            if fight_ids is not None:
+                query += f" WHERE fight_id IN ({','.join('?' * len(fight_ids))})"
+                params = list(fight_ids)
+            query += " ORDER BY event_date, fight_id"
+
+            rows = pd.read_sql(query, conn, params=params)
+
+        features = rows[meta["feature_columns"]]
+        features.index = rows['fight_id'].values
+        return features
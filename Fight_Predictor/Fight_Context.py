@@ -3,17 +3,19 @@ from multiprocessing import context
 from matplotlib import style
 import pandas as pd
 import numpy as np
-import joblib
 import matplotlib.pyplot as plt
 import random
 
 from Models.DB_Classes.Fighters import Fighter
 from Database.database_manager import DatabaseManager
+from Database.fight_history_index import get_history_index
 from Models.Functional_Classes.logistic_regression import style_features
 from utils.dominance_prediction import dominance_prediction
 from Models.Functional_Classes.logistic_regression.style_features import prep_style_features
-from config.config import MODEL_PATH, DB_PATH
+from Models.Functional_Classes.logistic_regression.style_matrix import get_style_matrix
+from config.config import DB_PATH
 from utils.Fighter_Parser import create_fight_features
+from utils.model_registry import model_registry
 
 
 # a class to organise all the data for a fight that is not given from preexitsing data 
@@ -38,6 +40,8 @@ class Fight_Context:
         self.event_date = event_date
 
         self.fights = None
+        self.histories = None
+        self.fitted = False
 
         self.elo_diff = red_fighter.elo_rating - blue_fighter.elo_rating
         self.quality_score_diff = red_fighter.quality_score - blue_fighter.quality_score
@@ -61,37 +65,36 @@ class Fight_Context:
 
 # a function to get the past fights of the fighters
     def get_past_fights(self):
-        with DatabaseManager(DB_PATH) as db:
-            fights_df = db.get_fighter_history([self.red_fighter.id, self.blue_fighter.id], self.event_date)
+        # looks up the fights from the in memory history index rather than scanning the fights table
+        history_index = get_history_index(DB_PATH)
+        fights_df = history_index.get_fighter_history([self.red_fighter.id, self.blue_fighter.id], self.event_date)
 
         self.fights = fights_df
 
+        # each fighters history split once into their own and opponent stat arrays with parsed dates,
+        # every calculator below is a numpy expression over these instead of filtering the frame again
+        self.histories = {
+            fighter.id: history_index.get_fighter_arrays(fighter.id, self.event_date)
+            for fighter in (self.red_fighter, self.blue_fighter)
+        }
+
 #calculates how good a fighters form is 
     def calc_form(self, fighter_id: int):
-        #loads all fights that contain the red or blue fighter
-        fighter_history = self.fights[
-            (self.fights['red_fighter_id'] == fighter_id) |
-            (self.fights['red_fighter_id'] == fighter_id)
-        ].tail(10)
-
-        if len(fighter_history) < 2:
-            return 0.0
+        #the last 10 fights the fighter was in the red corner for, the model was trained on red corner form only
+        history = self.histories[fighter_id]
 
         # a series of how the fighters elo has changed
-        fighter_elo_history = np.where(
-            fighter_history['red_fighter_id'] == fighter_id,
-            fighter_history['red_fighter_elo_before'],
-            fighter_history['blue_fighter_elo_before'],
-        )
+        fighter_elo_history = history["elo_before"][history["is_red"]][-10:]
+
+        if len(fighter_elo_history) < 2:
+            return 0.0
 
         #cretaes an array of evenly spaced values to act as a series of change 
         x_axis = np.arange(len(fighter_elo_history))
 
-        #fits this data to a linear line
-        try:
-            slope, _ = np.polyfit(x_axis, fighter_elo_history, 1)
-        except(np.linalg.LinAlgError, TypeError):
-            slope = 0.0
+        #fits this data to a linear line, the least squares slope worked out directly instead of through polyfit
+        x_centred = x_axis - x_axis.mean()
+        slope = np.dot(x_centred, fighter_elo_history - fighter_elo_history.mean()) / np.dot(x_centred, x_centred)
 
         # the slope of this line is a fighters form score 
         # a higher slope means the fighter has a better form 
@@ -110,32 +113,26 @@ class Fight_Context:
 # this will give more weight to recent fights 
     def calc_weighted_rivalry_dominance(self):
         #gathers all fights the fighters have in common and copies so you are not editing by reference
+        #the history is already strictly before the event date
+        red_ids = self.fights['red_fighter_id'].values
+        blue_ids = self.fights['blue_fighter_id'].values
         rivalry_fights = self.fights[
-            (
-                ((self.fights['red_fighter_id'] == self.red_fighter.id) & 
-                 (self.fights['blue_fighter_id'] == self.blue_fighter.id)) |
-                ((self.fights['red_fighter_id'] == self.blue_fighter.id) & 
-                 (self.fights['blue_fighter_id'] == self.red_fighter.id))
-            ) &
-            (pd.to_datetime(self.fights['event_date']) < self.event_date)
+            ((red_ids == self.red_fighter.id) & (blue_ids == self.blue_fighter.id)) |
+            ((red_ids == self.blue_fighter.id) & (blue_ids == self.red_fighter.id))
         ].copy()
         if rivalry_fights.empty:
             self.average_rivalry_dominance = 0.0
             return
 
         #calcualtes a dominace score for each fight in the lsit 
-        dominance_scores_df = dominance_prediction(rivalry_fights)
-
-        adjusted_scores = []
-        for i, fight_row in enumerate(rivalry_fights.itertuples()):
-            base_dominance = dominance_scores_df.iloc[i, 0]
+        base_dominance = dominance_prediction(rivalry_fights).iloc[:, 0].values
 
-            if fight_row.winner_id == self.red_fighter.id:
-                adjusted_scores.append(base_dominance)
-            elif fight_row.winner_id == self.blue_fighter.id:
-                adjusted_scores.append(-base_dominance)
-            else:
-                adjusted_scores.append(0.0)
+        # positive when the red fighter won, negative when the blue fighter won and 0 for a draw
+        winner_ids = rivalry_fights['winner_id'].values
+        adjusted_scores = np.where(
+            winner_ids == self.red_fighter.id, base_dominance,
+            np.where(winner_ids == self.blue_fighter.id, -base_dominance, 0.0)
+        )
 
         # generates a list of evenly spaced weights between 1 and 1.5 based on the number of fights if there is past fights
         num_fights = len(adjusted_scores)
@@ -153,16 +150,28 @@ class Fight_Context:
 # calculates how each fighters style will perform agaist each others 
 # cannot use this in the final modal due to data leakage problems 
     def calc_style_performance(self):
-        # preping feautes for the style model 
         ids = [self.red_fighter.id, self.blue_fighter.id]
 
-        features = prep_style_features(ids)
+        # every style pairing is scored ahead of time, so this is a lookup when the matrix is up to date
+        red_style, blue_style = None, None
+        style_matrix = get_style_matrix()
+        if style_matrix is not None:
+            with DatabaseManager(DB_PATH, read_only=True) as db:
+                styles_map = db.get_fighter_styles(ids)
+            red_style, blue_style = styles_map.get(ids[0]), styles_map.get(ids[1])
 
-        #loads the style model 
-        style_model = joblib.load(MODEL_PATH)
+        # a fighter without a style row is left to the model
+        if red_style is not None and blue_style is not None:
+            results_red_proba = np.array([style_matrix.lookup(red_style, blue_style)])
+        else:
+            # preping feautes for the style model 
+            features = prep_style_features(ids)
 
-        # gets the style model to give a probability of win based of style
-        results_red_proba = style_model.predict_proba(features)
+            #gets the already loaded style model 
+            style_model = model_registry.get("style_model")
+
+            # gets the style model to give a probability of win based of style
+            results_red_proba = style_model.predict_proba(features)
 
         self.red_style_performance = results_red_proba
         self.blue_style_performance = 1 - results_red_proba
@@ -180,20 +189,15 @@ class Fight_Context:
     
 # calculates how active each fighter has been in the UFC    
     def calc_fighter_activity(self, fighter_id: int) -> float:
-        # gets all of the fights one fighter has been in 
-        fighter_history = self.fights[
-            ((self.fights['red_fighter_id'] == fighter_id) |
-            (self.fights['blue_fighter_id'] == fighter_id)) &
-            (pd.to_datetime(self.fights['event_date']) < self.event_date)
-        ].tail(6)
+        # gets the dates of the last 6 fights one fighter has been in 
+        fight_dates = self.histories[fighter_id]["dates"][-6:]
 
         # if they have a low number of fights return a neutal 0.5 
-        if len(fighter_history) < 2:
+        if len(fight_dates) < 2:
             return 0.5 
 
-        # gets all the fight dates and then a list of days between fights 
-        fight_dates = pd.to_datetime(fighter_history['event_date'])
-        layoffs_in_days = fight_dates.diff().dt.days.dropna().values
+        # a list of whole days between fights 
+        layoffs_in_days = np.diff(fight_dates).astype('timedelta64[D]').astype(float)
         
         TIME_CONSTANT = 365.0 
         
@@ -251,28 +255,22 @@ class Fight_Context:
 # calculates the how dangerous a fighter is for volitile finished
     def calc_finishing_power(self, fighter_id):
         # gets a fighters full history 
-        fighter_history = self.fights[
-            ((self.fights['red_fighter_id'] == fighter_id) |
-            (self.fights['blue_fighter_id'] == fighter_id))
-        ]
+        history = self.histories[fighter_id]
+        total_fights = len(history["won"])
         
-        if fighter_history.empty:
+        if total_fights == 0:
             return 0.0
 
-        # gets of the the fights a fighter has won / finished and the win method 
-        wins = fighter_history[fighter_history['winner_id'] == fighter_id]
-        finishes_df = wins[
-            wins['win_method'].str.contains('KO|SUB', na=False)
-        ]
+        # gets of the the fights a fighter has won by KO or submission
+        finishes = history["won"] & history["is_finish"]
 
-        if finishes_df.empty:
+        if not finishes.any():
             return 0.0
 
         # applies a weight to the finishing score based on the round
-        finishing_score = finishes_df['final_round'].apply(lambda r: 1 / r).sum()
+        finishing_score = np.sum(1 / history["final_round"][finishes])
         
         # generates a final finishing score
-        total_fights = len(fighter_history)
         normalized_score = finishing_score / total_fights
         
         return normalized_score
@@ -288,38 +286,23 @@ class Fight_Context:
         
 # calculates the defensive rating of a fighter
     def calc_defensive_rating(self, fighter_id):
-        # gets all of a fighters fights from the df 
-        fighter_history =self.fights[
-            ((self.fights['red_fighter_id'] == fighter_id) |
-            (self.fights['blue_fighter_id'] == fighter_id))
-        ]
+        # gets all of a fighters fights from their history 
+        history = self.histories[fighter_id]
         
         # sets arbitary values if the fighter has no fights 
-        if fighter_history.empty:
+        if len(history["fight_minutes"]) == 0:
             return {"strikes_absorbed_per_min": 4.0, "takedowns_absorbed_per_min": 4.0}
         
-        
-        # loops through all of a fighters fights to get the total amout of  different types of strikes that they have taken
-        # also gets the amount of time they have fought for in seconds
-        total_strikes_absorbed = 0
-        total_takedowns_absorbed = 0
-        total_fight_time = 0
-        
-        fighter_history = pd.DataFrame(fighter_history)
-        
-        for _ , fight in fighter_history.iterrows():
-            if fight['red_fighter_id'] == fighter_id:
-                total_strikes_absorbed += fight.get('blue_sig_strikes', 0)
-                total_takedowns_absorbed += fight.get('blue_takedowns', 0)
-            else:
-                total_strikes_absorbed += fight.get('red_sig_strikes', 0)
-                total_takedowns_absorbed += fight.get('red_takedowns', 0)
-                
-            total_fight_time += fight['final_time_seconds'] / 60
+        # the total amount of strikes and takedowns the fighter has taken from their opponents
+        # and the amount of time they have fought for in minutes
+        total_strikes_absorbed = np.sum(history["strikes_absorbed"])
+        total_takedowns_absorbed = np.sum(history["takedowns_absorbed"])
+        total_fight_time = np.sum(history["fight_minutes"])
         
         # gets the average amount of strikes and takedowns per minute    
-        strikes_per_min = total_strikes_absorbed / total_fight_time
-        takedowns_per_min = total_takedowns_absorbed / total_fight_time
+        with np.errstate(divide='ignore', invalid='ignore'):
+            strikes_per_min = np.divide(total_strikes_absorbed, total_fight_time)
+            takedowns_per_min = np.divide(total_takedowns_absorbed, total_fight_time)
         
         return {"strikes_absorbed_per_min": strikes_per_min, "takedowns_absorbed_per_min": takedowns_per_min}
     
@@ -341,10 +324,13 @@ class Fight_Context:
         self.set_activity()
         self.set_finish_power()
         self.get_defence_diff()
+        self.fitted = True
   
  # creates the features for the model training        
     def create_features(self):
-        self.fit()
+        # the readable and model features share one fit, so the history and styles are only looked up once
+        if not self.fitted:
+            self.fit()
 
         fighters_features = create_fight_features(self.red_fighter, self.blue_fighter, self.event_date)
         
@@ -374,7 +360,8 @@ class Fight_Context:
 
 # createss features to send via the web API so they can be understood 
     def create_readable_features(self):
-        self.fit()
+        if not self.fitted:
+            self.fit()
         self.calc_style_performance()
         
         fighters_features = create_fight_features(self.red_fighter, self.blue_fighter, self.event_date, readable=True)
@@ -402,7 +389,8 @@ class Fight_Context:
         return X    
     
     def get_rivalry_dominance(self):
-        self.set_activity()
+        self.get_past_fights()
+        self.calc_weighted_rivalry_dominance()
         return self.average_rivalry_dominance
         
 
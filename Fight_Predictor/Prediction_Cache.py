@@ -0,0 +1,74 @@
+import json
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Fight_Predictor.Fight_Context import Fight_Context
+from Models.DB_Classes.Fighters import Fighter
+from utils.model_registry import model_registry
+
+
+# the full pre fight response for one matchup, the readable features, the models prediction and both fighters
+def predict_fight(red_fighter: Fighter, blue_fighter: Fighter, event_date: str, model) -> dict:
+    context = Fight_Context(red_fighter, blue_fighter, event_date, winner_id = None)
+
+    readable_features = context.create_readable_features()
+    features_dict = readable_features.to_dict(orient="records")[0]
+
+    prediction_features = context.create_features()
+
+    # A logistic booster gives the red corners win probability, the forest gives its voted label
+    if getattr(model, "objective", None) == "logistic":
+        prediction = model.predict_proba(prediction_features.values)
+    else:
+        prediction = model.predict(prediction_features.values)
+
+    return {"features": features_dict,
+            "prediction": float(prediction[0]),
+            "red_fighter": red_fighter,
+            "blue_fighter": blue_fighter
+        }
+
+def to_json(response: dict) -> str:
+    # fighters are stored as their fields and numpy numbers as plain python ones
+    def default(value):
+        if isinstance(value, Fighter):
+            return vars(value)
+        if hasattr(value, "item"):
+            return value.item()
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        raise TypeError(f"Cannot cache a {type(value).__name__} in a prediction")
+
+    return json.dumps(response, default=default)
+
+# builds the prediction for every upcoming fight in one go and stores them against the current model
+# and ratings version, run after the ratings or styles are updated and after each scrape
+def refresh_prediction_cache(db_path: str = DB_PATH, model=None, model_version: str | None = None) -> int:
+    if model is None:
+        model = model_registry.get("predictor_model")
+        model_version = model_registry.get_version("predictor_model")
+
+    with DatabaseManager(db_path, read_only=True) as db:
+        ratings_version = db.get_ratings_version()
+        upcoming_fights = db.get_upcoming_fights()
+        fighter_ids = {fight[key] for fight in upcoming_fights for key in ("red_fighter_id", "blue_fighter_id")}
+        fighters = {fighter_id: db.get_fighter_by_id(fighter_id) for fighter_id in fighter_ids}
+
+    predictions = []
+    for fight in upcoming_fights:
+        response = predict_fight(fighters[fight["red_fighter_id"]], fighters[fight["blue_fighter_id"]], fight["event_date"], model)
+        predictions.append((fight["id"], to_json(response)))
+
+    with DatabaseManager(db_path) as db:
+        # ratings that changed while the batch ran would make every row stale on arrival, so it is not saved
+        if db.get_ratings_version() != ratings_version:
+            print("Ratings changed while the prediction cache was being built, run it again.")
+            return 0
+        db.save_predictions(predictions, model_version, ratings_version)
+
+    print(f"Cached predictions for {len(predictions)} upcoming fights.")
+    return len(predictions)
+
+
+if __name__ == "__main__":
+    refresh_prediction_cache()
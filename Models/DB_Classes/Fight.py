@@ -7,6 +7,13 @@ class Fight:
         self.red_fighter_id = fight_data.get("red_fighter_id")
         self.blue_fighter_id = fight_data.get("blue_fighter_id")
         self.winner_id = fight_data.get("winner_id")
+
+        # Names and profile links from the scraper, used to look the fighters up before inserting
+        self.red_fighter_name: Optional[str] = fight_data.get("red_fighter_name")
+        self.blue_fighter_name: Optional[str] = fight_data.get("blue_fighter_name")
+        self.winner_name: Optional[str] = fight_data.get("winner_name")
+        self.red_profile_url: Optional[str] = fight_data.get("red_profile_url")
+        self.blue_profile_url: Optional[str] = fight_data.get("blue_profile_url")
         
         self.red_knockdowns: int = fight_data.get("red_knockdowns", 0)
         self.blue_knockdowns: int = fight_data.get("blue_knockdowns", 0)
@@ -28,8 +35,8 @@ class Fight:
         self.blue_elo: int = fight_data.get("blue_elo", 1500)
 
     def to_tuple_for_insert(self) -> tuple:
+        # Same order as the columns in DatabaseManager.bulk_insert_fights
         return (
-            self.fight_id,
             self.red_fighter_id,
             self.blue_fighter_id,
             self.winner_id,
@@ -46,9 +53,7 @@ class Fight:
             self.final_time_seconds,
             self.event_date,
             self.event_url,
-            self.is_completed,
-            self.red_elo,
-            self.blue_elo
+            self.is_completed
         )
 
     def __repr__(self) -> str:
@@ -1,5 +1,17 @@
+import math
 from typing import Optional
 
+from utils.Fighter_Parser import parse_fighter_numbers
+
+# the typed columns stored next to the raw strings, in the order parse_fighter_numbers returns them
+NUMERIC_COLUMNS = ["height_cm", "reach_cm", "dob_ordinal", "wins", "losses", "draws"]
+
+def as_number(value) -> Optional[float]:
+    # missing values come back from pandas as nan
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return float(value)
+
 class Fighter:
 
     def __init__(self, fighter_data: dict):
@@ -20,6 +32,44 @@ class Fighter:
         self.rating_volatility: float = fighter_data.get("rating_volatility", 0.06)
         self.quality_score: float = fighter_data.get("quality_score", 1500)
 
+        # Numbers parsed once from the strings above when the fighter is scraped, rows read
+        # from a database that has not been migrated yet are parsed here instead
+        if "height_cm" in fighter_data:
+            numbers = [as_number(fighter_data.get(column)) for column in NUMERIC_COLUMNS]
+        else:
+            numbers = parse_fighter_numbers(self.height, self.reach, self.dob, self.record)
+        height_cm, reach_cm, dob_ordinal, wins, losses, draws = numbers
+
+        self.height_cm: Optional[float] = height_cm
+        self.reach_cm: Optional[float] = reach_cm
+        self.dob_ordinal: Optional[int] = int(dob_ordinal) if dob_ordinal is not None else None
+        self.wins: int = int(wins or 0)
+        self.losses: int = int(losses or 0)
+        self.draws: int = int(draws or 0)
+
+    def to_tuple_for_insert(self) -> tuple:
+        # Same order as the columns in DatabaseManager.bulk_insert_fighters
+        return (
+            self.name,
+            self.nickname,
+            self.height,
+            self.weight,
+            self.reach,
+            self.stance,
+            self.record,
+            self.dob,
+            self.profile_url,
+            self.elo_rating,
+            self.rating_deviation,
+            self.rating_volatility,
+            self.height_cm,
+            self.reach_cm,
+            self.dob_ordinal,
+            self.wins,
+            self.losses,
+            self.draws
+        )
+
     def __repr__(self) -> str:
         """Provides a developer-friendly string representation of the object."""
         return f"<Fighter: {self.name} (ID: {self.id}, Elo: {round(self.elo_rating)})>"
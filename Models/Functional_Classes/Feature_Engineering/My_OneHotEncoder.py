@@ -1,12 +1,17 @@
 import numpy as np
 import pandas as pd
+from pandas._libs.sparse import IntIndex
 
 class MyOneHotEncoder():
+    # Below this many rows a dict lookup per value beats the fixed cost of the categorical index
+    INDEX_LOOKUP_ROWS = 500
+
     def __init__(self):
         # Initialize storage for category mappings and feature names
         self.category_map_ = None
         self.inverse_category_map_ = None
         self.feature_names_ = None
+        self.category_index_ = None
 
     def fit(self, X: pd.Series):
         # Sort unique categories to ensure consistent column ordering
@@ -16,32 +21,36 @@ class MyOneHotEncoder():
         self.category_map_ = {category: i for i, category in enumerate(unique_categories)}
         self.inverse_category_map_ = {i: category for i, category in enumerate(unique_categories)}
         self.feature_names_ = [f"{X.name}_{category}" for category in unique_categories]
+        self.category_index_ = None
 
         return self
 
+    def get_category_index(self) -> pd.Index:
+        # The categories in column order as an index, built on first use so encoders pickled before it existed still work
+        if getattr(self, "category_index_", None) is None:
+            self.category_index_ = pd.Index(sorted(self.category_map_, key=self.category_map_.get))
+        return self.category_index_
+
 
     def get_feature_names_out(self, prefix: str) -> list:
         # Generate column names using a custom prefix
-        categories = sorted(self.category_map_, key=self.category_map_.get)
-        return [f"{prefix}_{category}" for category in categories]
+        return [f"{prefix}_{category}" for category in self.get_category_index()]
 
 
-    def transform(self, X: pd.Series, prefix = None):
+    def transform(self, X: pd.Series, prefix = None, dtype = int, sparse: bool = False):
         # Ensure fit has been called before transforming
         if self.category_map_ is None:
             raise RuntimeError("Encoder has not been fitted yet. Call .fit() first.")
 
         n_samples = len(X)
         n_categories = len(self.category_map_)
-        # Initialize an all-zero matrix for the encoded data
-        transformed_features = np.zeros((n_samples, n_categories), dtype=int)
 
-        for i, category in enumerate(X):
-            # Map each category to its index and set that bit to 1
-            category_index = self.category_map_.get(category)
-            
-            if category_index is not None:
-                transformed_features[i, category_index] = 1
+        # Map every value to its column, categories the encoder never saw come back as -1 and stay all zero
+        if n_samples >= self.INDEX_LOOKUP_ROWS:
+            codes = self.get_category_index().get_indexer(X.values)
+        else:
+            codes = np.fromiter((self.category_map_.get(category, -1) for category in X.values), dtype=np.intp, count=n_samples)
+        rows = np.flatnonzero(codes >= 0)
 
         # Determine the final column names based on prefix argument
         if prefix is None:
@@ -49,8 +58,34 @@ class MyOneHotEncoder():
         elif prefix is not None:
             col_name = self.get_feature_names_out(prefix)
 
+        # Sparse columns are built straight from the rows each category is set on, so the dense table is never made
+        if sparse:
+            return self.to_sparse_frame(rows, codes[rows], n_samples, col_name, X.index, dtype)
+
+        # Set the bit for every known value in one assignment, callers pass dtype=np.int8 to keep a large table small
+        transformed_features = np.zeros((n_samples, n_categories), dtype=dtype)
+        transformed_features[rows, codes[rows]] = 1
 
         return pd.DataFrame(transformed_features, columns=col_name, index=X.index)
+
+    @staticmethod
+    def to_sparse_frame(rows, row_codes, n_samples, columns, index, dtype) -> pd.DataFrame:
+        # A stable sort by column keeps each columns rows in ascending order, which the sparse index needs,
+        # the columns only store their ones and .sparse.to_coo() turns the frame into a scipy matrix
+        order = np.argsort(row_codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(row_codes, minlength=len(columns)))])
+        sorted_rows = rows[order].astype(np.int32)
+        sparse_dtype = pd.SparseDtype(dtype, 0)
+
+        sparse_columns = {
+            column: pd.arrays.SparseArray(
+                np.ones(end - start, dtype=sparse_dtype.subtype),
+                sparse_index=IntIndex(n_samples, sorted_rows[start:end]),
+                dtype=sparse_dtype
+            )
+            for column, start, end in zip(columns, bounds[:-1], bounds[1:])
+        }
+        return pd.DataFrame(sparse_columns, index=index)
     
     def fit_transform(self, X: pd.Series):
         # Fit to data and transform it in one step
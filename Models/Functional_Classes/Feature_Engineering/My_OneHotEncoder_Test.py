@@ -0,0 +1,72 @@
+import unittest
+import pickle
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from config.config import DOMINANCE_ENCODER_PATH, ENCODERS_PATH
+from Models.Functional_Classes.Feature_Engineering.My_OneHotEncoder import MyOneHotEncoder
+
+class TestMyOneHotEncoder(unittest.TestCase):
+
+    def loop_transform(self, encoder, X, prefix = None):
+        # the original per value loop the vectorised transform replaced
+        expected = np.zeros((len(X), len(encoder.category_map_)), dtype=int)
+        for i, category in enumerate(X):
+            if encoder.category_map_.get(category) is not None:
+                expected[i, encoder.category_map_[category]] = 1
+        columns = encoder.feature_names_ if prefix is None else encoder.get_feature_names_out(prefix)
+        return pd.DataFrame(expected, columns=columns, index=X.index)
+
+    def test_matches_loop_for_pickled_encoders(self):
+        with open(ENCODERS_PATH, "rb") as file:
+            encoders = pickle.load(file)
+        with open(DOMINANCE_ENCODER_PATH, "rb") as file:
+            encoders["dominance"] = pickle.load(file)
+
+        rng = np.random.default_rng(0)
+        for name, encoder in encoders.items():
+            values = list(encoder.category_map_) + ["Unseen", None]
+            # small inputs go through the dict and large ones through the categorical index
+            for n_rows in (1, 7, encoder.INDEX_LOOKUP_ROWS + 3):
+                X = pd.Series(rng.choice(np.array(values, dtype=object), n_rows), name=name, index=np.arange(n_rows) * 2)
+                pd.testing.assert_frame_equal(encoder.transform(X), self.loop_transform(encoder, X))
+                pd.testing.assert_frame_equal(encoder.transform(X, prefix="col"), self.loop_transform(encoder, X, "col"))
+
+    def test_compact_and_sparse_output(self):
+        X = pd.Series(["b", "a", "c", "a"] * 200, name="method")
+        encoder = MyOneHotEncoder().fit(X)
+        dense = encoder.transform(X)
+
+        compact = encoder.transform(X, dtype=np.int8)
+        self.assertTrue((compact.dtypes == np.int8).all())
+        pd.testing.assert_frame_equal(compact, dense.astype(np.int8))
+
+        sparse = encoder.transform(X, dtype=np.int8, sparse=True)
+        self.assertEqual(list(sparse.columns), ["method_a", "method_b", "method_c"])
+        self.assertEqual(sparse.sparse.density, 1 / 3)
+        pd.testing.assert_frame_equal(sparse.sparse.to_dense(), compact)
+
+    def test_sparse_output_skips_the_dense_table(self):
+        categories = [f"c{i}" for i in range(200)]
+        encoder = MyOneHotEncoder().fit(pd.Series(categories, name="method"))
+        X = pd.Series(np.random.default_rng(1).choice(categories + ["Unseen"], 50000), name="method")
+
+        tracemalloc.start()
+        sparse = encoder.transform(X, dtype=np.int8, sparse=True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # the dense int8 table alone would be one byte per row per category
+        self.assertLess(peak, len(X) * len(categories) / 2)
+        pd.testing.assert_frame_equal(sparse.sparse.to_dense(), encoder.transform(X, dtype=np.int8))
+        self.assertEqual(encoder.transform(X[:0], sparse=True).shape, (0, len(categories)))
+
+    def test_refit_rebuilds_the_categories(self):
+        encoder = MyOneHotEncoder().fit(pd.Series(["a", "b"], name="x"))
+        encoder.transform(pd.Series(["a"]))
+        encoder.fit(pd.Series(["b", "c"], name="x"))
+        self.assertEqual(encoder.transform(pd.Series(["c", "a"])).values.tolist(), [[0, 1], [0, 0]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from Models.Functional_Classes.Glicko2.GlickoFighter import GlickoFighter
 class GlickoCalculator:
     # Constants for Glicko-2 system scaling
@@ -110,4 +111,106 @@ class GlickoCalculator:
                 fA /= 2
             B, fB = C, fC
             
-        return math.exp(A / 2.0)
\ No newline at end of file
+        return math.exp(A / 2.0)
+
+    def rate_card(self, bouts: list):
+        # Rates every bout on a card at once, each bout is (red, blue, outcome_red) and both
+        # fighters are rated against the other's state from before the card, a fighter should only appear once
+        red_fighters = [red for red, _, _ in bouts]
+        blue_fighters = [blue for _, blue, _ in bouts]
+        players = red_fighters + blue_fighters
+        opponents = blue_fighters + red_fighters
+        outcomes = [outcome for _, _, outcome in bouts] + [1 - outcome for _, _, outcome in bouts]
+
+        ratings, rds, volatilities = self.rate_batch(
+            ratings=np.array([p.rating for p in players], dtype=float),
+            rds=np.array([p.rating_deviation for p in players], dtype=float),
+            volatilities=np.array([p.volatility for p in players], dtype=float),
+            opponent_ratings=np.array([o.rating for o in opponents], dtype=float),
+            opponent_rds=np.array([o.rating_deviation for o in opponents], dtype=float),
+            outcomes=np.array(outcomes, dtype=float),
+        )
+
+        for player, rating, rd, volatility in zip(players, ratings, rds, volatilities):
+            player.rating = float(rating)
+            player.rating_deviation = float(rd)
+            player.volatility = float(volatility)
+
+    def rate_batch(self, ratings, rds, volatilities, opponent_ratings, opponent_rds, outcomes):
+        # Same steps as update_player for many players at once. Player arrays are shape (n,),
+        # opponent arrays and outcomes are (n,) for one bout each or (n, k) for k bouts each
+        ratings = np.asarray(ratings, dtype=float)
+        opponent_ratings = np.asarray(opponent_ratings, dtype=float).reshape(len(ratings), -1)
+        opponent_rds = np.asarray(opponent_rds, dtype=float).reshape(len(ratings), -1)
+        outcomes = np.asarray(outcomes, dtype=float).reshape(len(ratings), -1)
+
+        # Convert rating and RD to Glicko-2 scale
+        mu = (ratings - 1500) / self.SCALING_FACTOR
+        phi = np.asarray(rds, dtype=float) / self.SCALING_FACTOR
+        opp_mu = (opponent_ratings - 1500) / self.SCALING_FACTOR
+        opp_phi = opponent_rds / self.SCALING_FACTOR
+
+        # g and the expected score are computed once per bout and shared by the variance and update sum
+        g_val = 1.0 / np.sqrt(1.0 + 3.0 * opp_phi**2 / math.pi**2)
+        expected = 1.0 / (1.0 + np.exp(-g_val * (mu[:, None] - opp_mu)))
+
+        precision_sum = np.sum(g_val**2 * expected * (1 - expected), axis=1)
+        with np.errstate(divide='ignore'):
+            variance = np.where(precision_sum != 0, 1.0 / precision_sum, np.inf)
+
+        update_sum = np.sum(g_val * (outcomes - expected), axis=1)
+        improvement = variance * update_sum
+        new_vol = self.calculate_new_volatility_batch(improvement, phi, variance, np.asarray(volatilities, dtype=float))
+
+        # Update RD with the new volatility and calculate the new rating
+        pre_rating_rd = np.sqrt(phi**2 + new_vol**2)
+        new_phi = 1.0 / np.sqrt((1.0 / pre_rating_rd**2) + (1.0 / variance))
+        new_mu = mu + new_phi**2 * update_sum
+
+        # Convert back to standard scale
+        return 1500 + new_mu * self.SCALING_FACTOR, new_phi * self.SCALING_FACTOR, new_vol
+
+    def calculate_new_volatility_batch(self, delta, phi, v, sigma):
+        # The Illinois iteration from calculate_new_volatility run on every player together,
+        # players stop being updated once their own bracket has converged
+        a = np.log(sigma**2)
+        delta_sq = delta**2
+
+        def f(x, a, delta_sq, phi, v):
+            ex = np.exp(x)
+            term1 = (ex * (delta_sq - phi**2 - v - ex)) / (2 * (phi**2 + v + ex)**2)
+            term2 = (x - a) / self.TAU**2
+            return term1 - term2
+
+        # Set initial bounds for iteration
+        A = a.copy()
+        large_delta = delta_sq > phi**2 + v
+        with np.errstate(invalid='ignore', divide='ignore'):
+            B = np.where(large_delta, np.log(np.where(large_delta, delta_sq - phi**2 - v, 1.0)), 0.0)
+
+        k = np.ones_like(a)
+        searching = ~large_delta
+        while searching.any():
+            searching &= f(a - k * self.TAU, a, delta_sq, phi, v) < 0
+            k += searching
+        B = np.where(large_delta, B, a - k * self.TAU)
+
+        fA = f(A, a, delta_sq, phi, v)
+        fB = f(B, a, delta_sq, phi, v)
+
+        # Convergence loop, every player is stepped together but converged players keep their values
+        active = np.abs(B - A) > self.CONVERGENCE_TOLERANCE
+        while active.any():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                C = A + (A - B) * fA / (fB - fA)
+                fC = f(C, a, delta_sq, phi, v)
+
+            sign_change = fC * fB < 0
+            A = np.where(active & sign_change, B, A)
+            fA = np.where(active, np.where(sign_change, fB, fA / 2), fA)
+            B = np.where(active, C, B)
+            fB = np.where(active, fC, fB)
+
+            active &= np.abs(B - A) > self.CONVERGENCE_TOLERANCE
+
+        return np.exp(A / 2.0)
@@ -1,5 +1,6 @@
 import unittest
 import math
+import numpy as np
 from Models.Functional_Classes.Glicko2.GlickoFighter import GlickoFighter
 from Models.Functional_Classes.Glicko2.GlickoCalculator import GlickoCalculator
 
@@ -7,9 +8,9 @@ class TestGlickoCalculator(unittest.TestCase):
 
     def setUp(self):
         self.calculator = GlickoCalculator()
-        self.fighter = GlickoFighter(rating=1500, rd=350, volatility=0.06)
-        self.opponent_strong = GlickoFighter(rating=2000, rd=50, volatility=0.06)
-        self.opponent_weak = GlickoFighter(rating=1000, rd=50, volatility=0.06)
+        self.fighter = GlickoFighter(rating=1500, rating_deviation=350, volatility=0.06)
+        self.opponent_strong = GlickoFighter(rating=2000, rating_deviation=50, volatility=0.06)
+        self.opponent_weak = GlickoFighter(rating=1000, rating_deviation=50, volatility=0.06)
 
 
     def test_g_phi_bounds(self):
@@ -45,7 +46,58 @@ class TestGlickoCalculator(unittest.TestCase):
 
     def test_rd_decrease_logic(self):
 
-        start_rd = self.fighter.rd
+        start_rd = self.fighter.rating_deviation
         self.calculator.rate_1vs1(self.fighter, self.opponent_weak, 1.0)
-        self.assertLess(self.fighter.rd, start_rd, "RD must decrease after a match")
+        self.assertLess(self.fighter.rating_deviation, start_rd, "RD must decrease after a match")
 
+    def test_batch_matches_rate_1vs1(self):
+        rng = np.random.default_rng(0)
+        n = 200
+        ratings = rng.uniform(1000, 2200, n)
+        rds = rng.uniform(30, 350, n)
+        volatilities = rng.uniform(0.04, 0.09, n)
+        opponent_ratings = rng.uniform(1000, 2200, n)
+        opponent_rds = rng.uniform(30, 350, n)
+        outcomes = rng.uniform(0, 1, n)
+
+        new_ratings, new_rds, new_vols = self.calculator.rate_batch(ratings, rds, volatilities, opponent_ratings, opponent_rds, outcomes)
+
+        for i in range(n):
+            player = GlickoFighter(rating=ratings[i], rating_deviation=rds[i], volatility=volatilities[i])
+            opponent = GlickoFighter(rating=opponent_ratings[i], rating_deviation=opponent_rds[i], volatility=0.06)
+            self.calculator.rate_1vs1(player, opponent, outcomes[i])
+
+            self.assertAlmostEqual(new_ratings[i], player.rating, places=6)
+            self.assertAlmostEqual(new_rds[i], player.rating_deviation, places=6)
+            self.assertAlmostEqual(new_vols[i], player.volatility, places=9)
+
+    def test_batch_several_opponents(self):
+        opponents = [(1400, 30), (1550, 100), (1700, 300)]
+        outcomes = [1, 0, 0]
+        player = GlickoFighter(rating=1500, rating_deviation=200, volatility=0.06)
+        self.calculator.update_player(player, [o[0] for o in opponents], [o[1] for o in opponents], outcomes)
+
+        new_ratings, new_rds, new_vols = self.calculator.rate_batch(
+            [1500], [200], [0.06], [[o[0] for o in opponents]], [[o[1] for o in opponents]], [outcomes]
+        )
+
+        self.assertAlmostEqual(new_ratings[0], player.rating, places=6)
+        self.assertAlmostEqual(new_rds[0], player.rating_deviation, places=6)
+        self.assertAlmostEqual(new_vols[0], player.volatility, places=9)
+
+    def test_rate_card_uses_pre_card_states(self):
+        red = GlickoFighter(rating=1600, rating_deviation=80, volatility=0.06)
+        blue = GlickoFighter(rating=1450, rating_deviation=120, volatility=0.06)
+        red_copy = GlickoFighter(red.rating, red.rating_deviation, red.volatility)
+        blue_copy = GlickoFighter(blue.rating, blue.rating_deviation, blue.volatility)
+
+        self.calculator.rate_card([(red, blue, 0.3)])
+        self.calculator.rate_1vs1(red_copy, GlickoFighter(1450, 120, 0.06), 0.3)
+        self.calculator.rate_1vs1(blue_copy, GlickoFighter(1600, 80, 0.06), 0.7)
+
+        self.assertAlmostEqual(red.rating, red_copy.rating, places=6)
+        self.assertAlmostEqual(blue.rating, blue_copy.rating, places=6)
+        self.assertAlmostEqual(blue.rating_deviation, blue_copy.rating_deviation, places=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,21 +1,113 @@
+import os
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
 
 from Models.Functional_Classes.globals.DecisionTree import DecisionTree
-from Models.Functional_Classes.globals.Most_Common_lable import most_common_label
+from Models.Functional_Classes.globals.Most_Common_lable import most_common_label, most_common_labels
+from Models.Functional_Classes.globals.Flat_Tree import flatten_tree, stack_flat_trees, evaluate_flat_trees
+from Models.Functional_Classes.globals.Histogram import compute_bin_edges
+
+# the training data as seen by a worker process, these are views onto shared memory
+_worker_X = None
+_worker_y = None
+_worker_blocks = []
+
+def _attach_shared_array(name, shape, dtype):
+    # Pool workers share the parent's resource tracker, so only the parent unlinks the block
+    block = shared_memory.SharedMemory(name=name)
+    _worker_blocks.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _init_worker(X_info, y_info):
+    global _worker_X, _worker_y
+    _worker_X = _attach_shared_array(*X_info)
+    _worker_y = _attach_shared_array(*y_info)
+
+def _fit_one_tree(X, y, tree_params, seed, bin_edges):
+    # Everything random about a tree comes from its own seed so it is the same in any process
+    rng = np.random.default_rng(seed)
+    n_samples = X.shape[0]
+    idxs = rng.choice(n_samples, n_samples, replace=True)
+
+    tree = DecisionTree(**tree_params, random_state=rng)
+    tree.fit(X[idxs], y[idxs], bin_edges=bin_edges)
+    return tree
+
+def _fit_tree_worker(tree_params, seed, bin_edges):
+    return _fit_one_tree(_worker_X, _worker_y, tree_params, seed, bin_edges)
+
+def _to_shared_array(array):
+    # Copy an array into a new shared memory block so workers can read it without a pickled copy
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[:] = array
+    return block, (block.name, array.shape, array.dtype)
 
 class My_Random_Forrest():
-    def __init__(self, n_estimators = 100, max_depth = 10, min_samples_split = 2, n_features = None):
+    # batches bigger than this are split into chunks when predicting with more than one job
+    PREDICT_CHUNK_SIZE = 10000
+
+    def __init__(self, n_estimators = 100, max_depth = 10, min_samples_split = 2, n_features = None, split_algorithm = 'exact', max_bins = 255, n_jobs = 1, random_state = None):
         # Initialize hyperparameters
         self.n_estimators = n_estimators
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
         self.n_features = n_features
+        self.split_algorithm = split_algorithm
+        self.max_bins = max_bins
+        # n_jobs is the number of worker processes, -1 uses every core
+        self.n_jobs = n_jobs
+        self.random_state = random_state
         
         self.trees = []
+        self.flat_forest = None
+        
+    def get_n_jobs(self):
+        n_jobs = getattr(self, 'n_jobs', 1)
+        return os.cpu_count() if n_jobs in (None, -1) else max(1, n_jobs)
         
     def fit(self, X, y,):
         self.trees = []
+        self.flat_forest = None
+        
+        # In hist mode the bin edges are worked out once on the full data and shared by every tree
+        bin_edges = compute_bin_edges(X, self.max_bins) if self.split_algorithm == 'hist' else None
         
+        n_jobs = self.get_n_jobs()
+        
+        # Without a seed or workers keep the original behaviour of drawing from the global np.random state
+        if self.random_state is None and n_jobs == 1:
+            self.fit_sequential(X, y, bin_edges)
+            return
+        
+        # One child seed per tree so the forest is the same whatever the number of workers
+        seeds = np.random.SeedSequence(self.random_state).spawn(self.n_estimators)
+        tree_params = {
+            "max_depth": self.max_depth,
+            "min_samples_split": self.min_samples_split,
+            "n_features": self.n_features,
+            "split_algorithm": self.split_algorithm,
+            "max_bins": self.max_bins,
+        }
+        
+        if n_jobs == 1:
+            self.trees = [_fit_one_tree(X, y, tree_params, seed, bin_edges) for seed in seeds]
+            return
+        
+        # Put the training data in shared memory once, then fit the trees across a pool of processes
+        X_block, X_info = _to_shared_array(np.ascontiguousarray(X))
+        y_block, y_info = _to_shared_array(np.ascontiguousarray(y))
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X_info, y_info)) as executor:
+                futures = [executor.submit(_fit_tree_worker, tree_params, seed, bin_edges) for seed in seeds]
+                self.trees = [future.result() for future in futures]
+        finally:
+            for block in (X_block, y_block):
+                block.close()
+                block.unlink()
+        
+    def fit_sequential(self, X, y, bin_edges = None):
         # Build the forest by training n_estimators number of independent trees
         for _ in range(self.n_estimators):
             X_sample, y_sample = self.bootstrap(X, y)
@@ -23,11 +115,13 @@ class My_Random_Forrest():
             tree = DecisionTree(
                 max_depth = self.max_depth,
                 min_samples_split=self.min_samples_split,
-                n_features=self.n_features
+                n_features=self.n_features,
+                split_algorithm=self.split_algorithm,
+                max_bins=self.max_bins
             )
             
             # Train the individual tree on the bootstrapped sample and store it
-            tree.fit(X_sample, y_sample)
+            tree.fit(X_sample, y_sample, bin_edges=bin_edges)
             self.trees.append(tree)
                     
     def bootstrap(self, X, y):
@@ -38,9 +132,34 @@ class My_Random_Forrest():
         
         return X[idxs], y[idxs]
     
-    def predict(self, X):
-        # Collect predictions from every tree in the forest
-        predictions = np.array([tree.predict(X) for tree in self.trees])
-        # Transpose so rows represent samples and columns represent tree votes
-        tree_preds = np.swapaxes(predictions, 0, 1)
-        return np.array([most_common_label(tree_pred) for tree_pred in tree_preds])
\ No newline at end of file
+    def compile(self):
+        # Stack every tree into one set of arrays so the whole forest is evaluated together
+        self.flat_forest = stack_flat_trees([flatten_tree(tree.root) for tree in self.trees])
+        return self
+    
+    def predict(self, X, compiled = True):
+        if not compiled:
+            # Collect predictions from every tree in the forest
+            predictions = np.array([tree.predict(X, compiled=False) for tree in self.trees])
+            # Transpose so rows represent samples and columns represent tree votes
+            tree_preds = np.swapaxes(predictions, 0, 1)
+            return np.array([most_common_label(tree_pred) for tree_pred in tree_preds])
+        
+        # Older pickled forests have no flat arrays yet so build them on first use
+        if getattr(self, 'flat_forest', None) is None:
+            self.compile()
+        
+        n_jobs = self.get_n_jobs()
+        if n_jobs > 1 and len(X) > self.PREDICT_CHUNK_SIZE:
+            # Large batches are cut into chunks and evaluated on threads, NumPy releases the GIL
+            # for the indexing and comparisons so the chunks run side by side without copying the forest
+            chunks = [X[start:start + self.PREDICT_CHUNK_SIZE] for start in range(0, len(X), self.PREDICT_CHUNK_SIZE)]
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                return np.concatenate(list(executor.map(self.predict_chunk, chunks)))
+        
+        return self.predict_chunk(X)
+    
+    def predict_chunk(self, X):
+        # Every tree votes for every sample at once, then the majority vote is taken per sample
+        votes = evaluate_flat_trees(self.flat_forest, X)
+        return most_common_labels(votes)
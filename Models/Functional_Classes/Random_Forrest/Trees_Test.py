@@ -3,7 +3,8 @@ import numpy as np
 
 # Adjust these imports to match your actual file structure
 from Models.Functional_Classes.globals.DecisionTree import DecisionTree
-from Models.Functional_Classes.globals.My_Random_Forrest import My_Random_Forrest
+from Models.Functional_Classes.Random_Forrest.My_Random_Forrest import My_Random_Forrest
+from Models.Functional_Classes.globals.Flat_Tree import flatten_tree
 
 class TestTreeModels(unittest.TestCase):
 
@@ -65,5 +66,101 @@ class TestTreeModels(unittest.TestCase):
         except Exception as e:
             self.fail(f"Random Forest crashed when using n_features subset: {e}")
 
+    # COMPILED INFERENCE TESTS
+
+    def test_dt_compiled_matches_recursive(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 6))
+        y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+
+        tree = DecisionTree(max_depth=8)
+        tree.fit(X, y)
+
+        X_new = rng.normal(size=(200, 6))
+        np.testing.assert_array_equal(tree.predict(X_new), tree.predict(X_new, compiled=False))
+
+    def test_rf_compiled_matches_recursive(self):
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(300, 8))
+        y = (X[:, 0] - X[:, 3] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+
+        rf = My_Random_Forrest(n_estimators=20, max_depth=6, n_features=3)
+        rf.fit(X, y)
+
+        X_new = rng.normal(size=(500, 8))
+        np.testing.assert_array_equal(rf.predict(X_new), rf.predict(X_new, compiled=False))
+
+    def test_rf_tied_votes_match_recursive(self):
+        X = np.array([[0], [1], [2], [3]])
+        y = np.array([0, 0, 1, 1])
+
+        rf = My_Random_Forrest(n_estimators=4, max_depth=1)
+        rf.fit(X, y)
+
+        np.testing.assert_array_equal(rf.predict(X), rf.predict(X, compiled=False))
+
+    # HISTOGRAM SPLIT TESTS
+
+    def test_dt_hist_matches_exact_with_full_bins(self):
+        rng = np.random.default_rng(2)
+        X = np.round(rng.normal(size=(300, 5)), 2)
+        y = (X[:, 0] + X[:, 4] > 0).astype(int)
+
+        np.random.seed(0)
+        exact_tree = DecisionTree(max_depth=6, n_features=3)
+        exact_tree.fit(X, y)
+
+        np.random.seed(0)
+        hist_tree = DecisionTree(max_depth=6, n_features=3, split_algorithm='hist', max_bins=1000)
+        hist_tree.fit(X, y)
+
+        exact_flat = flatten_tree(exact_tree.root)
+        hist_flat = flatten_tree(hist_tree.root)
+        for key in ['feature', 'threshold', 'left', 'right', 'value']:
+            np.testing.assert_array_equal(exact_flat[key], hist_flat[key])
+
+    def test_rf_hist_few_bins(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(400, 4))
+        y = (X[:, 0] > 0.2).astype(int)
+
+        rf = My_Random_Forrest(n_estimators=5, max_depth=4, split_algorithm='hist', max_bins=16)
+        rf.fit(X, y)
+
+        self.assertGreater(np.mean(rf.predict(X) == y), 0.9)
+
+    def test_unknown_split_algorithm(self):
+        with self.assertRaises(ValueError):
+            DecisionTree(split_algorithm='approx').fit(self.X_xor, self.y_xor)
+
+    # PARALLEL TRAINING TESTS
+
+    def test_rf_same_forest_for_any_worker_count(self):
+        rng = np.random.default_rng(4)
+        X = rng.normal(size=(200, 5))
+        y = (X[:, 1] > 0).astype(int)
+
+        forests = []
+        for n_jobs in (1, 2):
+            rf = My_Random_Forrest(n_estimators=6, max_depth=4, n_features=2, n_jobs=n_jobs, random_state=7)
+            rf.fit(X, y)
+            forests.append(rf.compile().flat_forest)
+
+        for key in ['feature', 'threshold', 'left', 'right', 'value', 'roots']:
+            np.testing.assert_array_equal(forests[0][key], forests[1][key])
+
+    def test_rf_parallel_predict_matches_serial(self):
+        rng = np.random.default_rng(5)
+        X = rng.normal(size=(200, 3))
+        y = (X[:, 0] > 0).astype(int)
+
+        rf = My_Random_Forrest(n_estimators=5, max_depth=4, random_state=1)
+        rf.fit(X, y)
+        X_big = rng.normal(size=(25000, 3))
+        serial = rf.predict(X_big)
+
+        rf.n_jobs = 2
+        np.testing.assert_array_equal(rf.predict(X_big), serial)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,9 +1,12 @@
 import numpy as np
 import pandas as pd
 from Models.Functional_Classes.globals.TreeNode import TreeNode
+from Models.Functional_Classes.globals.Flat_Tree import flatten_tree, stack_flat_trees, evaluate_flat_trees
+from Models.Functional_Classes.globals.Histogram import compute_bin_edges, bin_features
+from Models.Functional_Classes.XGBoost.Objectives import get_objective
 
 class My_XGBoost_Regressor():
-    def __init__(self, n_estimators=100, max_depth=3, learning_rate=0.1, gamma = 0.1, reg_lambda = 0.1, min_sample_split = 2):
+    def __init__(self, n_estimators=100, max_depth=3, learning_rate=0.1, gamma = 0.1, reg_lambda = 0.1, min_sample_split = 2, split_algorithm = 'exact', max_bins = 255, objective = 'squared_error'):
         # Initialize hyperparameters
         self.n_estimators = n_estimators
         self.learning_rate = learning_rate
@@ -14,32 +17,108 @@ class My_XGBoost_Regressor():
 
         self.min_sample_split = min_sample_split
 
+        # 'exact' tries every unique value, 'hist' sums gradients into at most max_bins bins per feature
+        self.split_algorithm = split_algorithm
+        self.max_bins = max_bins
+        self.bin_edges = None
+
+        # 'squared_error' for regression targets, 'logistic' for 0/1 win targets
+        self.objective = objective
+
         self.trees = []
+        self.flat_trees = None
         self.base_prediction = None
         self.feature_importances = {}
 
-    def fit(self, X: np.ndarray, y: np.ndarray):    
+        # Per round loss history and the round with the lowest validation loss
+        self.evals_result = {}
+        self.best_iteration = None
+        self.best_score = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray, eval_set = None, early_stopping_rounds = None):    
         if isinstance(X, pd.DataFrame):
             self.feature_importances = {col: 0 for col in X.columns}
             X = X.values
 
-        # Initialize model with the mean of target values
-        self.base_prediction = np.mean(y)
-        current_prediction = np.full(y.shape, self.base_prediction)
+        if early_stopping_rounds is not None and eval_set is None:
+            raise ValueError("early_stopping_rounds needs an eval_set to watch.")
+
+        loss = get_objective(self.objective)
+
+        if self.split_algorithm not in ('exact', 'hist'):
+            raise ValueError(f"Unknown split_algorithm '{self.split_algorithm}', use 'exact' or 'hist'.")
+
+        if self.split_algorithm == 'hist':
+            # Bin X once, every round then works on the same bin indices
+            self.bin_edges = compute_bin_edges(X, self.max_bins)
+            self.bin_offsets = np.concatenate([[0], np.cumsum([len(edges) for edges in self.bin_edges])])
+            X_binned = bin_features(X, self.bin_edges)
+
+        # Initialize model with the raw score that minimises the loss with no trees
+        y = np.asarray(y, dtype=float)
+        self.base_prediction = loss.base_score(y)
+        current_prediction = np.full(y.shape, self.base_prediction, dtype=float)
+
+        self.trees = []
+        self.flat_trees = None
+        self.evals_result = {"train": []}
+        self.best_iteration = None
+        self.best_score = None
+
+        # Validation raw scores are kept and only the newest tree is added each round
+        if eval_set is not None:
+            X_val, y_val = eval_set
+            if isinstance(X_val, pd.DataFrame):
+                X_val = X_val.values
+            y_val = np.asarray(y_val, dtype=float)
+            val_prediction = np.full(y_val.shape, self.base_prediction, dtype=float)
+            self.evals_result["validation"] = []
 
         # Iteratively build trees to correct errors of the previous ensemble
         for _ in range(self.n_estimators):
-            # Calculate gradients and hessians by using the furst and second derivatives of mean squared error
-            gradients = 2 * (current_prediction - y)
-            hessians = np.full(y.shape, 2)
+            # Calculate gradients and hessians by using the first and second derivatives of the loss
+            gradients = loss.gradients(y, current_prediction)
+            hessians = loss.hessians(y, current_prediction)
 
             # Build a new tree to predict these gradients
-            tree = self.build_tree(X, gradients, hessians, depth=0)
+            if self.split_algorithm == 'hist':
+                tree = self.build_tree_hist(X_binned, gradients, hessians, depth=0)
+            else:
+                tree = self.build_tree(X, gradients, hessians, depth=0)
             self.trees.append(tree)
 
-            # Update predictions by adding the new tree's output weighted by learning rate
-            updated_values = self.get_tree_predictions(tree, X)
+            # Update predictions by adding the new tree's output weighted by learning rate,
+            # the tree is flattened once for both the training and validation updates
+            flat_tree = stack_flat_trees([flatten_tree(tree)])
+            updated_values = self.get_tree_predictions(flat_tree, X)
             current_prediction += self.learning_rate * updated_values
+            self.evals_result["train"].append(loss.metric(y, current_prediction))
+
+            if eval_set is None:
+                continue
+
+            val_prediction += self.learning_rate * self.get_tree_predictions(flat_tree, X_val)
+            val_score = loss.metric(y_val, val_prediction)
+            self.evals_result["validation"].append(val_score)
+
+            if self.best_score is None or val_score < self.best_score:
+                self.best_score = val_score
+                self.best_iteration = len(self.trees) - 1
+
+            # Stop once validation loss has not improved for early_stopping_rounds rounds
+            if early_stopping_rounds is not None and len(self.trees) - 1 - self.best_iteration >= early_stopping_rounds:
+                break
+
+        # Drop the trees built after the best round so the model is the one that validated best
+        if early_stopping_rounds is not None and self.best_iteration is not None:
+            self.trees = self.trees[:self.best_iteration + 1]
+
+        self.compile()
+
+    def compile(self):
+        # Stack every tree into one set of arrays so predicting does not flatten them again
+        self.flat_trees = stack_flat_trees([flatten_tree(tree) for tree in self.trees]) if self.trees else None
+        return self
 
     def build_tree(self, X, gradients, hessians, depth):
         n_samples, n_features = X.shape
@@ -114,4 +193,160 @@ class My_XGBoost_Regressor():
             split_feature_idx=best_split_info["feature_idx"],
             split_threshold=best_split_info["threshold"],
             left_child = left_child,
-            right_child = right_child)
\ No newline at end of file
+            right_child = right_child)
+
+    def build_histograms(self, X_binned, gradients, hessians):
+        # Gradient, hessian and sample count sums for every bin of every feature, one bincount each
+        n_features = X_binned.shape[1]
+        total_bins = self.bin_offsets[-1]
+        flat_bins = (X_binned + self.bin_offsets[:-1]).ravel()
+
+        g_hist = np.bincount(flat_bins, weights=np.repeat(gradients, n_features), minlength=total_bins)
+        h_hist = np.bincount(flat_bins, weights=np.repeat(hessians, n_features), minlength=total_bins)
+        count_hist = np.bincount(flat_bins, minlength=total_bins)
+
+        return g_hist, h_hist, count_hist
+
+    def build_tree_hist(self, X_binned, gradients, hessians, depth, histograms = None):
+        n_samples, n_features = X_binned.shape
+
+        # stop if max depth or min samples reached
+        if depth >= self.max_depth or n_samples < self.min_sample_split:
+            leaf_value = self.calc_best_leaf_value(gradients, hessians)
+            return TreeNode(value = leaf_value)
+
+        if histograms is None:
+            histograms = self.build_histograms(X_binned, gradients, hessians)
+        g_hist, h_hist, count_hist = histograms
+
+        best_gain = -np.inf
+        best_split_info = {}
+
+        # Calculate quality of the current node before splitting
+        parent_g_sum = np.sum(gradients)
+        parent_h_sum = np.sum(hessians)
+        parent_quality = self.calc_quality(parent_g_sum, parent_h_sum)
+
+        # Running sums over each features bins give the left side of every threshold at once
+        for feature_idx in range(n_features):
+            feature_bins = slice(self.bin_offsets[feature_idx], self.bin_offsets[feature_idx + 1])
+
+            g_left = np.cumsum(g_hist[feature_bins])
+            h_left = np.cumsum(h_hist[feature_bins])
+            count_left = np.cumsum(count_hist[feature_bins])
+            g_right = g_left[-1] - g_left
+            h_right = h_left[-1] - h_left
+            count_right = count_left[-1] - count_left
+
+            # Calculate gain which is left quality + right quality - parent quality - Gamma
+            gains = self.calc_quality(g_left, h_left) + self.calc_quality(g_right, h_right) - parent_quality - self.gamma
+            gains[(count_left < 1) | (count_right < 1)] = -np.inf
+
+            best_bin = int(np.argmax(gains))
+            if gains[best_bin] > best_gain:
+                best_gain = gains[best_bin]
+                best_split_info = {
+                    "feature_idx": feature_idx,
+                    "bin": best_bin,
+                }
+
+        # If gain is too small so below gamma, stop splitting and make a leaf
+        if best_gain <= self.gamma:
+            leaf_value = self.calc_best_leaf_value(gradients, hessians)
+            return TreeNode(value = leaf_value)
+
+        # Track feature importance 
+        if self.feature_importances:
+            feature_name = list(self.feature_importances.keys())[best_split_info["feature_idx"]]
+            self.feature_importances[feature_name] += best_gain
+
+        left_mask = X_binned[:, best_split_info["feature_idx"]] <= best_split_info["bin"]
+        right_mask = ~left_mask
+
+        # Only the smaller child is summed from its samples, the larger one is the parent minus its sibling
+        left_histograms, right_histograms = None, None
+        if depth + 1 < self.max_depth:
+            small_mask = left_mask if np.sum(left_mask) <= np.sum(right_mask) else right_mask
+            small_histograms = self.build_histograms(X_binned[small_mask], gradients[small_mask], hessians[small_mask])
+            large_histograms = tuple(parent - small for parent, small in zip(histograms, small_histograms))
+
+            if small_mask is left_mask:
+                left_histograms, right_histograms = small_histograms, large_histograms
+            else:
+                left_histograms, right_histograms = large_histograms, small_histograms
+
+        # Recursively build left and right subtrees
+        left_child = self.build_tree_hist(
+            X_binned[left_mask], gradients[left_mask], hessians[left_mask], depth + 1, left_histograms
+            )
+        right_child = self.build_tree_hist(
+            X_binned[right_mask], gradients[right_mask], hessians[right_mask], depth + 1, right_histograms
+            )
+
+        # Store the real value at the bins edge so predicting works on raw features
+        return TreeNode(
+            split_feature_idx=best_split_info["feature_idx"],
+            split_threshold=self.bin_edges[best_split_info["feature_idx"]][best_split_info["bin"]],
+            left_child = left_child,
+            right_child = right_child)
+
+    def calc_quality(self, g_sum, h_sum):
+        # Structure score of a node, the squared gradient sum shrunk by the regularisation term
+        return (g_sum ** 2) / (h_sum + self.reg_lambda)
+
+    def calc_best_leaf_value(self, gradients, hessians):
+        # Optimal leaf weight which is -G / (H + lambda)
+        return -np.sum(gradients) / (np.sum(hessians) + self.reg_lambda)
+
+    def get_tree_predictions(self, flat_tree, X):
+        # Get the output of a single flattened tree for every sample in X
+        return evaluate_flat_trees(flat_tree, X)[0].astype(float)
+
+    def traverse_tree(self, x, node):
+        # Walk down the tree until a leaf is reached
+        if node.is_leaf():
+            return node.value
+
+        if x[node.split_feature_idx] <= node.split_threshold:
+            return self.traverse_tree(x, node.left_child)
+
+        return self.traverse_tree(x, node.right_child)
+
+    def predict_raw(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+
+        # Start from the base prediction and add the scaled output of every tree
+        predictions = np.full(X.shape[0], self.base_prediction, dtype=float)
+        if not self.trees:
+            return predictions
+
+        # Older pickled models have no flat arrays yet so build them on first use
+        if getattr(self, 'flat_trees', None) is None:
+            self.compile()
+
+        # Evaluate every tree together on the stacked flat arrays
+        tree_outputs = evaluate_flat_trees(self.flat_trees, X).astype(float)
+        for tree_output in tree_outputs:
+            predictions += self.learning_rate * tree_output
+
+        return predictions
+
+    def predict(self, X, threshold = 0.5):
+        # Models pickled before objectives existed are squared error
+        objective = getattr(self, "objective", "squared_error")
+        raw_predictions = self.predict_raw(X)
+
+        # Logistic models return labels like the forest, regression returns the values
+        if objective == "logistic":
+            return (get_objective(objective).transform(raw_predictions) > threshold).astype(int)
+
+        return get_objective(objective).transform(raw_predictions)
+
+    def predict_proba(self, X):
+        # Probability of the positive class for every sample
+        objective = getattr(self, "objective", "squared_error")
+        if objective != "logistic":
+            raise ValueError("predict_proba needs the 'logistic' objective.")
+
+        return get_objective(objective).transform(self.predict_raw(X))
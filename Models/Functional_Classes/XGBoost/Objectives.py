@@ -0,0 +1,63 @@
+import numpy as np
+
+# Loss functions the booster can minimise. Each one gives the starting raw score,
+# the first and second derivatives of the loss for every sample at once, and the
+# transform from the summed raw tree output to the value that is returned.
+# metric is the loss itself, used to track training and validation each round.
+
+class SquaredError():
+    def base_score(self, y):
+        # The mean minimises squared error before any trees are added
+        return np.mean(y)
+
+    def gradients(self, y, raw_prediction):
+        return 2 * (raw_prediction - y)
+
+    def hessians(self, y, raw_prediction):
+        return np.full(y.shape, 2.0)
+
+    def transform(self, raw_prediction):
+        return raw_prediction
+
+    def metric(self, y, raw_prediction):
+        # Mean squared error
+        return np.mean((y - raw_prediction) ** 2)
+
+
+class BinaryLogistic():
+    def sigmoid(self, z):
+        # Clip input to prevent overflow or underflow error in exp()
+        z = np.clip(z, -250, 250)
+        return 1 / (1 + np.exp(-z))
+
+    def base_score(self, y):
+        # Log odds of the positive rate, clipped so an all 0 or all 1 target stays finite
+        positive_rate = np.clip(np.mean(y), 1e-6, 1 - 1e-6)
+        return np.log(positive_rate / (1 - positive_rate))
+
+    def gradients(self, y, raw_prediction):
+        return self.sigmoid(raw_prediction) - y
+
+    def hessians(self, y, raw_prediction):
+        # p(1 - p) vanishes for confident samples, keep a floor so leaf weights stay finite
+        probabilities = self.sigmoid(raw_prediction)
+        return np.maximum(probabilities * (1 - probabilities), 1e-16)
+
+    def transform(self, raw_prediction):
+        return self.sigmoid(raw_prediction)
+
+    def metric(self, y, raw_prediction):
+        # Log loss, clipped so a confident wrong prediction does not give inf
+        probabilities = np.clip(self.sigmoid(raw_prediction), 1e-15, 1 - 1e-15)
+        return -np.mean(y * np.log(probabilities) + (1 - y) * np.log(1 - probabilities))
+
+
+OBJECTIVES = {
+    "squared_error": SquaredError,
+    "logistic": BinaryLogistic,
+}
+
+def get_objective(name: str):
+    if name not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{name}', use one of {list(OBJECTIVES)}.")
+    return OBJECTIVES[name]()
@@ -1,6 +1,7 @@
 import unittest
 import numpy as np
 from Models.Functional_Classes.globals.TreeNode import TreeNode
+from Models.Functional_Classes.globals.Flat_Tree import flatten_tree
 from Models.Functional_Classes.XGBoost.My_XGBoost import My_XGBoost_Regressor
 class TestXGBoostFull(unittest.TestCase):
 
@@ -55,5 +56,121 @@ class TestXGBoostFull(unittest.TestCase):
         preds = self.model.predict(X)
         self.assertGreater(preds[3], preds[0])
 
+    def test_hist_matches_exact(self):
+        rng = np.random.default_rng(0)
+        X = rng.integers(0, 20, size=(300, 4)).astype(float)
+        y = X[:, 0] * 2 - X[:, 2] + rng.normal(0, 0.5, 300)
+
+        exact = My_XGBoost_Regressor(n_estimators=5, max_depth=3, reg_lambda=1.0)
+        hist = My_XGBoost_Regressor(n_estimators=5, max_depth=3, reg_lambda=1.0, split_algorithm='hist')
+        exact.fit(X, y)
+        hist.fit(X, y)
+
+        for exact_tree, hist_tree in zip(exact.trees, hist.trees):
+            exact_flat, hist_flat = flatten_tree(exact_tree), flatten_tree(hist_tree)
+            for key in ("feature", "threshold", "left", "right"):
+                np.testing.assert_array_equal(exact_flat[key], hist_flat[key])
+            np.testing.assert_allclose(exact_flat["value"].astype(float), hist_flat["value"].astype(float))
+
+        np.testing.assert_allclose(exact.predict(X), hist.predict(X))
+
+    def test_hist_few_bins_learns(self):
+        X = np.linspace(0, 10, 200).reshape(-1, 1)
+        y = np.sin(X[:, 0])
+        model = My_XGBoost_Regressor(n_estimators=20, max_depth=3, reg_lambda=1.0, split_algorithm='hist', max_bins=16)
+        model.fit(X, y)
+
+        self.assertLessEqual(len(model.bin_edges[0]), 16)
+        self.assertLess(np.mean((y - model.predict(X)) ** 2), np.var(y))
+
+    def test_logistic_probabilities(self):
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(400, 3))
+        y = (X[:, 0] + 0.5 * X[:, 1] > 0).astype(int)
+        model = My_XGBoost_Regressor(n_estimators=30, max_depth=3, reg_lambda=1.0, objective='logistic', split_algorithm='hist')
+        model.fit(X, y)
+
+        probabilities = model.predict_proba(X)
+        self.assertTrue(np.all((probabilities > 0) & (probabilities < 1)))
+        np.testing.assert_array_equal(model.predict(X), (probabilities > 0.5).astype(int))
+        self.assertGreater(np.mean(model.predict(X) == y), 0.9)
+
+        log_loss = -np.mean(y * np.log(probabilities) + (1 - y) * np.log(1 - probabilities))
+        self.assertLess(log_loss, np.log(2))
+
+    def test_logistic_single_class(self):
+        X = np.array([[1], [2], [3]])
+        y = np.array([1, 1, 1])
+        model = My_XGBoost_Regressor(n_estimators=5, objective='logistic')
+        model.fit(X, y)
+
+        self.assertTrue(np.all(np.isfinite(model.predict_proba(X))))
+        np.testing.assert_array_equal(model.predict(X), y)
+
+    def test_predict_proba_needs_logistic(self):
+        self.model.fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            self.model.predict_proba(self.X)
+
+    def test_unknown_objective(self):
+        model = My_XGBoost_Regressor(objective='hinge')
+        with self.assertRaises(ValueError):
+            model.fit(self.X, self.y)
+
+    def test_eval_history_is_recorded(self):
+        X_val, y_val = np.array([[1.5], [3.5]]), np.array([3.0, 7.0])
+        self.model.fit(self.X, self.y, eval_set=(X_val, y_val))
+
+        self.assertEqual(len(self.model.evals_result["train"]), 10)
+        self.assertEqual(len(self.model.evals_result["validation"]), 10)
+        self.assertAlmostEqual(self.model.evals_result["validation"][-1], np.mean((y_val - self.model.predict(X_val)) ** 2))
+        self.assertEqual(self.model.best_score, min(self.model.evals_result["validation"]))
+
+    def test_early_stopping_keeps_best_round(self):
+        rng = np.random.default_rng(2)
+        X = rng.normal(size=(200, 2))
+        y = X[:, 0] + rng.normal(0, 1.0, 200)
+        X_val = rng.normal(size=(100, 2))
+        y_val = X_val[:, 0] + rng.normal(0, 1.0, 100)
+
+        model = My_XGBoost_Regressor(n_estimators=300, max_depth=4, learning_rate=0.3, reg_lambda=1.0, split_algorithm='hist')
+        model.fit(X, y, eval_set=(X_val, y_val), early_stopping_rounds=5)
+
+        history = model.evals_result["validation"]
+        self.assertLess(len(history), 300)
+        self.assertEqual(len(history) - 1 - model.best_iteration, 5)
+        self.assertEqual(len(model.trees), model.best_iteration + 1)
+        self.assertAlmostEqual(np.mean((y_val - model.predict(X_val)) ** 2), model.best_score)
+
+    def test_compiled_once_and_matches_traversal(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(100, 3))
+        y = X[:, 0] - X[:, 1] + rng.normal(0, 0.1, 100)
+        model = My_XGBoost_Regressor(n_estimators=20, max_depth=3, reg_lambda=1.0)
+        model.fit(X, y)
+
+        # the flat arrays are built by fit and reused by every predict
+        flat_trees = model.flat_trees
+        self.assertEqual(len(flat_trees["roots"]), len(model.trees))
+        predictions = model.predict(X)
+        self.assertIs(model.flat_trees, flat_trees)
+
+        expected = [model.base_prediction + sum(model.learning_rate * model.traverse_tree(x, tree) for tree in model.trees) for x in X]
+        np.testing.assert_allclose(predictions, expected)
+
+        # a model pickled before compile existed builds them on first use
+        del model.flat_trees
+        np.testing.assert_allclose(model.predict(X), predictions)
+        self.assertEqual(len(model.flat_trees["roots"]), len(model.trees))
+
+    def test_early_stopping_needs_eval_set(self):
+        with self.assertRaises(ValueError):
+            self.model.fit(self.X, self.y, early_stopping_rounds=3)
+
+    def test_unknown_split_algorithm(self):
+        model = My_XGBoost_Regressor(split_algorithm='approx')
+        with self.assertRaises(ValueError):
+            model.fit(self.X, self.y)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -3,20 +3,41 @@ import pandas as pd
 
 from Models.Functional_Classes.globals.TreeNode import TreeNode
 from Models.Functional_Classes.globals.Most_Common_lable import most_common_label
+from Models.Functional_Classes.globals.Flat_Tree import flatten_tree, stack_flat_trees, evaluate_flat_trees
+from Models.Functional_Classes.globals.Histogram import compute_bin_edges, bin_features
 
 class DecisionTree:
-    def __init__(self, max_depth = 10, min_samples_split = 2, n_features = None):
+    def __init__(self, max_depth = 10, min_samples_split = 2, n_features = None, split_algorithm = 'exact', max_bins = 255, random_state = None):
         # Initialize hyperparameters
         self.max_depth = max_depth
         self.n_features = n_features
         self.min_samples_split = min_samples_split
+        # 'exact' tries every unique value, 'hist' only tries the edges of at most max_bins bins
+        self.split_algorithm = split_algorithm
+        self.max_bins = max_bins
+        # Seed or Generator for feature sampling, None keeps using the global np.random state
+        self.random_state = random_state
         self.root = None
+        self.flat_tree = None
+        self.bin_edges = None
+        
+    def fit(self, X, y, bin_edges = None):
+        if self.split_algorithm not in ('exact', 'hist'):
+            raise ValueError(f"Unknown split_algorithm '{self.split_algorithm}', use 'exact' or 'hist'.")
         
-    def fit(self, X, y):
         # Determine number of features to consider 
         self.n_features = X.shape[1] if not self.n_features else min(X.shape[1], self.n_features)
+        self.rng = np.random if self.random_state is None else np.random.default_rng(self.random_state)
+        
+        if self.split_algorithm == 'hist':
+            # Quantize every feature once, the tree is then grown on the bin indices
+            self.bin_edges = bin_edges if bin_edges is not None else compute_bin_edges(X, self.max_bins)
+            self.n_classes = int(np.max(y)) + 1
+            X = bin_features(X, self.bin_edges)
+        
         # Start the recursive tree building process from the root
         self.root = self.build_tree(X, y)
+        self.flat_tree = None
         
     def build_tree(self, X, y, depth=0):
         n_samples, n_features = X.shape
@@ -31,7 +52,7 @@ class DecisionTree:
             return TreeNode(value=leaf_value)
 
         # Randomly select a subset of features to evaluate for splitting
-        feat_idxs = np.random.choice(n_features, self.n_features, replace=False)
+        feat_idxs = self.rng.choice(n_features, self.n_features, replace=False)
 
         # Find the best feature and threshold to split this node
         best_feat, best_thresh = self.find_best_split(X, y, feat_idxs)
@@ -54,10 +75,17 @@ class DecisionTree:
         # Recursively build the left and right child nodes
         left_child = self.build_tree(X[left_idxs, :], y[left_idxs], depth + 1)
         right_child = self.build_tree(X[right_idxs, :], y[right_idxs], depth + 1)
+        
+        # In hist mode the split was on a bin index so store the real value at that bins edge
+        if self.split_algorithm == 'hist':
+            best_thresh = self.bin_edges[best_feat][best_thresh]
                 
         return TreeNode(split_feature_idx=best_feat, split_threshold=best_thresh, left_child=left_child, right_child=right_child)
         
     def find_best_split(self, X, y, feature_idxs):
+        if self.split_algorithm == 'hist':
+            return self.find_best_split_hist(X, y, feature_idxs)
+        
         best_gain = -np.inf
         split_idx, split_threshold = None, None
         
@@ -79,6 +107,47 @@ class DecisionTree:
     
         return split_idx, split_threshold
     
+    def find_best_split_hist(self, X_binned, y, feature_idxs):
+        best_gain = -np.inf
+        split_idx, split_bin = None, None
+        
+        n = len(y)
+        parent_gini = self.gini(y)
+        
+        for feature_idx in feature_idxs:
+            n_bins = len(self.bin_edges[feature_idx])
+            
+            # Count every class in every bin in one pass
+            counts = np.bincount(
+                X_binned[:, feature_idx] * self.n_classes + y,
+                minlength=n_bins * self.n_classes
+            ).reshape(n_bins, self.n_classes)
+            
+            # Cumulative sums give the class counts left of every bin edge at once
+            left_counts = np.cumsum(counts, axis=0)
+            right_counts = left_counts[-1] - left_counts
+            n_left = left_counts.sum(axis=1)
+            n_right = n - n_left
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gini_left = 1 - np.sum((left_counts / n_left[:, None]) ** 2, axis=1)
+                gini_right = 1 - np.sum((right_counts / n_right[:, None]) ** 2, axis=1)
+                child_gini = (n_left / n) * gini_left + (n_right / n) * gini_right
+            
+            # Splits that leave one side empty score 0, the same as information_gain
+            gains = np.where((n_left == 0) | (n_right == 0), 0, parent_gini - child_gini)
+            
+            best_bin = int(np.argmax(gains))
+            if gains[best_bin] > best_gain:
+                best_gain = gains[best_bin]
+                split_idx = feature_idx
+                split_bin = best_bin
+        
+        if split_idx is None or split_bin is None:
+            return None, None
+        
+        return split_idx, split_bin
+    
     def information_gain(self, y, X, threshold):
         # Calculate parent impurity (Gini)
         parent_gini = self.gini(y)
@@ -118,9 +187,21 @@ class DecisionTree:
         return 1 - np.sum([p**2 for p in ps if p > 0])
     
     
-    def predict(self, X):
-        # Predict class for every sample in X
-        return np.array([self.traverse_tree(x ,self.root) for x in X])
+    def compile(self):
+        # Flatten the fitted tree into arrays for fast batch prediction
+        self.flat_tree = stack_flat_trees([flatten_tree(self.root)])
+        return self
+    
+    def predict(self, X, compiled = True):
+        if not compiled:
+            # Predict class for every sample in X by walking the node graph
+            return np.array([self.traverse_tree(x ,self.root) for x in X])
+        
+        # Older pickled trees have no flat arrays yet so build them on first use
+        if getattr(self, 'flat_tree', None) is None:
+            self.compile()
+        
+        return evaluate_flat_trees(self.flat_tree, X)[0]
     
     def traverse_tree(self, x, node, parent=None):
         # Recursive function to traverse down to a leaf
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Turns a fitted TreeNode graph into flat NumPy arrays so a whole batch of samples can
+# walk the tree together, one level at a time, instead of one recursive call per sample.
+# Leaves point back at themselves, so extra steps past a leaf leave a sample where it is.
+def flatten_tree(root) -> dict:
+    features, thresholds, lefts, rights, values = [], [], [], [], []
+    max_depth = 0
+
+    # Breadth first walk that gives every node a position in the arrays
+    queue = [(root, 0)]
+    head = 0
+    while head < len(queue):
+        node, depth = queue[head]
+        node_idx = head
+        head += 1
+
+        if node.is_leaf():
+            features.append(0)
+            thresholds.append(0.0)
+            lefts.append(node_idx)
+            rights.append(node_idx)
+            values.append(node.value)
+            max_depth = max(max_depth, depth)
+            continue
+
+        features.append(node.split_feature_idx)
+        thresholds.append(node.split_threshold)
+        lefts.append(len(queue))
+        queue.append((node.left_child, depth + 1))
+        rights.append(len(queue))
+        queue.append((node.right_child, depth + 1))
+        values.append(None)
+
+    # Internal nodes never return a value, so give them the first leaf value to keep one dtype
+    leaf_value = next(v for v in values if v is not None) if any(v is not None for v in values) else 0
+    values = [leaf_value if v is None else v for v in values]
+
+    return {
+        "feature": np.array(features, dtype=np.int64),
+        "threshold": np.array(thresholds, dtype=float),
+        "left": np.array(lefts, dtype=np.int64),
+        "right": np.array(rights, dtype=np.int64),
+        "value": np.array(values),
+        "max_depth": max_depth,
+    }
+
+def stack_flat_trees(flat_trees: list[dict]) -> dict:
+    # Joins many flat trees into one set of arrays, shifting each trees child pointers by its offset
+    sizes = [len(flat["feature"]) for flat in flat_trees]
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+    return {
+        "feature": np.concatenate([flat["feature"] for flat in flat_trees]),
+        "threshold": np.concatenate([flat["threshold"] for flat in flat_trees]),
+        "left": np.concatenate([flat["left"] + root for flat, root in zip(flat_trees, roots)]),
+        "right": np.concatenate([flat["right"] + root for flat, root in zip(flat_trees, roots)]),
+        "value": np.concatenate([flat["value"] for flat in flat_trees]),
+        "roots": roots,
+        "max_depth": max(flat["max_depth"] for flat in flat_trees),
+    }
+
+def evaluate_flat_trees(flat: dict, X) -> np.ndarray:
+    # Returns the leaf value of every tree for every sample, shaped (n_trees, n_samples)
+    X = np.asarray(X, dtype=float)
+    samples = np.arange(X.shape[0])
+    nodes = np.repeat(flat["roots"][:, None], X.shape[0], axis=1)
+
+    # Every sample takes one step down its tree per level, samples already at a leaf stay put
+    for _ in range(flat["max_depth"]):
+        go_left = X[samples, flat["feature"][nodes]] <= flat["threshold"][nodes]
+        nodes = np.where(go_left, flat["left"][nodes], flat["right"][nodes])
+
+    return flat["value"][nodes]
@@ -0,0 +1,32 @@
+import numpy as np
+
+# Helpers for the histogram split modes. Each feature is cut into at most max_bins bins once
+# per fit, then split finding works on small bin indices instead of every raw value.
+
+def compute_bin_edges(X, max_bins = 255) -> list:
+    # The edges are candidate thresholds, every unique value when there are few enough,
+    # otherwise evenly spaced quantiles. The largest value is always the last edge.
+    X = np.asarray(X, dtype=float)
+    bin_edges = []
+
+    for feature_idx in range(X.shape[1]):
+        unique_values = np.unique(X[:, feature_idx])
+
+        if len(unique_values) <= max_bins:
+            edges = unique_values
+        else:
+            edges = np.unique(np.quantile(X[:, feature_idx], np.linspace(0, 1, max_bins)))
+
+        bin_edges.append(edges)
+
+    return bin_edges
+
+def bin_features(X, bin_edges: list) -> np.ndarray:
+    # Gives each value the index of the first edge it is <= to, so "bin <= b" means "value <= edges[b]"
+    X = np.asarray(X, dtype=float)
+    X_binned = np.empty(X.shape, dtype=np.int32)
+
+    for feature_idx, edges in enumerate(bin_edges):
+        X_binned[:, feature_idx] = np.searchsorted(edges, X[:, feature_idx], side='left')
+
+    return X_binned
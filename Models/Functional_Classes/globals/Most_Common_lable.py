@@ -1,4 +1,5 @@
 from collections import Counter
+import numpy as np
 
 # a function used to identify the most commen data lable in a given data set
 def most_common_label(y):
@@ -7,4 +8,17 @@ def most_common_label(y):
     if not counter:
         return None
     
-    return counter.most_common(1)[0][0]
\ No newline at end of file
+    return counter.most_common(1)[0][0]
+
+# a vectorised version of most_common_label for a whole grid of votes shaped (n_voters, n_samples)
+# ties go to the label that was voted for first, the same as Counter.most_common
+def most_common_labels(votes):
+    classes = np.unique(votes)
+    matches = votes[None, :, :] == classes[:, None, None]
+
+    counts = matches.sum(axis=1)
+    first_seen = np.where(matches.any(axis=1), matches.argmax(axis=1), votes.shape[0])
+
+    # only classes with the top count can win, then the earliest of those is picked
+    tied_first_seen = np.where(counts == counts.max(axis=0), first_seen, votes.shape[0] + 1)
+    return classes[tied_first_seen.argmin(axis=0)]
@@ -1,9 +1,9 @@
 import pandas as pd
-import joblib
 
-from config.config import DB_PATH, ENCODERS_PATH
+from config.config import DB_PATH
 from utils.Fighter_Style import define_style
 from Database.database_manager import DatabaseManager
+from utils.model_registry import model_registry
 
 def get_all_fighter_styles(fighter_id):
     # Wrapper to fetch full style object for a single fighter
@@ -23,19 +23,24 @@ def prep_style_features(fighter_ids) -> pd.DataFrame:
     fighter_2_style = styles_map.get(fighter_2_id, {})
 
     # Structure raw  data into a dictionary for a DataFrame 
+    # a fighter with no style row encodes as all zeros, the same as a style the encoders never saw
     model_data = {
-        'primary_1': fighter_1_style['primary_style'],
-        'secondary_1': fighter_1_style['secondary_style'],
-        'tertiary_1': fighter_1_style['tertiary_attributes'],
+        'primary_1': fighter_1_style.get('primary_style'),
+        'secondary_1': fighter_1_style.get('secondary_style'),
+        'tertiary_1': fighter_1_style.get('tertiary_attributes'),
 
-        'primary_2': fighter_2_style['primary_style'],
-        'secondary_2': fighter_2_style['secondary_style'],
-        'tertiary_2': fighter_2_style['tertiary_attributes'],
+        'primary_2': fighter_2_style.get('primary_style'),
+        'secondary_2': fighter_2_style.get('secondary_style'),
+        'tertiary_2': fighter_2_style.get('tertiary_attributes'),
     }
     model_data = pd.DataFrame([model_data])
 
-    # Load the saved dictionary of pre-fitted encoders
-    fitted_encoders = joblib.load(ENCODERS_PATH)
+    return encode_style_features(model_data)
+
+def encode_style_features(model_data: pd.DataFrame, fitted_encoders = None) -> pd.DataFrame:
+    # Use the loaded dictionary of pre-fitted encoders if none were passed in
+    if fitted_encoders is None:
+        fitted_encoders = model_registry.get("style_encoders")
 
     encoded_parts = []
 
@@ -0,0 +1,95 @@
+import itertools
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config.config import STYLE_MATRIX_PATH
+from Models.Functional_Classes.logistic_regression.style_features import encode_style_features
+from utils.model_registry import model_registry
+
+# the encoder for each style level and the key it is stored under in the fighters table
+STYLE_LEVELS = [
+    ("primary", "primary_style"),
+    ("secondary", "secondary_style"),
+    ("tertiary", "tertiary_attributes"),
+]
+
+# The style models red win probability for every pair of style profiles, scored once so a matchup is a lookup.
+# A profile is the code of its primary, secondary and tertiary style in the fitted encoders, with one extra
+# code per level for a style the encoders never saw, which they encode as all zeros.
+class StyleMatrix:
+    def __init__(self, categories: dict, probabilities: np.ndarray, model_version: str):
+        self.categories = categories
+        self.code_maps = {level: {category: i for i, category in enumerate(categories[level])} for level, _ in STYLE_LEVELS}
+        self.sizes = [len(categories[level]) + 1 for level, _ in STYLE_LEVELS]
+        self.probabilities = probabilities
+        self.model_version = model_version
+
+    def get_profile_code(self, style: dict) -> int:
+        # mixed radix, the primary code is the most significant and an unseen style takes the last code of its level
+        code = 0
+        for (level, key), size in zip(STYLE_LEVELS, self.sizes):
+            code = code * size + self.code_maps[level].get(style.get(key), size - 1)
+        return code
+
+    def lookup(self, red_style: dict, blue_style: dict) -> float:
+        return float(self.probabilities[self.get_profile_code(red_style), self.get_profile_code(blue_style)])
+
+
+def get_style_model_version() -> str:
+    # the matrix is only valid for the model and encoders it was scored with
+    return f"{model_registry.get_version('style_model')}-{model_registry.get_version('style_encoders')}"
+
+# scores every pair of profiles with the style model and saves the table for the registry to load
+def build_style_matrix(path: str = STYLE_MATRIX_PATH) -> StyleMatrix:
+    style_model = model_registry.get("style_model")
+    encoders = model_registry.get("style_encoders")
+
+    categories = {level: list(encoders[level].get_category_index()) for level, _ in STYLE_LEVELS}
+
+    # every profile in code order, None stands in for an unseen style
+    profiles = pd.DataFrame(
+        list(itertools.product(*[categories[level] + [None] for level, _ in STYLE_LEVELS])),
+        columns=[level for level, _ in STYLE_LEVELS]
+    )
+
+    # each profile is encoded once in both corners, a pair then takes its red columns from one row and blue from another
+    encoded = encode_style_features(pd.DataFrame({
+        f"{level}_{side}": profiles[level] for level, _ in STYLE_LEVELS for side in ("1", "2")
+    }))
+    is_red = encoded.columns.str.startswith(tuple(f"{level}_1_" for level, _ in STYLE_LEVELS))
+    encoded_values = encoded.values
+
+    n_profiles = len(profiles)
+    probabilities = np.empty((n_profiles, n_profiles), dtype=np.float32)
+    for red_code in range(n_profiles):
+        pairs = np.where(is_red, encoded_values[red_code], encoded_values)
+        probabilities[red_code] = style_model.predict_proba(pd.DataFrame(pairs, columns=encoded.columns))
+
+    style_matrix = StyleMatrix(categories, probabilities, get_style_model_version())
+    joblib.dump(style_matrix, path)
+    print(f"Saved style matrix for {n_profiles} profiles, {n_profiles ** 2} matchups.")
+    return style_matrix
+
+# the saved matrix, or None when it has not been built or the style model has been retrained since
+def get_style_matrix() -> StyleMatrix | None:
+    if not os.path.exists(model_registry.paths["style_matrix"]):
+        return None
+
+    style_matrix = model_registry.get("style_matrix")
+    if style_matrix.model_version != get_style_model_version():
+        return None
+    return style_matrix
+
+# the server builds the matrix on startup when it is missing or was scored with an older style model
+def ensure_style_matrix() -> StyleMatrix:
+    style_matrix = get_style_matrix()
+    if style_matrix is None:
+        style_matrix = build_style_matrix(model_registry.paths["style_matrix"])
+    return style_matrix
+
+
+if __name__ == "__main__":
+    build_style_matrix()
@@ -11,6 +11,10 @@ ENCODERS_PATH = os.path.join(PROJECT_ROOT, 'Models', 'Functional_Classes', 'logi
 DOMINANCE_ENCODER_PATH = os.path.join(PROJECT_ROOT, 'Elo_System', 'dominance_encoder.pkl')
 COLUMNS_PATH = os.path.join(PROJECT_ROOT, 'Models', 'Functional_Classes', 'logistic_regression', 'style_model_columns.pkl')
 MODEL_PATH = os.path.join(PROJECT_ROOT, 'Models', 'Functional_Classes', 'logistic_regression', 'style_model.pkl')
+STYLE_MATRIX_PATH = os.path.join(PROJECT_ROOT, 'Models', 'Functional_Classes', 'logistic_regression', 'style_matrix.pkl')
 DOMINANCE_MODEL_PATH = os.path.join(PROJECT_ROOT, 'Elo_System', 'Performance_Vector_Modal', 'dominance_modal.pkl')
 PREDICTOR_MODEL_PATH = os.path.join(PROJECT_ROOT, 'Fight_Predictor', 'bushy_model.pkl')
 TEST_DATA_PATH = os.path.join(PROJECT_ROOT, 'Fight_Predictor', 'data', 'test_data.pkl')
+RATING_CHECKPOINT_PATH = os.path.join(PROJECT_ROOT, 'Elo_System', 'rating_checkpoint.pkl')
+FEATURE_STORE_PATH = os.path.join(PROJECT_ROOT, 'Fight_Predictor', 'data', 'feature_store.db')
+PAGE_ARCHIVE_PATH = os.path.join(PROJECT_ROOT, 'Data_Scraper', 'page_archive.db')
@@ -1,9 +1,14 @@
+from __future__ import annotations
+
 from math import e
 import pandas as pd
 import numpy as np
 import datetime
+from typing import TYPE_CHECKING
 
-from Models.DB_Classes.Fighters import Fighter
+# Fighter parses its own numbers with the functions below, so it is only imported for the type hints
+if TYPE_CHECKING:
+    from Models.DB_Classes.Fighters import Fighter
 
 def parse_record(record_str: str) -> tuple[int, int , int]:
     # Validate input string exists and starts correctly
@@ -54,6 +59,26 @@ def calc_age(dob: str, event_date: datetime.date) -> float:
     except (ValueError, TypeError):
         return None
 
+def parse_dob_to_ordinal(dob_str: str) -> int | None:
+    if not dob_str or dob_str == '--':
+        return None
+    try:
+        # Day number of the date of birth, so an age is one subtraction
+        return datetime.datetime.strptime(dob_str, '%b %d, %Y').toordinal()
+    except (ValueError, TypeError):
+        return None
+
+def parse_fighter_numbers(height: str, reach: str, dob: str, record: str) -> tuple:
+    # The typed values stored next to a fighters raw strings, a height that does not parse is kept as missing
+    height_cm = parse_height_to_cm(height) or None
+    wins, losses, draws = parse_record(record)
+    return height_cm, parse_reach_to_cm(reach), parse_dob_to_ordinal(dob), wins, losses, draws
+
+def calc_age_from_ordinal(dob_ordinal: int | None, event_date: datetime.date) -> float:
+    if dob_ordinal is None:
+        return None
+    return (event_date.toordinal() - dob_ordinal) / 365.25
+
 def calc_gausian_age_prime(age):
     # Handle missing age with a neutral score
     if age is None:
@@ -68,9 +93,9 @@ def calc_gausian_age_prime(age):
     return score
 
 def calc_record_stats(red_fighter: Fighter, blue_fighter: Fighter):
-    # Parse records for both fighters
-    wins_red, losses_red, draws_red = parse_record(red_fighter.record)
-    wins_blue, losses_blue, draws_blue = parse_record(blue_fighter.record)
+    # Records were parsed when the fighters were saved
+    wins_red, losses_red, draws_red = red_fighter.wins, red_fighter.losses, red_fighter.draws
+    wins_blue, losses_blue, draws_blue = blue_fighter.wins, blue_fighter.losses, blue_fighter.draws
     
     # Calculate total fights as the experiance of a fighter 
     red_total = wins_red + losses_red + draws_red
@@ -95,18 +120,18 @@ def create_fight_features(red_fighter: Fighter, blue_fighter: Fighter, event_dat
     # Set fight date to today 
     fight_date = pd.to_datetime(event_date).date() if event_date else datetime.date.today()
 
-    # Calculate physical stats and differences
-    height_red_cm = parse_height_to_cm(red_fighter.height)
-    height_blue_cm = parse_height_to_cm(blue_fighter.height)
+    # Calculate physical stats and differences from the numbers parsed when the fighters were saved
+    height_red_cm = red_fighter.height_cm or 0
+    height_blue_cm = blue_fighter.height_cm or 0
     height_diff = height_red_cm - height_blue_cm if height_red_cm and height_blue_cm else 0
 
-    reach_red_cm = parse_reach_to_cm(red_fighter.reach)
-    reach_blue_cm = parse_reach_to_cm(blue_fighter.reach)
+    reach_red_cm = red_fighter.reach_cm
+    reach_blue_cm = blue_fighter.reach_cm
     reach_diff = reach_red_cm - reach_blue_cm if reach_red_cm and reach_blue_cm else 0
 
     # Calculate age and physical prime scores
-    age_red = calc_age(red_fighter.dob, fight_date)
-    age_blue = calc_age(blue_fighter.dob, fight_date)
+    age_red = calc_age_from_ordinal(red_fighter.dob_ordinal, fight_date)
+    age_blue = calc_age_from_ordinal(blue_fighter.dob_ordinal, fight_date)
     age_diff = age_red - age_blue if age_red and age_blue else 0
 
     prime_score_red = calc_gausian_age_prime(age_red)
@@ -13,11 +13,16 @@ project_root = os.path.abspath(os.path.join(notebook_dir, '..'))
 sys.path.append(project_root)
 
 from Database.database_manager import DatabaseManager
+from Database.fight_history_index import get_history_index
+from Models.DB_Classes.Fighters import Fighter
+
+# the name restyle_fighters records its last run under in job_watermarks
+STYLE_JOB = "fighter_styles"
 
 def define_style(fighter_id):
+    # Fetch fighter history from the in memory index and details from database
+    fighter_history = get_history_index(DB_PATH).get_fighter_history([fighter_id], datetime.now())
     with DatabaseManager(DB_PATH) as db:
-        # Fetch fighter history and details from database
-        fighter_history = db.get_fighter_history([fighter_id], datetime.now())
         fighter = db.get_fighter_by_id(fighter_id)
 
     if fighter_history.empty or len(fighter_history) < 2:
@@ -124,13 +129,127 @@ def define_style(fighter_id):
         "tertiary_attributes": tertiary_attributes
     }
 
-def get_all_fighter_styles(fighter_ids: pd.DataFrame) -> List[dict]:
-    figher_ids_list = fighter_ids['id'].tolist()
+# the totals define_style adds up for every fighter at once, one row per fighter with both corners stacked
+def aggregate_fighter_stats(fights: pd.DataFrame, fighter_ids = None, as_of = None) -> pd.DataFrame:
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.now())
+    fights = fights[pd.to_datetime(fights['event_date']).values < as_of.to_datetime64()]
+    is_finish = fights['win_method'].str.contains('KO|SUB', na=False).values
+    fight_seconds = (fights['final_time_seconds'] + (fights['final_round'] - 1) * 300).values
+
+    corners = []
+    for corner in ['red', 'blue']:
+        fighter_column = fights[f'{corner}_fighter_id'].values
+        won = fights['winner_id'].values == fighter_column
+        corners.append(pd.DataFrame({
+            "fighter_id": fighter_column,
+            "takedowns": fights[f'{corner}_takedowns'].values,
+            "sub_attempts": fights[f'{corner}_sub_attempts'].values,
+            "sig_strikes": fights[f'{corner}_sig_strikes'].values,
+            "knockdowns": fights[f'{corner}_knockdowns'].values,
+            "fight_seconds": fight_seconds,
+            "wins": won,
+            "finishes": won & is_finish,
+        }))
+    corners = pd.concat(corners, ignore_index=True)
+
+    if fighter_ids is not None:
+        corners = corners[corners['fighter_id'].isin(fighter_ids)]
+
+    # a missing stat in any fight leaves that total missing, the same as adding it up one fight at a time
+    stat_columns = ["takedowns", "sub_attempts", "sig_strikes", "knockdowns", "fight_seconds"]
+    grouped = corners.groupby('fighter_id')
+    totals = grouped[stat_columns].sum().mask(corners[stat_columns].isna().groupby(corners['fighter_id']).any())
+    totals[["wins", "finishes"]] = grouped[["wins", "finishes"]].sum()
+    totals["num_fights"] = grouped.size()
+
+    return totals
+
+# the define_style archetypes applied column by column to the aggregated stats and the fighters details
+def classify_styles(totals: pd.DataFrame, fighters: pd.DataFrame) -> pd.DataFrame:
+    totals = totals.reindex(fighters.index)
+    num_fights = totals["num_fights"].fillna(0).values
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grappling_tendency = (totals["takedowns"].values / num_fights) * 2.0 + (totals["sub_attempts"].values / num_fights) * 1.0
+
+        total_minutes = totals["fight_seconds"].values / 60
+        slpm = np.where(total_minutes > 0, totals["sig_strikes"].values / total_minutes, 0)
+        finish_rate = np.where(totals["wins"].values > 0, totals["finishes"].values / totals["wins"].values, 0)
+        knockdowns_per_fight = totals["knockdowns"].values / num_fights
+
+    # a missing stat compares false everywhere, so it falls through to the last archetype like it does in define_style
+    primary_style = np.select(
+        [grappling_tendency >= 3.5, grappling_tendency >= 1.5, grappling_tendency > 0.5],
+        ["Power Grappler", "Wrestle-Boxer", "Striker"], "Pure Striker"
+    )
+    pacing = np.select([slpm > 4.5, slpm > 2.5], ["Pressure", "Paced"], "Counter")
+    intent = np.select([finish_rate > 0.7, knockdowns_per_fight > 0.5], ["Finisher", "Power Puncher"], "Decision Fighter")
+
+    is_grappler = np.isin(primary_style, ["Power Grappler", "Wrestle-Boxer"])
+    secondary_style = np.where(is_grappler, np.char.add("Grinding ", intent), np.char.add(np.char.add(pacing, " "), intent))
+
+    # Ape Index from the doubled height and reach, anything that does not parse as a number gives a conventional frame
+    def parse_inches(column):
+        return pd.to_numeric(fighters[column].astype(str).str.replace('"', ''), errors='coerce').values * 2
+
+    height_val = parse_inches('height')
+    reach_val = parse_inches('reach')
+    has_both = (height_val != 0) & (reach_val != 0) & ~np.isnan(height_val) & ~np.isnan(reach_val)
+    ape_index = np.where(has_both, reach_val - height_val, 0)
+    frame = np.select([ape_index > 8, ape_index < -5], ["Long-Limbed", "Compact"], "Conventional Frame")
+
+    stance = fighters['stance'].where(fighters['stance'].notna() & ~fighters['stance'].isin(['', '--']), "Orthodox").values.astype(str)
+    tertiary_attributes = np.char.add(np.char.add(np.char.add(frame, " ("), stance), ")")
+
+    styles = pd.DataFrame({
+        "fighter_id": fighters.index,
+        "primary_style": primary_style,
+        "secondary_style": secondary_style,
+        "tertiary_attributes": tertiary_attributes,
+    })
+
+    # fewer than 2 fights is not enough to call a style
+    styles.loc[num_fights < 2, ["primary_style", "secondary_style", "tertiary_attributes"]] = "Newcomer"
+    return styles
+
+# the styles of the given fighters, or every fighter, worked out from the whole fights table in one pass
+def get_batch_fighter_styles(fights: pd.DataFrame, fighters: list[Fighter], fighter_ids = None, as_of = None) -> List[dict]:
+    fighters_df = pd.DataFrame(
+        [{"id": f.id, "height": f.height, "reach": f.reach, "stance": f.stance} for f in fighters],
+        columns=["id", "height", "reach", "stance"]
+    ).set_index('id')
+    if fighter_ids is not None:
+        fighters_df = fighters_df[fighters_df.index.isin(fighter_ids)]
+
+    totals = aggregate_fighter_stats(fights, fighters_df.index, as_of)
+    return classify_styles(totals, fighters_df).to_dict(orient="records")
 
-    style_results = []
+def get_all_fighter_styles(fighter_ids: pd.DataFrame) -> List[dict]:
     # Batch process all fighters in the provided DataFrame
-    for fighter_id in figher_ids_list:
-        style_object = define_style(fighter_id)
-        style_results.append(style_object)
+    with DatabaseManager(DB_PATH, read_only=True) as db:
+        fights = db.get_fights_df()
+        fighters = db.get_fighters()
+
+    return get_batch_fighter_styles(fights, fighters, set(fighter_ids['id'].tolist()))
+
+# restyles the fighters and records the newest fight it saw, with only_new just the fighters
+# who have fought since the last run are restyled, returns how many fighters were updated
+def restyle_fighters(db_path: str = DB_PATH, only_new: bool = False) -> int:
+    with DatabaseManager(db_path, read_only=True) as db:
+        fights = db.get_fights_df()
+        fighters = db.get_fighters()
+        last_fight_id = db.get_job_watermark(STYLE_JOB) if only_new else None
+
+    fighter_ids = None
+    if last_fight_id is not None:
+        new_fights = fights[fights['fight_id'] > last_fight_id]
+        fighter_ids = set(new_fights['red_fighter_id'].dropna()) | set(new_fights['blue_fighter_id'].dropna())
+
+    fighter_styles = get_batch_fighter_styles(fights, fighters, fighter_ids)
+
+    with DatabaseManager(db_path) as db:
+        db.update_fighter_styles(fighter_styles)
+        if not fights.empty:
+            db.set_job_watermark(STYLE_JOB, int(fights['fight_id'].max()))
 
-    return style_results
\ No newline at end of file
+    return len(fighter_styles)
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.connection_pool import close_pool
+from Database.database_manager import DatabaseManager
+from Database.migrations import migrate
+from utils.Fighter_Style import define_style, get_all_fighter_styles, restyle_fighters
+from utils.model_registry import model_registry
+
+class TestBatchFighterStyles(unittest.TestCase):
+
+    def test_matches_define_style(self):
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            fighter_ids = db.get_fighter_ids().sample(60, random_state=7)
+
+        styles = get_all_fighter_styles(fighter_ids)
+
+        self.assertEqual(len(styles), len(fighter_ids))
+        for style in styles:
+            self.assertEqual(style, define_style(style["fighter_id"]))
+
+    def test_styles_are_known_to_the_encoders(self):
+        # a style the saved encoders never saw encodes to all zeros, so a restyle must not invent new ones
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            fighter_ids = db.get_fighter_ids()
+
+        styles = get_all_fighter_styles(fighter_ids)
+        encoders = model_registry.get("style_encoders")
+        for level, key in [("primary", "primary_style"), ("secondary", "secondary_style"), ("tertiary", "tertiary_attributes")]:
+            self.assertLessEqual({style[key] for style in styles}, set(encoders[level].category_map_))
+
+class TestRestyleFighters(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "fighters.db")
+        shutil.copy(DB_PATH, self.db_path)
+        migrate(self.db_path)
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        self.temp_dir.cleanup()
+
+    def get_styles(self):
+        with DatabaseManager(self.db_path, read_only=True) as db:
+            return pd.read_sql("SELECT id, primary_style, secondary_style FROM fighters", db.conn).set_index('id')
+
+    def test_only_new_restyles_fighters_from_new_fights(self):
+        self.assertEqual(restyle_fighters(self.db_path), len(self.get_styles()))
+
+        with DatabaseManager(self.db_path) as db:
+            fights = db.get_fights_df()
+            red_id, blue_id, untouched_id = [int(i) for i in fights['red_fighter_id'].dropna().unique()[:3]]
+            db.cursor.execute("UPDATE fighters SET primary_style = 'Stale' WHERE id IN (?, ?, ?)", (red_id, blue_id, untouched_id))
+            db.cursor.execute("""
+                INSERT INTO fights (red_fighter_id, blue_fighter_id, winner_id, event_date, win_method, final_round,
+                                    red_knockdowns, red_sig_strikes, red_takedowns, red_sub_attempts,
+                                    blue_knockdowns, blue_sig_strikes, blue_takedowns, blue_sub_attempts, final_time_seconds)
+                VALUES (?, ?, ?, '2020-01-01', 'KO/TKO', 1, 1, 30, 0, 0, 0, 10, 0, 0, 120)
+            """, (red_id, blue_id, red_id))
+
+        self.assertEqual(restyle_fighters(self.db_path, only_new=True), 2)
+        styles = self.get_styles()
+        self.assertNotEqual(styles.loc[red_id, 'primary_style'], 'Stale')
+        self.assertNotEqual(styles.loc[blue_id, 'primary_style'], 'Stale')
+        self.assertEqual(styles.loc[untouched_id, 'primary_style'], 'Stale')
+
+        # nothing has been fought since, so the next run has no one to restyle
+        self.assertEqual(restyle_fighters(self.db_path, only_new=True), 0)
+
+if __name__ == '__main__':
+    unittest.main()
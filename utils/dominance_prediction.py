@@ -1,14 +1,13 @@
 import pandas as pd
-import joblib
 
 from Elo_System.Cross_Functions.create_features import prep_features
-from config.config import DOMINANCE_MODEL_PATH
+from utils.model_registry import model_registry
 
 
 #get a dominance prediction for a list of fights 
 def dominance_prediction(fights):
-    #loading dominance model
-    performance_modal = joblib.load(DOMINANCE_MODEL_PATH)
+    #getting the already loaded dominance model
+    performance_modal = model_registry.get("dominance_model")
 
     #preparing features
     features = prep_features(fights)
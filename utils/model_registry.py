@@ -0,0 +1,76 @@
+import os
+import hashlib
+import threading
+import joblib
+
+from config.config import (
+    MODEL_PATH,
+    ENCODERS_PATH,
+    DOMINANCE_MODEL_PATH,
+    DOMINANCE_ENCODER_PATH,
+    PREDICTOR_MODEL_PATH,
+    STYLE_MATRIX_PATH,
+)
+
+# Keeps every saved model in memory so it is only read from disk once per process.
+# Each lookup compares the file's modified time with the one it was loaded at,
+# so replacing a pickle on disk is picked up without restarting the workers.
+class ModelRegistry:
+    def __init__(self, paths: dict):
+        self.paths = paths
+        self.models = {}
+        self.mtimes = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str):
+        path = self.paths[name]
+        mtime = os.path.getmtime(path)
+
+        # Only load when the artifact is new or the file has changed since it was loaded
+        if self.mtimes.get(name) != mtime:
+            with self.lock:
+                if self.mtimes.get(name) != mtime:
+                    model = joblib.load(path)
+                    # Tree models build their flat prediction arrays once here rather than on the first request
+                    if hasattr(model, "compile"):
+                        model.compile()
+                    self.models[name] = model
+                    self.versions[name] = self.hash_file(path)
+                    self.mtimes[name] = mtime
+
+        return self.models[name]
+
+    def get_version(self, name: str) -> str:
+        # A short hash of the loaded file, so anything cached against a model is dropped when it is retrained
+        self.get(name)
+        return self.versions[name]
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+
+    def load_all(self):
+        # Warm the registry, skipping any artifact that has not been trained yet
+        for name, path in self.paths.items():
+            if not os.path.exists(path):
+                print(f"Model registry: no file for '{name}' at {path}, skipping.")
+                continue
+            self.get(name)
+
+    def clear(self):
+        with self.lock:
+            self.models = {}
+            self.mtimes = {}
+            self.versions = {}
+
+
+model_registry = ModelRegistry({
+    "style_model": MODEL_PATH,
+    "style_encoders": ENCODERS_PATH,
+    "dominance_model": DOMINANCE_MODEL_PATH,
+    "dominance_encoder": DOMINANCE_ENCODER_PATH,
+    "predictor_model": PREDICTOR_MODEL_PATH,
+    "style_matrix": STYLE_MATRIX_PATH,
+})
@@ -2,90 +2,93 @@ import pandas as pd
 import numpy as np
 import datetime
 
-import pandas as pd
-import datetime
 
+def melt_fighter_fights(all_fights_df: pd.DataFrame) -> pd.DataFrame:
+    # One row per fighter per fight with the opponents elo after it, oldest first
+    columns = ['fight_id', 'event_date']
+    red = all_fights_df[columns + ['red_fighter_id', 'blue_fighter_elo_after']].rename(
+        columns={'red_fighter_id': 'fighter_id', 'blue_fighter_elo_after': 'opponent_elo'})
+    blue = all_fights_df[columns + ['blue_fighter_id', 'red_fighter_elo_after']].rename(
+        columns={'blue_fighter_id': 'fighter_id', 'red_fighter_elo_after': 'opponent_elo'})
 
-def safe_to_datetime(date_str, format):
-    # convert strings to datetime
-    if not date_str or date_str == '--':
-        return pd.NaT
+    long_fights = pd.concat([red, blue], ignore_index=True).dropna(subset=['fighter_id'])
+    long_fights = long_fights.drop_duplicates(subset=['fighter_id', 'fight_id'])
 
-    try:
-        return pd.to_datetime(date_str, format=format)
-    except (ValueError, TypeError):
-        return pd.NaT
+    return long_fights.sort_values(['fighter_id', 'event_date', 'fight_id'], kind='stable')
 
-def ranking_model(glicko_players: dict, all_fighters: list, all_fights_df: pd.DataFrame):
+def ranking_model(glicko_players: dict, all_fighters: list, all_fights_df: pd.DataFrame, as_of = None):
     # Define weights for ranking penalties and bonuses
     WEIGHT_ACTIVITY = 35
     WEIGHT_SOS = 0.5
     WEIGHT_AGE = 0.1
     Z_SCORE = 2.0
-
-    # Create lookups for name and date of birth for speed
-    fighter_name_map = {f.id: f.name for f in all_fighters}
-    fighter_dob_map = {f.id: safe_to_datetime(f.dob, '%b %d, %Y') for f in all_fighters}
-
-    quality_scores = {}
-    ranking_data = []
-    today = datetime.date.today()
-
-    for fighter_id, player in glicko_players.items():
-        if fighter_id not in fighter_name_map: continue
-
-        # Calculate conservative rating estimate, which is Rating - 2 * RD
-        skill_component = player.rating - (Z_SCORE * player.rating_deviation)
-
-        # Get all fights involving this fighter
-        fighter_fights = all_fights_df[
-            (all_fights_df['red_fighter_id'] == fighter_id) |
-            (all_fights_df['blue_fighter_id'] == fighter_id)
-            ]
-
-        if fighter_fights.empty: continue
-
-        # Calculate penalty based on inactivity using a logarithmic scale
-        last_fight_date = pd.to_datetime(fighter_fights['event_date']).max().date()
-        days_since_last_fight = (today - last_fight_date).days
-        activity_penalty = -np.log((days_since_last_fight / 180) + 1) * WEIGHT_ACTIVITY
-
-        # Calculate Strength from last 5 opponents
-        recent_fights = fighter_fights.tail(5)
-        opponent_elos = []
-        for _, fight in recent_fights.iterrows():
-            if fight['red_fighter_id'] == fighter_id:
-                opponent_elos.append(fight['blue_fighter_elo_after'])
-            else:
-                opponent_elos.append(fight['red_fighter_elo_after'])
-
-        print(opponent_elos)
-
-        avg_opponent_rating = np.mean(opponent_elos)
-        sos_bonus = (avg_opponent_rating - 1500) * WEIGHT_SOS
-
-        # Calculate age penalty if >30 or <24
-        age = (pd.to_datetime(today) - fighter_dob_map.get(fighter_id, pd.to_datetime(today))).days / 365.25
-        age_penalty = -((age - 30) ** 2) * WEIGHT_AGE if age > 30 or age < 24 else 0
-
-        # Sum components to get final Quality Score
-        advanced_quality_score = skill_component + activity_penalty + sos_bonus + age_penalty
-        quality_scores[fighter_id] = advanced_quality_score
-
-        ranking_data.append({
-            'id': fighter_id,
-            'Name': fighter_name_map[fighter_id],
-            'Rating': player.rating,
-            'RD': player.rating_deviation,
-            'Quality Score': advanced_quality_score
-        })
-
-    if not ranking_data: return
-
-    # Create DataFrame and sort by the final score
-    rankings_df = pd.DataFrame(ranking_data)
+    RECENT_FIGHTS = 5
+
+    # Rankings as of a date only see the fights before it, glicko_players should hold the ratings from then too
+    if as_of is not None:
+        all_fights_df = all_fights_df[all_fights_df['event_date'] < str(as_of)[:10]]
+        today = pd.to_datetime(as_of).date()
+    else:
+        today = datetime.date.today()
+
+    fighters = pd.DataFrame({
+        'id': [f.id for f in all_fighters],
+        'Name': [f.name for f in all_fighters],
+        'dob_ordinal': [f.dob_ordinal for f in all_fighters],
+    }).drop_duplicates(subset='id').set_index('id')
+    # a missing date of birth is nan
+    fighters['dob_ordinal'] = fighters['dob_ordinal'].astype(float)
+
+    players = pd.DataFrame(
+        [(fighter_id, player.rating, player.rating_deviation) for fighter_id, player in glicko_players.items()],
+        columns=['id', 'Rating', 'RD']
+    )
+    players = players[players['id'].isin(fighters.index)]
+
+    # Every fighters last fight date and the mean elo of their last five opponents in one pass
+    long_fights = melt_fighter_fights(all_fights_df)
+    by_fighter = long_fights.groupby('fighter_id', sort=False)
+    recent = long_fights[by_fighter.cumcount(ascending=False) < RECENT_FIGHTS].groupby('fighter_id')
+
+    # a missing opponent elo makes the mean missing, the same as np.mean
+    opponent_strength = recent['opponent_elo'].mean().where(recent['opponent_elo'].count() == recent.size())
+    last_fight_date = pd.to_datetime(by_fighter['event_date'].max())
+
+    players = players[players['id'].isin(last_fight_date.index)]
+    if players.empty: return
+
+    ids = players['id'].values
+    days_since_last_fight = (pd.Timestamp(today) - pd.DatetimeIndex(last_fight_date.loc[ids].values)).days.values
+
+    # Calculate conservative rating estimate, which is Rating - 2 * RD
+    skill_component = players['Rating'].values - (Z_SCORE * players['RD'].values)
+
+    # Calculate penalty based on inactivity using a logarithmic scale
+    activity_penalty = -np.log((days_since_last_fight / 180) + 1) * WEIGHT_ACTIVITY
+
+    # Calculate Strength from last 5 opponents
+    sos_bonus = (opponent_strength.loc[ids].values - 1500) * WEIGHT_SOS
+
+    # Calculate age penalty if >30 or <24
+    age = (today.toordinal() - fighters.loc[ids, 'dob_ordinal'].values) / 365.25
+    age_penalty = np.where((age > 30) | (age < 24), -((age - 30) ** 2) * WEIGHT_AGE, 0)
+    age_penalty = np.where(np.isnan(age), 0, age_penalty)
+
+    # Sum components to get final Quality Score
+    advanced_quality_score = skill_component + activity_penalty + sos_bonus + age_penalty
+    quality_scores = dict(zip(ids.tolist(), advanced_quality_score.tolist()))
+
+    rankings_df = pd.DataFrame({
+        'id': ids,
+        'Name': fighters.loc[ids, 'Name'].values,
+        'Rating': players['Rating'].values,
+        'RD': players['RD'].values,
+        'Quality Score': advanced_quality_score,
+    })
+
+    # Sort by the final score
     final_rankings = rankings_df.sort_values(by='Quality Score', ascending=False)
 
     # Insert rank position numbers
     final_rankings.insert(0, '#', range(1, 1 + len(final_rankings)))
-    return final_rankings, quality_scores
\ No newline at end of file
+    return final_rankings, quality_scores
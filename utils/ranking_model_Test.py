@@ -0,0 +1,65 @@
+import unittest
+import datetime
+import numpy as np
+import pandas as pd
+
+from config.config import DB_PATH
+from Database.database_manager import DatabaseManager
+from Models.Functional_Classes.Glicko2.GlickoFighter import GlickoFighter
+from utils.ranking_model import ranking_model
+
+class TestRankingModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with DatabaseManager(DB_PATH, read_only=True) as db:
+            cls.fights = pd.DataFrame(db.get_fights())
+            cls.fighters = db.get_fighters()
+
+        cls.fighters_map = {f.id: f for f in cls.fighters}
+        cls.players = {f.id: GlickoFighter(f.elo_rating, f.rating_deviation, f.rating_volatility) for f in cls.fighters}
+
+    def expected_score(self, fighter_id, fights, today):
+        # the per fighter calculation the ranking model used to do with a scan of the fights table
+        player = self.players[fighter_id]
+        fighter_fights = fights[(fights['red_fighter_id'] == fighter_id) | (fights['blue_fighter_id'] == fighter_id)]
+        fighter_fights = fighter_fights.sort_values(['event_date', 'fight_id'])
+
+        days = (today - pd.to_datetime(fighter_fights['event_date']).max().date()).days
+        opponent_elos = [
+            fight['blue_fighter_elo_after'] if fight['red_fighter_id'] == fighter_id else fight['red_fighter_elo_after']
+            for _, fight in fighter_fights.tail(5).iterrows()
+        ]
+        dob = self.fighters_map[fighter_id].dob
+        dob = pd.to_datetime(dob, format='%b %d, %Y') if dob and dob != '--' else pd.NaT
+        age = (pd.to_datetime(today) - dob).days / 365.25 if not pd.isna(dob) else np.nan
+
+        return (
+            player.rating - 2.0 * player.rating_deviation
+            - np.log((days / 180) + 1) * 35
+            + (np.mean(opponent_elos) - 1500) * 0.5
+            + (-((age - 30) ** 2) * 0.1 if age > 30 or age < 24 else 0)
+        )
+
+    def test_matches_per_fighter_scan(self):
+        _, quality_scores = ranking_model(self.players, self.fighters, self.fights)
+
+        for fighter_id in pd.Series(list(quality_scores)).sample(25, random_state=4):
+            expected = self.expected_score(fighter_id, self.fights, datetime.date.today())
+            self.assertAlmostEqual(quality_scores[fighter_id], expected, places=6)
+
+    def test_as_of_only_sees_earlier_fights(self):
+        as_of = "2012-01-01"
+        rankings, quality_scores = ranking_model(self.players, self.fighters, self.fights, as_of=as_of)
+        earlier = self.fights[self.fights['event_date'] < as_of]
+        fought_before = set(earlier['red_fighter_id']) | set(earlier['blue_fighter_id'])
+
+        self.assertEqual(set(quality_scores), fought_before & set(self.players))
+        self.assertTrue(rankings['Quality Score'].is_monotonic_decreasing)
+
+        for fighter_id in pd.Series(list(quality_scores)).sample(10, random_state=5):
+            expected = self.expected_score(fighter_id, earlier, datetime.date(2012, 1, 1))
+            self.assertAlmostEqual(quality_scores[fighter_id], expected, places=6)
+
+if __name__ == '__main__':
+    unittest.main()